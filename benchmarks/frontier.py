@@ -0,0 +1,240 @@
+"""Benchmark crawl orders of the frontier against a local synthetic site.
+
+Every crawl order, with and without a depth limit, crawls the same
+generated site until it has fetched the requested share of the target
+pages, the pages closest to the root (`shallow`) or the pages most
+linked to (`popular`). The time and the pages crawled to get there are
+reported:
+
+    python benchmarks/frontier.py --target popular --coverage 0.9
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import time
+from argparse import ArgumentParser, Namespace
+from collections import Counter
+
+# `run` puts the crawler package on the import path
+from run import get_commit
+from synthetic_site import SiteConfig, SiteServer, SyntheticSite
+
+from crawler.async_crawl import AsyncCrawler  # noqa: E402
+from crawler.config import CRAWL_ORDERS  # noqa: E402
+from crawler.crawl import normalize_url  # noqa: E402
+from crawler.frontier import create_scorer  # noqa: E402
+
+# target pages of the benchmark
+SHALLOW_TARGET: str = "shallow"
+POPULAR_TARGET: str = "popular"
+
+
+def create_parser() -> ArgumentParser:
+    """Create a CLI argument parser of the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--fan-out", type=int, default=5)
+    parser.add_argument("--nav-links", type=int, default=0)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.001,
+        help="response latency in seconds",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--target",
+        choices=(SHALLOW_TARGET, POPULAR_TARGET),
+        default=POPULAR_TARGET,
+    )
+    parser.add_argument(
+        "--target-depth",
+        type=int,
+        default=3,
+        help="link depth of the shallow target pages",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=100,
+        help="number of the popular target pages",
+    )
+    parser.add_argument(
+        "--coverage",
+        type=float,
+        default=0.9,
+        help="share of the target pages to crawl",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="also crawl in every order with this depth limit",
+    )
+    parser.add_argument(
+        "--prefer",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="URL path pattern preferred by the `score` order",
+    )
+    parser.add_argument("--output", metavar="PATH")
+    return parser
+
+
+def link_depths(site: SyntheticSite) -> dict[int, int]:
+    """Return the link depth from the root of every reachable page"""
+    # the root serves page 0 under its own URL
+    depths: dict[int, int] = {}
+    layer: list[int] = [*site.nav_links(), *site.links(0)]
+    depth: int = 1
+    while layer:
+        found: list[int] = []
+        for number in layer:
+            if number not in depths:
+                depths[number] = depth
+                found.extend(site.links(number))
+        layer = found
+        depth += 1
+    return depths
+
+
+def target_pages(site: SyntheticSite, args: Namespace) -> set[int]:
+    """Return the numbers of the pages the crawl should reach"""
+    if args.target == SHALLOW_TARGET:
+        return {
+            number
+            for number, depth in link_depths(site).items()
+            if depth <= args.target_depth
+        }
+
+    # navigation links are on every page, content links rank the pages
+    inlinks: Counter = Counter()
+    for number in range(site.config.pages):
+        inlinks.update(site.links(number))
+    return {number for number, _ in inlinks.most_common(args.top)}
+
+
+async def crawl_to_coverage(
+    crawler: AsyncCrawler, targets: set[str], needed: int
+) -> tuple[int, int]:
+    """Crawl until `needed` of the `targets` are crawled, return
+    the pages crawled and the targets reached
+    """
+    pages: int = 0
+    reached: int = 0
+    async with contextlib.aclosing(crawler.iter_pages()) as crawled:
+        async for page in crawled:
+            pages += 1
+            if normalize_url(page["url"]) in targets:
+                reached += 1
+                if reached >= needed:
+                    break
+    return pages, reached
+
+
+def run_case(
+    url: str,
+    order: str,
+    max_depth: int | None,
+    targets: set[str],
+    args: Namespace,
+) -> dict[str, object]:
+    """Crawl the site in one order and return how fast
+    it reached the coverage
+    """
+    needed: int = max(1, round(args.coverage * len(targets)))
+    crawler: AsyncCrawler = AsyncCrawler(
+        url,
+        args.concurrency,
+        # the root and every page
+        args.pages + 1,
+        retain_pages=False,
+        max_depth=max_depth,
+        scorer=create_scorer(order, args.prefer),
+    )
+
+    started: float = time.perf_counter()
+    # per-URL progress of the crawler isn't part of the benchmark
+    with contextlib.redirect_stdout(io.StringIO()):
+        pages, reached = asyncio.run(
+            crawl_to_coverage(crawler, targets, needed)
+        )
+    duration: float = time.perf_counter() - started
+
+    name: str = order if max_depth is None else f"{order}-d{max_depth}"
+    return {
+        "name": name,
+        "order": order,
+        "max_depth": max_depth,
+        "covered": reached >= needed,
+        "coverage": round(reached / len(targets), 4) if targets else 0.0,
+        "pages": pages,
+        "duration": round(duration, 4),
+    }
+
+
+def print_result(result: dict[str, object]):
+    status: str = "" if result["covered"] else " (coverage not reached)"
+    print(
+        f"{result['name']:<12} {result['pages']:>8} pages "
+        f"{result['duration']:>8.3f}s {result['coverage']:>7.1%}{status}"
+    )
+
+
+def main():
+    args: Namespace = create_parser().parse_args()
+    config: SiteConfig = SiteConfig(
+        pages=args.pages,
+        fan_out=args.fan_out,
+        nav_links=args.nav_links,
+        page_bytes=0,
+        latency=args.latency,
+        seed=args.seed,
+    )
+    site: SyntheticSite = SyntheticSite(config)
+    numbers: set[int] = target_pages(site, args)
+
+    results: list[dict[str, object]] = []
+    with SiteServer(config) as server:
+        targets: set[str] = {
+            normalize_url(f"{server.url}p/{number}") for number in numbers
+        }
+        print(
+            f"{len(targets)} {args.target} target pages, "
+            f"crawling to {args.coverage:.0%} coverage"
+        )
+        for max_depth in dict.fromkeys([None, args.max_depth]):
+            for order in CRAWL_ORDERS:
+                result: dict[str, object] = run_case(
+                    server.url, order, max_depth, targets, args
+                )
+                print_result(result)
+                results.append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "commit": get_commit(),
+                    "timestamp": time.time(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "site": config.as_dict(),
+                    "target": args.target,
+                    "targets": len(targets),
+                    "coverage": args.coverage,
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
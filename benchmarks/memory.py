@@ -0,0 +1,124 @@
+"""Benchmark memory of crawled page data kept in memory.
+
+Pages of a synthetic site are extracted and kept as plain page data
+dictionaries and as compact `PageRecords`, and the memory retained by
+each is measured with `tracemalloc`:
+
+    python benchmarks/memory.py --pages 20000 --output memory.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from collections.abc import Callable, MutableMapping
+
+# `run` puts the crawler package on the import path
+from run import get_commit
+from synthetic_site import SiteConfig, SyntheticSite
+
+from crawler.crawl import extract_page_data, normalize_url  # noqa: E402
+from crawler.records import PageRecords  # noqa: E402
+
+CONTAINERS: dict[str, Callable[[], MutableMapping]] = {
+    "dict": dict,
+    "records": PageRecords,
+}
+
+
+def create_parser() -> ArgumentParser:
+    """Create a CLI argument parser of the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--fan-out", type=int, default=10)
+    parser.add_argument(
+        "--nav-links",
+        type=int,
+        default=40,
+        help="links of the navigation shared by every page",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="PATH")
+    return parser
+
+
+def measure(
+    site: SyntheticSite, container: Callable[[], MutableMapping]
+) -> dict[str, object]:
+    """Extract every page of the site into the `container` and return
+    the memory it retains
+    """
+    gc.collect()
+    tracemalloc.start()
+    started: float = time.perf_counter()
+
+    page_data: MutableMapping = container()
+    for number in range(site.config.pages):
+        url: str = f"http://localhost/p/{number}"
+        page_data[normalize_url(url)] = extract_page_data(
+            site.render(number), url
+        )
+
+    duration: float = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # the stored pages read back the same
+    assert len(page_data) == site.config.pages
+    return {
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "bytes_per_page": round(retained / site.config.pages, 1),
+        "duration": round(duration, 4),
+    }
+
+
+def main():
+    args: Namespace = create_parser().parse_args()
+    config: SiteConfig = SiteConfig(
+        pages=args.pages,
+        fan_out=args.fan_out,
+        nav_links=args.nav_links,
+        page_bytes=0,
+        seed=args.seed,
+    )
+    site: SyntheticSite = SyntheticSite(config)
+
+    results: dict[str, dict[str, object]] = {}
+    for name, container in CONTAINERS.items():
+        results[name] = measure(site, container)
+        print(
+            f"{name:<10} {results[name]['retained_bytes'] / 2**20:>8.2f} MiB "
+            f"{results[name]['bytes_per_page']:>10.1f} B/page "
+            f"{results[name]['duration']:>8.3f}s"
+        )
+    reduction: float = 1 - (
+        results["records"]["retained_bytes"]
+        / results["dict"]["retained_bytes"]
+    )
+    print(f"records retain {reduction:.1%} less memory")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "commit": get_commit(),
+                    "timestamp": time.time(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "site": config.as_dict(),
+                    "results": results,
+                    "reduction": round(reduction, 4),
+                },
+                f,
+                indent=4,
+            )
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Benchmark crawl throughput against a local synthetic site.
+
+Every combination of the requested engines, concurrency levels and parse
+executors crawls the same generated site, and HTML extraction backends
+are timed on its pages. Results are written as JSON with the commit they
+were measured on, so runs of different commits can be compared:
+
+    python benchmarks/run.py --output base.json
+    python benchmarks/run.py --compare base.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+# the crawler package is imported from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from crawler.async_crawl import crawl_site_async  # noqa: E402
+from crawler.config import PARSE_EXECUTORS  # noqa: E402
+from crawler.crawl import (  # noqa: E402
+    BS4_BACKEND,
+    LXML_BACKEND,
+    extract_page_data,
+    sniff_encoding,
+)
+from crawler.metrics import CrawlMetrics  # noqa: E402
+from crawler.sync_crawl import crawl_site_sync  # noqa: E402
+from synthetic_site import (  # noqa: E402
+    LATENCY_DISTRIBUTIONS,
+    SiteConfig,
+    SiteServer,
+    SyntheticSite,
+)
+
+ASYNC_ENGINE: str = "async"
+SYNC_ENGINE: str = "sync"
+
+# extraction inputs: downloaded bytes as the crawler parses them,
+# or decoded to text first
+BYTES_INPUT: str = "bytes"
+TEXT_INPUT: str = "text"
+
+
+def create_parser() -> ArgumentParser:
+    """Create a CLI argument parser of the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults: SiteConfig = SiteConfig()
+
+    site_group = parser.add_argument_group("synthetic site")
+    site_group.add_argument("--pages", type=int, default=defaults.pages)
+    site_group.add_argument("--fan-out", type=int, default=defaults.fan_out)
+    site_group.add_argument(
+        "--nav-links", type=int, default=defaults.nav_links
+    )
+    site_group.add_argument(
+        "--page-bytes", type=int, default=defaults.page_bytes
+    )
+    site_group.add_argument(
+        "--latency",
+        type=float,
+        default=defaults.latency,
+        help="mean response latency in seconds",
+    )
+    site_group.add_argument(
+        "--latency-distribution",
+        choices=LATENCY_DISTRIBUTIONS,
+        default=defaults.latency_distribution,
+    )
+    site_group.add_argument(
+        "--error-rate",
+        type=float,
+        default=defaults.error_rate,
+        help="share of pages responding with 500",
+    )
+    site_group.add_argument("--seed", type=int, default=defaults.seed)
+
+    case_group = parser.add_argument_group("benchmark cases")
+    case_group.add_argument(
+        "--engines",
+        nargs="+",
+        choices=(ASYNC_ENGINE, SYNC_ENGINE),
+        default=[ASYNC_ENGINE, SYNC_ENGINE],
+    )
+    case_group.add_argument(
+        "--concurrency", nargs="+", type=int, default=[1, 4, 16]
+    )
+    case_group.add_argument(
+        "--parse-executors",
+        nargs="+",
+        choices=PARSE_EXECUTORS,
+        default=list(PARSE_EXECUTORS),
+        help="parse executors of the async engine",
+    )
+    case_group.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs of every case, the median run is reported",
+    )
+
+    output_group = parser.add_argument_group("output")
+    output_group.add_argument("--output", metavar="PATH")
+    output_group.add_argument(
+        "--compare",
+        metavar="PATH",
+        help="print the change against results of an earlier run",
+    )
+    return parser
+
+
+def run_crawl(
+    url: str, engine: str, concurrency: int, parse_executor: str, pages: int
+) -> CrawlMetrics:
+    """Crawl the site once and return the crawl metrics"""
+    metrics: CrawlMetrics = CrawlMetrics()
+    # per-URL progress of the crawler isn't part of the benchmark
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine == SYNC_ENGINE:
+            crawl_site_sync(
+                url, concurrency, pages, retain_pages=False, metrics=metrics
+            )
+        else:
+            asyncio.run(
+                crawl_site_async(
+                    url,
+                    concurrency,
+                    pages,
+                    parse_executor,
+                    retain_pages=False,
+                    metrics=metrics,
+                )
+            )
+    return metrics
+
+
+def benchmark_crawls(url: str, args: Namespace) -> list[dict[str, object]]:
+    """Run every crawl case and return the median run of each"""
+    results: list[dict[str, object]] = []
+    for engine in args.engines:
+        # the sync engine always parses in its fetch threads
+        executors: list[str] = (
+            args.parse_executors if engine == ASYNC_ENGINE else ["inline"]
+        )
+        for concurrency in args.concurrency:
+            for parse_executor in executors:
+                name: str = f"{engine}-c{concurrency}"
+                if engine == ASYNC_ENGINE:
+                    name += f"-{parse_executor}"
+
+                runs: list[CrawlMetrics] = [
+                    run_crawl(
+                        url,
+                        engine,
+                        concurrency,
+                        parse_executor,
+                        # the root page and every numbered page
+                        args.pages + 1,
+                    )
+                    for _ in range(args.repeat)
+                ]
+                runs.sort(key=CrawlMetrics.duration)
+                median: dict[str, object] = runs[len(runs) // 2].summary()
+                results.append(
+                    {
+                        "name": name,
+                        "engine": engine,
+                        "concurrency": concurrency,
+                        "parse_executor": parse_executor,
+                        "runs": [round(run.duration(), 4) for run in runs],
+                        **median,
+                    }
+                )
+                print_result(results[-1])
+    return results
+
+
+def benchmark_extraction(
+    site: SyntheticSite, repeat: int
+) -> list[dict[str, object]]:
+    """Time HTML extraction of the site pages with every backend, from
+    the downloaded bytes and from text decoded first. The peak of memory
+    allocated by Python while extracting all pages is measured in a
+    separate run.
+    """
+    pages: list[tuple[str, bytes]] = [
+        (f"http://localhost/p/{number}", site.render(number).encode())
+        for number in range(min(site.config.pages, 200))
+    ]
+    results: list[dict[str, object]] = []
+    for backend in (LXML_BACKEND, BS4_BACKEND):
+        for source in (BYTES_INPUT, TEXT_INPUT):
+            runs: list[float] = []
+            for _ in range(repeat):
+                started: float = time.perf_counter()
+                extract_pages(pages, backend, source)
+                runs.append(time.perf_counter() - started)
+
+            tracemalloc.start()
+            extract_pages(pages, backend, source)
+            peak: int = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            duration: float = statistics.median(runs)
+            results.append(
+                {
+                    "name": (
+                        f"extract-{backend}"
+                        if source == BYTES_INPUT
+                        else f"extract-{backend}-{source}"
+                    ),
+                    "backend": backend,
+                    "input": source,
+                    "runs": [round(run, 4) for run in runs],
+                    "pages": len(pages),
+                    "duration": round(duration, 4),
+                    "pages_per_sec": round(len(pages) / duration, 3),
+                    "peak_kib": round(peak / 1024, 1),
+                }
+            )
+            print_result(results[-1])
+    return results
+
+
+def extract_pages(pages: list[tuple[str, bytes]], backend: str, source: str):
+    """Extract page data of the downloaded pages from the given input"""
+    for url, body in pages:
+        if source == TEXT_INPUT:
+            extract_page_data(
+                body.decode(sniff_encoding(body), errors="replace"),
+                url,
+                backend,
+            )
+        else:
+            extract_page_data(body, url, backend)
+
+
+def print_result(result: dict[str, object]):
+    peak: str = (
+        f" {result['peak_kib']:>9.1f} KiB peak" if "peak_kib" in result else ""
+    )
+    print(
+        f"{result['name']:<24} {result['pages_per_sec']:>10.1f} pages/s "
+        f"{result['duration']:>8.3f}s{peak}"
+    )
+
+
+def get_commit() -> str | None:
+    """Return the commit of the benchmarked tree"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict[str, object]], filename: str):
+    """Print the throughput change of every case against earlier results"""
+    with open(filename, encoding="utf-8") as f:
+        baseline: dict[str, object] = json.load(f)
+    previous: dict[str, dict] = {
+        result["name"]: result for result in baseline["results"]
+    }
+
+    print(f"\nChange against {baseline.get('commit') or filename}:")
+    for result in results:
+        if (before := previous.get(result["name"])) is None:
+            continue
+        change: float = (
+            result["pages_per_sec"] / before["pages_per_sec"] - 1
+            if before["pages_per_sec"]
+            else 0.0
+        )
+        print(
+            f"{result['name']:<24} {before['pages_per_sec']:>10.1f} -> "
+            f"{result['pages_per_sec']:>10.1f} pages/s {change:>+8.1%}"
+        )
+
+
+def main():
+    args: Namespace = create_parser().parse_args()
+    config: SiteConfig = SiteConfig(
+        args.pages,
+        args.fan_out,
+        args.nav_links,
+        args.page_bytes,
+        args.latency,
+        args.latency_distribution,
+        args.error_rate,
+        args.seed,
+    )
+
+    with SiteServer(config) as server:
+        print(f"serving {config.pages} synthetic pages at {server.url}")
+        results: list[dict[str, object]] = benchmark_crawls(server.url, args)
+    results.extend(benchmark_extraction(server.site, args.repeat))
+
+    report: dict[str, object] = {
+        "commit": get_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "site": config.as_dict(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark startup latency of the crawler CLI.
+
+Fresh interpreters import the CLI and print its help, and the time they
+take on top of a bare interpreter start is reported. `--max-ms` fails
+the run once startup gets slower, e.g. when a heavy library is imported
+at module level again:
+
+    python benchmarks/startup.py --max-ms 100 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+# `run` puts the crawler package on the import path
+from run import get_commit
+
+ROOT: Path = Path(__file__).resolve().parent.parent
+
+# commands timed in a fresh interpreter, the bare start is subtracted
+# from the others
+BASELINE_CASE: str = "interpreter"
+CASES: dict[str, list[str]] = {
+    BASELINE_CASE: ["-c", "pass"],
+    "import": ["-c", "import crawler.main"],
+    "help": ["-m", "crawler", "--help"],
+}
+
+
+def create_parser() -> ArgumentParser:
+    """Create a CLI argument parser of the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        help="fail if any case takes longer than this many milliseconds "
+        "on top of the interpreter start",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="list the modules slowest to import with `-X importtime`",
+    )
+    parser.add_argument("--output", metavar="PATH")
+    return parser
+
+
+def run_case(arguments: list[str]) -> float:
+    """Run the interpreter with the arguments and return its duration"""
+    started: float = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *arguments],
+        check=True,
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def slowest_imports(count: int) -> list[tuple[str, int]]:
+    """Return the modules taking longest to import with the CLI and
+    their cumulative import time in microseconds
+    """
+    stderr: str = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import crawler.main"],
+        capture_output=True,
+        check=True,
+        cwd=ROOT,
+        text=True,
+    ).stderr
+    imports: list[tuple[str, int]] = []
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields: list[str] = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            imports.append((fields[2].strip(), int(fields[1])))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:count]
+
+
+def main():
+    args: Namespace = create_parser().parse_args()
+    # the bytecode cache is written before the timed runs
+    run_case(CASES["help"])
+
+    durations: dict[str, float] = {
+        name: statistics.median(
+            run_case(arguments) for _ in range(args.repeat)
+        )
+        for name, arguments in CASES.items()
+    }
+    results: list[dict[str, object]] = []
+    for name, duration in durations.items():
+        startup: float = (
+            duration
+            if name == BASELINE_CASE
+            else duration - durations[BASELINE_CASE]
+        )
+        results.append(
+            {
+                "name": name,
+                "duration": round(duration, 6),
+                "startup_ms": round(startup * 1000, 3),
+            }
+        )
+        print(f"{name:<12} {startup * 1000:>8.1f} ms")
+
+    imports: list[tuple[str, int]] = slowest_imports(args.top)
+    print("\nslowest imports (cumulative):")
+    for module, microseconds in imports:
+        print(f"{module:<40} {microseconds / 1000:>8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "commit": get_commit(),
+                    "timestamp": time.time(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "results": results,
+                    "imports": dict(imports),
+                },
+                f,
+                indent=4,
+            )
+        print(f"Results written to {args.output}")
+
+    if args.max_ms is not None:
+        slow: list[str] = [
+            result["name"]
+            for result in results
+            if result["name"] != BASELINE_CASE
+            and result["startup_ms"] > args.max_ms
+        ]
+        if slow:
+            sys.exit(f"startup of {', '.join(slow)} exceeds {args.max_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import asyncio
+import random
+import threading
+from dataclasses import asdict, dataclass
+
+from aiohttp import web
+
+# latency distributions of the synthetic site
+FIXED_LATENCY: str = "fixed"
+UNIFORM_LATENCY: str = "uniform"
+EXPONENTIAL_LATENCY: str = "exponential"
+LATENCY_DISTRIBUTIONS: tuple[str, ...] = (
+    FIXED_LATENCY,
+    UNIFORM_LATENCY,
+    EXPONENTIAL_LATENCY,
+)
+
+FILLER: str = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do "
+    "eiusmod tempor incididunt ut labore et dolore magna aliqua. "
+)
+
+
+@dataclass
+class SiteConfig:
+    """Shape of a synthetic site. Every page is generated from `seed`
+    and its number, so the same config always serves the same site.
+    """
+
+    pages: int = 500
+    fan_out: int = 10
+    nav_links: int = 0
+    page_bytes: int = 4096
+    latency: float = 0.005
+    latency_distribution: str = FIXED_LATENCY
+    error_rate: float = 0.0
+    seed: int = 0
+
+    def as_dict(self) -> dict[str, object]:
+        return asdict(self)
+
+
+class SyntheticSite:
+    """Generator of synthetic pages linking to each other.
+    Page `n` links to page `n + 1`, so every page is reachable,
+    and to `fan_out` random pages. Every page also has a navigation
+    of `nav_links` links shared by all pages.
+    """
+
+    def __init__(self, config: SiteConfig):
+        self.config: SiteConfig = config
+
+    def page_random(self, number: int) -> random.Random:
+        """Return the random generator of a page"""
+        return random.Random(self.config.seed * 1_000_003 + number)
+
+    def is_error(self, number: int) -> bool:
+        """Check if the page responds with a server error"""
+        return self.page_random(number).random() < self.config.error_rate
+
+    def delay(self, rng: random.Random) -> float:
+        """Return the response latency of a request"""
+        latency: float = self.config.latency
+        if self.config.latency_distribution == UNIFORM_LATENCY:
+            return rng.uniform(0, 2 * latency)
+        if self.config.latency_distribution == EXPONENTIAL_LATENCY:
+            return rng.expovariate(1 / latency) if latency else 0.0
+        return latency
+
+    def nav_links(self) -> range:
+        """Return the numbers of the pages linked from every page"""
+        return range(min(self.config.nav_links, self.config.pages))
+
+    def links(self, number: int) -> list[int]:
+        """Return the numbers of the pages linked from the content
+        of a page
+        """
+        rng: random.Random = self.page_random(number)
+        links: list[int] = (
+            [number + 1] if number + 1 < self.config.pages else []
+        )
+        links.extend(
+            rng.randrange(self.config.pages)
+            for _ in range(self.config.fan_out)
+        )
+        return links
+
+    def render(self, number: int) -> str:
+        """Return the HTML of a page"""
+        links: list[int] = self.links(number)
+
+        parts: list[str] = [
+            "<html><head><title>Synthetic page</title></head><body>",
+            f"<h1>Page {number}</h1>",
+            f"<main><p>First paragraph of page {number}.</p></main>",
+            "<nav>",
+            *(
+                f'<a href="/p/{link}">Page {link}</a>'
+                for link in self.nav_links()
+            ),
+            "</nav><section>",
+            *(f'<a href="/p/{link}">Page {link}</a>' for link in links),
+            "</section>",
+            f'<img src="/img/{number}.png" alt="Image {number}">',
+        ]
+        size: int = sum(map(len, parts))
+        while size < self.config.page_bytes:
+            parts.append(f"<p>{FILLER}</p>")
+            size += len(FILLER) + 7
+        parts.append("</body></html>")
+        return "".join(parts)
+
+    async def handle_page(self, request: web.Request) -> web.Response:
+        number: int = int(request.match_info.get("number", "0"))
+        if not 0 <= number < self.config.pages:
+            raise web.HTTPNotFound()
+
+        # latency varies between requests, errors are fixed per page
+        await asyncio.sleep(self.delay(random.Random()))
+        if self.is_error(number):
+            raise web.HTTPInternalServerError()
+
+        return web.Response(text=self.render(number), content_type="text/html")
+
+    def create_app(self) -> web.Application:
+        app: web.Application = web.Application()
+        app.router.add_get("/", self.handle_page)
+        app.router.add_get("/p/{number}", self.handle_page)
+        return app
+
+
+class SiteServer:
+    """Synthetic site served on a local port in a background thread,
+    so synchronous crawlers can be benchmarked in the main thread
+    """
+
+    def __init__(self, config: SiteConfig, host: str = "127.0.0.1"):
+        self.site: SyntheticSite = SyntheticSite(config)
+        self.host: str = host
+        self.port: int = 0
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.thread: threading.Thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True
+        )
+        self.runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self.loop).result()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def start(self):
+        self.runner = web.AppRunner(self.site.create_app(), access_log=None)
+        await self.runner.setup()
+        site: web.TCPSite = web.TCPSite(self.runner, self.host, 0)
+        await site.start()
+        # the port is picked by the OS
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
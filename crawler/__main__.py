@@ -0,0 +1,3 @@
+from crawler.main import main
+
+main()
@@ -1,154 +1,891 @@
 import asyncio
-from asyncio import Lock, Semaphore, Task
-
-from urllib.parse import urlparse
+import time
+from asyncio import Condition, Lock, Queue, Task
+from collections.abc import AsyncIterator, MutableMapping
+from contextlib import AsyncExitStack
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
 
 import aiohttp
 from aiohttp import ClientSession
 
-from crawl import extract_page_data, normalize_url
+from crawler.config import (
+    FRONTIER_SIZE,
+    INLINE_EXECUTOR,
+    PAGE_BUFFER_SIZE,
+    PROCESS_EXECUTOR,
+    THREAD_EXECUTOR,
+)
+from crawler.budget import BudgetSpentError, CrawlBudget
+from crawler.cache import ResponseCache
+from crawler.canonical import CanonicalUrl, Canonicalizer
+from crawler.crawl import (
+    CHUNK_SIZE,
+    DEFAULT_ENCODING,
+    USER_AGENT,
+    BodyLimit,
+    StreamExtractor,
+    check_response,
+    EXTRACTION_BACKEND,
+    conditional_headers,
+    extract_page_data,
+    response_validators,
+    sniff_encoding,
+)
+from crawler.dedup import (
+    ContentFingerprint,
+    DuplicateIndex,
+    alias_page,
+    content_hash,
+)
+from crawler.frontier import AsyncFrontier, Scorer
+from crawler.limiter import AdaptiveLimiter, Slot
+from crawler.metrics import CrawlMetrics
+from crawler.recrawl import PageDiff, unchanged_page
+from crawler.records import PageRecords
+from crawler.report import PageSink
+from crawler.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Hedger,
+    RetryPolicy,
+    Timeouts,
+    is_transient,
+)
+from crawler.seeding import SitemapParser, SiteSeeder
+from crawler.store import CrawlStore
+from crawler.visited import VisitedSet
+
+# errors of requests that may succeed if retried
+NETWORK_ERRORS: tuple[type[BaseException], ...] = (
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+)
 
 
 class AsyncCrawler:
     def __init__(
-        self, base_url: str, max_concurrency: int, max_pages_to_crawl: int
+        self,
+        base_url: str,
+        max_concurrency: int,
+        max_pages_to_crawl: int,
+        parse_executor: str = INLINE_EXECUTOR,
+        frontier_size: int = FRONTIER_SIZE,
+        visited: VisitedSet | None = None,
+        store: CrawlStore | None = None,
+        sinks: list[PageSink] | None = None,
+        retain_pages: bool = True,
+        cache: ResponseCache | None = None,
+        limiter: AdaptiveLimiter | None = None,
+        seeder: SiteSeeder | None = None,
+        metrics: CrawlMetrics | None = None,
+        dedup: DuplicateIndex | None = None,
+        since: PageDiff | None = None,
+        max_page_bytes: int = 0,
+        stream_parse: bool = False,
+        max_depth: int | None = None,
+        scorer: Scorer | None = None,
+        timeouts: Timeouts | None = None,
+        retry: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        hedger: Hedger | None = None,
+        canonicalizer: Canonicalizer | None = None,
+        budget: CrawlBudget | None = None,
     ):
         self.base_url = base_url
-        self.base_domain: str = urlparse(self.base_url).netloc
-        self.page_data: dict[str, dict[str, str | list[str]]] = {}
+        # canonical forms of the URLs found, the visited set keys
+        self.canonicalizer: Canonicalizer = canonicalizer or Canonicalizer()
+        self.base_domain: str = self.canonicalizer.host(self.base_url)
+        # pages are kept in memory as compact records or in the crawl
+        # state database, a crawl that only streams pages to sinks
+        # doesn't keep them
+        self.store: CrawlStore | None = store
+        self.page_data: MutableMapping[str, dict[str, str | list[str]]] = (
+            store.pages() if store is not None else PageRecords()
+        )
+        self.retain_pages: bool = retain_pages or store is not None
+        self.page_count: int = len(self.page_data)
+        self.sinks: list[PageSink] = sinks or []
+        # validators and page data of earlier crawls
+        self.cache: ResponseCache | None = cache
+        # robots.txt rules and sitemap seeding
+        self.seeder: SiteSeeder | None = seeder
+        # phase timings and throughput
+        self.metrics: CrawlMetrics = metrics or CrawlMetrics()
+        # content fingerprints of crawled pages
+        self.dedup: DuplicateIndex | None = dedup
+        # pages of an earlier crawl compared with the new ones
+        self.since: PageDiff | None = since
+        # normalized URLs of pages that failed to be crawled
+        self.failed: set[str] = set()
         self.lock: Lock = asyncio.Lock()
-        self.max_concurrency = max_concurrency
-        self.semaphore: Semaphore = asyncio.Semaphore(self.max_concurrency)
         self.session: ClientSession
+        # crawled pages handed to the consumer of `iter_pages`
+        self.page_queue: Queue | None = None
 
-        # crawling control for maximum pages
-        self.max_pages: int = max_pages_to_crawl
+        # a fixed pool of workers serves the frontier queue,
+        # requests to each host are limited by the adaptive limiter
+        # or by the number of workers if there's none
+        self.max_concurrency = max_concurrency
+        self.limiter: AdaptiveLimiter = limiter or AdaptiveLimiter(
+            max_concurrency, max_concurrency, max_concurrency
+        )
+        self.frontier: AsyncFrontier = AsyncFrontier(
+            frontier_size, visited, max_depth, scorer
+        )
+        self.active: int = 0
+
+        # stalled requests time out and transient failures are retried,
+        # hosts failing every request are skipped for a while and slow
+        # responses are raced by hedged requests if there's a hedger
+        self.timeouts: Timeouts = timeouts or Timeouts()
+        self.retry: RetryPolicy = retry or RetryPolicy()
+        self.breaker: CircuitBreaker = breaker or CircuitBreaker()
+        self.hedger: Hedger | None = hedger
+
+        # page, byte and time budgets of the crawl, a fetch reserves
+        # its page before it starts and pages crawled before count
+        self.budget: CrawlBudget = budget or CrawlBudget(max_pages_to_crawl)
+        self.budget.add_crawled(self.page_count)
         self.should_stop: bool = False
-        self.all_tasks: set[Task] = set()
+        # notified when a fetch ends, which may give its page back
+        self.budget_changed: Condition = asyncio.Condition()
+
+        # HTML parsing off the event loop
+        self.parse_executor: str = parse_executor
+        self.executor: Executor | None = None
+        # HTML parsing on the event loop while pages are downloaded
+        self.stream_parse: bool = stream_parse
+        # larger pages are dropped, 0 for no limit
+        self.max_page_bytes: int = max_page_bytes
 
     async def __aenter__(self):
-        """Open a client session"""
-        self.session = aiohttp.ClientSession()
+        """Open a client session and start the parse executor"""
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(
+                total=self.timeouts.total or None,
+                sock_connect=self.timeouts.connect or None,
+                sock_read=self.timeouts.read or None,
+            ),
+            trace_configs=[self.metrics.trace_config()],
+        )
+        self.executor = create_parse_executor(self.parse_executor)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Close the client session"""
+        """Close the client session and shut down the parse executor"""
         await self.session.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
 
-    async def add_page_visit(self, normalized_url: str) -> bool:
-        """Check if the page was visited earlier or reached crawling maximum"""
-        # check if crawler should stop
-        if self.should_stop:
-            return True
+    async def parse_page(
+        self, html: bytes, url: str, encoding: str
+    ) -> dict[str, str | list[str]]:
+        """Extract page data from the undecoded HTML using the parse
+        executor, so fetching can go on while the page is parsed
+        """
+        if self.executor is None:
+            with self.metrics.timer("parse"):
+                return extract_page_data(
+                    html, url, EXTRACTION_BACKEND, encoding
+                )
 
-        async with self.lock:
-            # check if reached max pages limit
-            if len(self.page_data) >= self.max_pages:
-                self.should_stop = True
-                print("Reached maximum number of pages to crawl.")
-                for task in self.all_tasks:
-                    if not task.done():
-                        task.cancel()
-                return True
-
-            # check if page is already visited
-            return normalized_url in self.page_data
-
-    async def get_html(self, url: str) -> str:
-        """Asynchronously send GET request to `url` and return its HTML or raise an exception"""
-        user_agent: str = "BootCrawler/1.0"
+        loop = asyncio.get_running_loop()
+        try:
+            # includes the wait for a free executor worker
+            with self.metrics.timer("parse"):
+                return await loop.run_in_executor(
+                    self.executor,
+                    extract_page_data,
+                    html,
+                    url,
+                    EXTRACTION_BACKEND,
+                    encoding,
+                )
+        except BrokenProcessPool as e:
+            # worker processes can't be started or died,
+            # keep parsing in threads instead
+            print(f"process pool failed ({e}), parsing in threads")
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = create_parse_executor(THREAD_EXECUTOR)
+            return await self.parse_page(html, url, encoding)
+
+    def budget_spent(self) -> bool:
+        """Check if the crawl budget is spent, no more pages are fetched"""
+        if not self.should_stop and (budget := self.budget.spent()):
+            self.should_stop = True
+            print(f"Reached the {budget} budget of the crawl.")
+            # pages of the earlier crawl left in the frontier
+            # aren't removed
+            if self.since is not None:
+                self.since.stopped = True
+
+        return self.should_stop
+
+    async def reserve_page(self) -> bool:
+        """Reserve a page of the budget for a fetch. While every page
+        left is being fetched, wait for one of the fetches to end since
+        it may fail and give its page back. Return `False` once
+        the budget is spent.
+        """
+        reserved: bool = False
+
+        def ready() -> bool:
+            nonlocal reserved
+            reserved = self.budget.reserve()
+            return reserved or self.budget_spent()
+
+        async with self.budget_changed:
+            await self.budget_changed.wait_for(ready)
+        return reserved
+
+    async def end_fetch(self, failed: bool):
+        """Keep the reserved page of a fetch or give it back if the fetch
+        `failed`, and wake up the fetches waiting for the budget
+        """
+        if failed:
+            self.budget.release()
+        else:
+            self.budget.finish()
+        async with self.budget_changed:
+            self.budget_changed.notify_all()
+
+    def schedule(self, url: str, depth: int = 0):
+        """Add `url` to the frontier if it's on the same domain as the base URL,
+        `depth` is the number of links followed from the seeds to it
+        """
+        canonical: CanonicalUrl | None = self.canonicalizer.canonicalize(url)
+        if canonical is None or canonical.host != self.base_domain:
+            return
+        # obey robots.txt before the URL is ever requested
+        if self.seeder is not None and not self.seeder.allowed(canonical.url):
+            return
+        self.enqueue(canonical.url, canonical.key, depth)
+
+    def enqueue(self, url: str, normalized_url: str, depth: int = 0) -> bool:
+        """Add a URL of the crawled site to the frontier unless it was
+        scheduled before. Return `True` if the URL was queued.
+        """
+        if not self.frontier.put(url, normalized_url, depth):
+            return False
+        if self.store is not None:
+            self.store.add_url(url, normalized_url, depth)
+        return True
+
+    def mark_done(self, normalized_url: str):
+        """Keep a crawled URL out of the frontier of a resumed crawl"""
+        if self.store is not None:
+            self.store.mark_done(normalized_url)
+
+    def resume(self) -> bool:
+        """Restore the visited set and the frontier from the crawl state
+        database. Return `False` if there's nothing to resume.
+        """
+        if self.store is None:
+            return False
+
+        pending: list[tuple[str, str, int]] = self.store.pending_urls()
+        for normalized_url in self.store.visited_urls():
+            self.frontier.visited.reserve(normalized_url)
+        for url, normalized_url, depth in pending:
+            self.frontier.put_reserved(url, normalized_url, depth)
+
+        if pending:
+            print(
+                f"resuming crawl: {self.page_count} pages crawled, "
+                f"{len(pending)} URLs pending"
+            )
+        return bool(pending)
 
+    async def load_robots(self):
+        """Apply cached or fetched robots.txt of the site"""
+        if self.seeder is None or self.seeder.load_cached():
+            return
+
+        robots_txt: str = ""
         try:
-            # send GET request
             async with self.session.get(
-                url, headers={"User-Agent": user_agent}
+                self.seeder.robots_url, headers={"User-Agent": USER_AGENT}
             ) as resp:
-                # catch errors
-                if (resp_code := resp.status) >= 400:
-                    raise Exception(
-                        f"server responded with error: '{resp_code}'"
-                    )
-                if not (
-                    content_type := resp.headers.get("content-type", "")
-                ).startswith("text/html"):
-                    raise Exception(
-                        f"server responded with unexpected content-type: '{content_type}'"
-                    )
-                return await resp.text()
+                if resp.status < 400:
+                    robots_txt = await resp.text()
         except Exception as e:
-            raise Exception(f"network error: {e}")
+            print(f"error fetching {self.seeder.robots_url}: {e}")
+        self.seeder.set_robots(robots_txt)
 
-    async def crawl_page(self, current_url: str):
-        """Recursively traverse found URLs"""
-        # stop further crawling if reached maximum crawls
-        if self.should_stop:
+    async def seed_sitemaps(self):
+        """Stream page URLs from the sitemaps into the frontier"""
+        if self.seeder is None:
             return
 
-        # make sure the current url is on the same domain as the base url
-        if urlparse(current_url).netloc != self.base_domain:
-            return
-        # ignore already crawled pages or links beyond the limit
-        if await self.add_page_visit(
-            normalized_url := normalize_url(current_url)
-        ):
+        # sitemap URLs of an earlier crawl
+        if self.seeder.from_cache:
+            for url in self.seeder.urls:
+                self.schedule(url)
             return
 
-        async with self.semaphore:
-            # retrieve the HTML
-            print(
-                f"crawling: {current_url} (Active: {self.max_concurrency - self.semaphore._value})"
-            )
+        while (sitemap_url := self.seeder.next_sitemap()) is not None:
+            if self.should_stop:
+                break
+            print(f"reading sitemap: {sitemap_url}")
+            parser: SitemapParser = SitemapParser()
             try:
-                html: str = await self.get_html(current_url)
+                async with self.session.get(
+                    sitemap_url, headers={"User-Agent": USER_AGENT}
+                ) as resp:
+                    if resp.status >= 400:
+                        raise Exception(
+                            f"server responded with error: '{resp.status}'"
+                        )
+                    async for chunk in resp.content.iter_chunked(2**16):
+                        for url in self.seeder.add_urls(parser.feed(chunk)):
+                            self.schedule(url)
+                        if self.seeder.is_full() or self.should_stop:
+                            break
+                    else:
+                        for url in self.seeder.add_urls(parser.close()):
+                            self.schedule(url)
             except Exception as e:
-                print(f"error crawling {current_url}: {e}")
-                return
+                print(f"error reading sitemap {sitemap_url}: {e}")
+
+        self.seeder.save()
+        print(f"Seeded {len(self.seeder.urls)} URLs from sitemaps.")
+
+    async def get_page(
+        self,
+        url: str,
+        validators: dict[str, str] | None = None,
+        stream: StreamExtractor | None = None,
+    ) -> tuple[bytes | None, str, dict[str, str]]:
+        """Asynchronously send GET request to `url`, conditional if cached
+        `validators` are provided, and return its undecoded HTML, its
+        encoding and the response validators. The HTML is `None` if the
+        page wasn't modified. The body is fed to the `stream` extractor
+        as it's downloaded. Transient failures are retried.
+        """
+        headers: dict[str, str] = {
+            "User-Agent": USER_AGENT,
+            **conditional_headers(validators),
+        }
+        host: str = self.canonicalizer.host(url)
+
+        attempt: int = 0
+        while True:
+            probe: bool = False
+            try:
+                probe = self.breaker.check(host)
+                page: tuple[bytes | None, str, dict[str, str]] = (
+                    await self.request_page(url, headers, validators, stream)
+                )
+            except CircuitOpenError as e:
+                raise Exception(f"network error: {e}") from e
+            except BudgetSpentError:
+                raise
+            except Exception as e:
+                transient: bool = is_transient(e, NETWORK_ERRORS)
+                self.breaker.record(host, transient)
+                probe = False
+                if not transient or attempt >= self.retry.retries:
+                    raise Exception(f"network error: {e}") from e
+            else:
+                self.breaker.record(host, False)
+                probe = False
+                return page
+            finally:
+                # a probe stopped by the budget or cancelled has
+                # no outcome
+                if probe:
+                    self.breaker.release(host)
+
+            # back off before the retry, an overloaded host also holds
+            # its slots until its `Retry-After`
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+            self.metrics.add_retry()
+            print(f"retrying: {url} (attempt {attempt + 1})")
+
+    async def request_page(
+        self,
+        url: str,
+        headers: dict[str, str],
+        validators: dict[str, str] | None = None,
+        stream: StreamExtractor | None = None,
+    ) -> tuple[bytes | None, str, dict[str, str]]:
+        """Send a single GET request to `url`, hedged if the host is slow
+        to respond, and return its undecoded HTML, its encoding and
+        the response validators
+        """
+        async with AsyncExitStack() as stack:
+            resp: aiohttp.ClientResponse = await self.open_response(
+                url, headers, stack
+            )
+
+            # reuse cached data of an unchanged page
+            if resp.status == 304 and validators:
+                return None, DEFAULT_ENCODING, validators
+
+            # catch errors
+            check_response(resp.status, resp.headers.get("content-type", ""))
+            with self.metrics.timer("download"):
+                html: bytes = await self.read_body(resp, stream)
+            return (
+                html,
+                sniff_encoding(html, resp.charset),
+                response_validators(resp.headers),
+            )
+
+    async def open_response(
+        self, url: str, headers: dict[str, str], stack: AsyncExitStack
+    ) -> aiohttp.ClientResponse:
+        """Send GET request to `url` and return the response once its
+        headers arrive, the response and its host slot are held
+        on the `stack`. A request without a response after the hedging
+        delay of its host is raced by a second one in a hedging slot,
+        the response that arrives first is kept and the other request
+        is cancelled.
+        """
+        delay: float | None = (
+            self.hedger.delay(self.canonicalizer.host(url))
+            if self.hedger is not None
+            else None
+        )
+        if delay is None:
+            return await self.send_request(url, headers, stack)
+
+        attempts: dict[Task, AsyncExitStack] = {}
+
+        def start_attempt(hedge: bool = False):
+            attempt_stack: AsyncExitStack = AsyncExitStack()
+            task: Task = asyncio.create_task(
+                self.send_request(url, headers, attempt_stack, hedge)
+            )
+            attempts[task] = attempt_stack
+
+        start_attempt()
+        pending: set[Task] = set(attempts)
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                start_attempt(hedge=True)
+                pending = set(attempts)
+            # a failed request may still be outrun by the other one
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        await stack.enter_async_context(attempts.pop(task))
+                        return task.result()
+                if not pending:
+                    # every request failed, raise the error of the first
+                    return next(iter(attempts)).result()
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for attempt_stack in attempts.values():
+                await attempt_stack.aclose()
 
-            async with self.lock:
-                # extract and store page data
-                self.page_data[normalized_url] = extract_page_data(
-                    html, current_url
+    async def send_request(
+        self,
+        url: str,
+        headers: dict[str, str],
+        stack: AsyncExitStack,
+        hedge: bool = False,
+    ) -> aiohttp.ClientResponse:
+        """Wait for a free slot of the host, or a hedging slot for
+        a `hedge`, and send GET request to `url`, the response and
+        the slot are held on the `stack`
+        """
+        host: str = self.canonicalizer.host(url)
+        try:
+            # wait for a free slot of the host, its outcome adjusts
+            # the host concurrency limit
+            waiting: float = time.perf_counter()
+            slot: Slot = await stack.enter_async_context(
+                self.limiter.slot(host, hedge)
+            )
+            started: float = time.perf_counter()
+            self.metrics.observe("throttle", started - waiting)
+            if hedge:
+                self.metrics.add_hedge()
+            # send GET request
+            resp: aiohttp.ClientResponse = await stack.enter_async_context(
+                self.session.get(url, headers=headers)
+            )
+        except BaseException as e:
+            # the slot sees why the request failed
+            await stack.__aexit__(type(e), e, e.__traceback__)
+            raise
+
+        slot.status = resp.status
+        slot.ttfb = time.perf_counter() - started
+        slot.retry_after = resp.headers.get("Retry-After")
+        if self.hedger is not None:
+            self.hedger.observe(host, slot.ttfb)
+        return resp
+
+    async def read_body(
+        self,
+        resp: aiohttp.ClientResponse,
+        stream: StreamExtractor | None = None,
+    ) -> bytes:
+        """Read the response body in chunks, feeding them to the `stream`
+        extractor, and return it. Reading stops once the page is larger
+        than the limit or it turns out not to be HTML.
+        """
+        limit: BodyLimit = BodyLimit(
+            self.max_page_bytes,
+            resp.headers.get("content-length"),
+            self.budget,
+        )
+        # a retried download starts over
+        if stream is not None:
+            stream.reset(resp.charset)
+
+        chunks: list[bytes] = []
+        parsing: float = 0.0
+        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+            limit.check(chunk)
+            chunks.append(chunk)
+            # chunk trace signals are only sent by `resp.read`
+            self.metrics.add_bytes(len(chunk))
+            if stream is not None:
+                started: float = time.perf_counter()
+                stream.feed(chunk)
+                parsing += time.perf_counter() - started
+        if stream is not None:
+            self.metrics.observe("parse", parsing)
+
+        return b"".join(chunks)
+
+    async def fetch_page_data(
+        self, url: str, normalized_url: str
+    ) -> dict[str, str | list[str]]:
+        """Fetch and extract page data, revalidating the cached data
+        of the page if there's a cache. The data of a page whose content
+        didn't change since the earlier crawl is reused.
+        """
+        cached = (
+            self.cache.get(normalized_url) if self.cache is not None else None
+        )
+        validators, cached_page = (
+            cached if cached is not None else (None, None)
+        )
+
+        # retrieve the HTML, extracting it while it's downloaded
+        # if pages are parsed as a stream
+        stream: StreamExtractor | None = (
+            StreamExtractor(url) if self.stream_parse else None
+        )
+        self.active += 1
+        print(f"crawling: {url} (Active: {self.active})")
+        try:
+            with self.metrics.timer("page"):
+                html, encoding, new_validators = await self.get_page(
+                    url, validators, stream
                 )
-                # save links for processing without locks
-                links: list[str] = self.page_data[normalized_url][
-                    "outgoing_links"
-                ]  # type:ignore
-
-        # inner stop of further crawling if reached maximum crawls
-        # to avoid adding new tasks
-        if self.should_stop:
+        finally:
+            self.active -= 1
+
+        # a page with the cached content isn't extracted again,
+        # even if the server doesn't send validators
+        digest: str | None = None
+        if html is not None:
+            digest = new_validators["digest"] = content_hash(html).hex()
+            if (
+                self.cache is not None
+                and validators
+                and validators.get("digest") == digest
+            ):
+                html = None
+
+        # the page wasn't modified, skip parsing
+        if html is None and cached_page is not None and self.cache is not None:
+            self.cache.hit(normalized_url)
+            return {**cached_page, "url": url}
+
+        # a copy of a crawled page isn't extracted again, the page claims
+        # its content before it's extracted, so copies fetched meanwhile
+        # are aliases of it
+        page: dict[str, str | list[str]] | None = None
+        if self.dedup is not None:
+            fingerprint: ContentFingerprint = self.dedup.fingerprint(
+                html or b"", encoding
+            )
+            if (canonical_url := self.dedup.find(fingerprint)) is not None:
+                page = alias_page(url, canonical_url)
+            else:
+                self.dedup.add(fingerprint, url)
+
+        if page is None:
+            previous: dict[str, str | list[str]] | None = (
+                unchanged_page(self.since.get(normalized_url), digest)
+                if self.since is not None
+                else None
+            )
+            # extract page data outside of the lock
+            if previous is not None:
+                page = {**previous, "url": url}
+            elif stream is not None:
+                page = stream.close()
+            else:
+                page = await self.parse_page(html or b"", url, encoding)
+        if digest is not None:
+            page["digest"] = digest
+        if self.cache is not None:
+            self.cache.put(
+                normalized_url, new_validators, page, cached is not None
+            )
+        return page
+
+    async def crawl_page(
+        self, current_url: str, normalized_url: str, depth: int = 0
+    ):
+        """Fetch and extract a page found `depth` links away from
+        the seeds, then schedule its outgoing links
+        """
+        # stop further crawling once the budget is spent,
+        # the remaining frontier is drained without fetching
+        if not await self.reserve_page():
             return
 
-        tasks: list[Task] = []
-        # schedule crawling for each URL on the page
-        for url in links:
-            tasks.append((task := asyncio.create_task(self.crawl_page(url))))
-            self.all_tasks.add(task)
+        try:
+            page: dict[str, str | list[str]] = await self.fetch_page_data(
+                current_url, normalized_url
+            )
+        except BudgetSpentError as e:
+            # the page is left for a resumed crawl
+            await self.end_fetch(failed=True)
+            print(f"stopped crawling {current_url}: {e}")
+            return
+        except Exception as e:
+            await self.end_fetch(failed=True)
+            print(f"error crawling {current_url}: {e}")
+            self.metrics.errors += 1
+            self.failed.add(normalized_url)
+            if self.since is not None:
+                self.since.record_failure(normalized_url)
+            self.mark_done(normalized_url)
+            return
 
+        # a fetch in flight when the budget ran out is still stored
         try:
-            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.store_page(normalized_url, page)
         finally:
-            # remove tasks of this recursion run from 'global' task set
-            # regardless of gathering result (complete or error)
-            for task in tasks:
-                self.all_tasks.discard(task)
+            await self.end_fetch(failed=False)
+
+        # stream the page to the reports
+        for sink in self.sinks:
+            sink.write(normalized_url, page)
+        # wait for the consumer of the pages if it's behind
+        if self.page_queue is not None:
+            await self.page_queue.put(page)
+
+        # don't grow the frontier once the budget is spent,
+        # a resumable crawl still saves the links for later
+        if self.budget_spent() and self.store is None:
             return
 
-    async def crawl(self) -> dict[str, dict[str, str | list[str]]]:
-        """Start crawling from `base_url` and return the page data"""
-        await self.crawl_page(self.base_url)
+        # schedule crawling for each URL on the page
+        for url in page["outgoing_links"]:
+            self.schedule(url, depth + 1)
+
+    async def store_page(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        """Keep the page data of a crawled page and count it"""
+        waiting: float = time.perf_counter()
+        async with self.lock:
+            self.metrics.observe("lock", time.perf_counter() - waiting)
+            # store page data
+            if self.retain_pages:
+                self.page_data[normalized_url] = page
+            self.page_count += 1
+            self.metrics.pages += 1
+            self.mark_done(normalized_url)
+            if self.since is not None:
+                self.since.record(normalized_url, page)
+
+    async def wait_until_done(self):
+        """Wait until the frontier is empty and every worker is idle"""
+        await self.frontier.join()
+
+    async def worker(self):
+        """Crawl URLs from the frontier until cancelled"""
+        while True:
+            current_url, normalized_url, depth = await self.frontier.get()
+            try:
+                await self.crawl_page(current_url, normalized_url, depth)
+            except Exception as e:
+                print(f"error crawling {current_url}: {e}")
+            finally:
+                self.frontier.task_done()
+
+    async def crawl(self) -> MutableMapping[str, dict[str, str | list[str]]]:
+        """Start crawling from `base_url` or continue an interrupted crawl
+        and return the page data
+        """
+        self.metrics.start()
+        self.budget.start()
+        if self.seeder is not None:
+            await self.load_robots()
+        if not self.resume():
+            self.schedule(self.base_url)
+        # pages of the earlier crawl are fetched right away
+        # instead of being rediscovered through links
+        if self.since is not None:
+            for url in self.since.urls():
+                self.schedule(url)
+
+        workers: list[Task] = [
+            asyncio.create_task(self.worker())
+            for _ in range(self.max_concurrency)
+        ]
+        # sitemap URLs are streamed into the frontier while crawling
+        seeding: Task | None = (
+            asyncio.create_task(self.seed_sitemaps())
+            if self.seeder is not None
+            else None
+        )
+        try:
+            if seeding is not None:
+                await seeding
+            await self.wait_until_done()
+        finally:
+            # stop the idle workers
+            if seeding is not None:
+                workers.append(seeding)
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.metrics.stop()
+            self.budget.stop()
+
+        if self.frontier.dropped:
+            print(f"Frontier was full, skipped {self.frontier.dropped} URLs.")
+        print(f"Visited set: {self.frontier.visited.describe()}")
+
         return self.page_data
 
+    async def iter_pages(
+        self, buffer_size: int = PAGE_BUFFER_SIZE
+    ) -> AsyncIterator[dict[str, str | list[str]]]:
+        """Crawl like `crawl` and yield the data of every page as soon
+        as it's stored. Workers wait while `buffer_size` pages are waiting
+        for the consumer, so a slow consumer slows down fetching.
+        Pages are still kept in `page_data` unless `retain_pages` is off.
+        A crawler used outside of `async with` opens its own session.
+        Closing the iterator, e.g. with `contextlib.aclosing`, stops
+        the crawl.
+        """
+        async with AsyncExitStack() as stack:
+            if getattr(self, "session", None) is None:
+                await stack.enter_async_context(self)
+
+            self.page_queue = pages = Queue(buffer_size)
+
+            async def crawl():
+                try:
+                    await self.crawl()
+                finally:
+                    # mark the end of the crawl, unless the consumer
+                    # stopped it
+                    if not asyncio.current_task().cancelling():
+                        await pages.put(None)
+
+            crawling: Task = asyncio.create_task(crawl())
+            try:
+                while (page := await pages.get()) is not None:
+                    yield page
+                # raise errors of the crawl
+                await crawling
+            finally:
+                # the consumer stopped early
+                crawling.cancel()
+                await asyncio.gather(crawling, return_exceptions=True)
+                self.page_queue = None
+
+
+def create_parse_executor(kind: str) -> Executor | None:
+    """Create an executor for HTML parsing of the given `kind`,
+    falling back to a thread pool if processes aren't available.
+    Return `None` for inline parsing.
+    """
+    if kind == INLINE_EXECUTOR:
+        return None
+    if kind == PROCESS_EXECUTOR:
+        try:
+            return ProcessPoolExecutor()
+        except (ImportError, NotImplementedError, OSError) as e:
+            print(f"process pool unavailable ({e}), parsing in threads")
+            return ThreadPoolExecutor()
+    if kind == THREAD_EXECUTOR:
+        return ThreadPoolExecutor()
+
+    raise ValueError(f"unknown parse executor: '{kind}'")
+
 
 async def crawl_site_async(
     base_url: str,
     max_concurrency: int,
     max_pages_to_crawl: int,
-) -> dict[str, dict[str, str | list[str]]]:
+    parse_executor: str = INLINE_EXECUTOR,
+    frontier_size: int = FRONTIER_SIZE,
+    visited: VisitedSet | None = None,
+    store: CrawlStore | None = None,
+    sinks: list[PageSink] | None = None,
+    retain_pages: bool = True,
+    cache: ResponseCache | None = None,
+    limiter: AdaptiveLimiter | None = None,
+    seeder: SiteSeeder | None = None,
+    metrics: CrawlMetrics | None = None,
+    dedup: DuplicateIndex | None = None,
+    since: PageDiff | None = None,
+    max_page_bytes: int = 0,
+    stream_parse: bool = False,
+    max_depth: int | None = None,
+    scorer: Scorer | None = None,
+    timeouts: Timeouts | None = None,
+    retry: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+    hedger: Hedger | None = None,
+    canonicalizer: Canonicalizer | None = None,
+    budget: CrawlBudget | None = None,
+) -> MutableMapping[str, dict[str, str | list[str]]]:
     """Create an `AsyncCrawler`'s instance on the `base_url`
     and start crawling
     """
     async with AsyncCrawler(
-        base_url, max_concurrency, max_pages_to_crawl
+        base_url,
+        max_concurrency,
+        max_pages_to_crawl,
+        parse_executor,
+        frontier_size,
+        visited,
+        store,
+        sinks,
+        retain_pages,
+        cache,
+        limiter,
+        seeder,
+        metrics,
+        dedup,
+        since,
+        max_page_bytes,
+        stream_parse,
+        max_depth,
+        scorer,
+        timeouts,
+        retry,
+        breaker,
+        hedger,
+        canonicalizer,
+        budget,
     ) as crawler:
         return await crawler.crawl()
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections.abc import MutableSequence
+from contextlib import AbstractContextManager
+
+# positions of the budget counters: pages crawled or being fetched,
+# pages being fetched and downloaded bytes
+RESERVED: int = 0
+FETCHING: int = 1
+DOWNLOADED: int = 2
+
+# budgets, in the order they're checked
+PAGE_BUDGET: str = "page"
+BYTE_BUDGET: str = "byte"
+TIME_BUDGET: str = "time"
+
+
+class BudgetSpentError(Exception):
+    """Download stopped because the byte budget of the crawl is spent"""
+
+    def __init__(self):
+        super().__init__("the byte budget of the crawl is spent")
+
+
+class CrawlBudget:
+    """Page, byte and wall-clock budget of a crawl. Every fetch reserves
+    a page of the budget before it starts, so no more than `max_pages`
+    pages are crawled however many fetches are in flight, and a fetch
+    that fails gives its page back. `max_bytes` limits the downloaded
+    page bodies, counted as they arrive even if the download fails,
+    and `max_duration` the seconds since the crawl started, 0 for no
+    limit. Once a budget is spent no fetch starts. Downloads in flight
+    stop at their next chunk once the byte budget is spent, so it's
+    exceeded by at most a chunk per fetch in flight, the other fetches
+    in flight finish and their pages are stored.
+    Fetch threads of the sync engine share it, and the processes
+    of a sharded crawl share its `counts` and their `lock`.
+    """
+
+    def __init__(
+        self,
+        max_pages: int,
+        max_bytes: int = 0,
+        max_duration: float = 0.0,
+        counts: MutableSequence[int] | None = None,
+        lock: AbstractContextManager | None = None,
+        started: float | None = None,
+    ):
+        self.max_pages: int = max_pages
+        self.max_bytes: int = max_bytes
+        self.max_duration: float = max_duration
+        self.counts: MutableSequence[int] = (
+            counts if counts is not None else [0, 0, 0]
+        )
+        self.lock: AbstractContextManager = lock or threading.Lock()
+        # `time.monotonic` of the start, shared by the processes
+        # of the machine
+        self.started: float | None = started
+        self.stopped: float | None = None
+        # the budget that ran out first
+        self.exhausted: str = ""
+
+    def start(self):
+        """Start the clock of the time budget unless it's running"""
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def stop(self):
+        """Stop the clock once the crawl is over"""
+        self.stopped = time.monotonic()
+
+    def elapsed(self) -> float:
+        """Return the seconds since the crawl started"""
+        if self.started is None:
+            return 0.0
+        return (self.stopped or time.monotonic()) - self.started
+
+    def add_crawled(self, count: int):
+        """Count pages crawled before, e.g. by an interrupted crawl"""
+        with self.lock:
+            self.counts[RESERVED] += count
+
+    def reserve(self) -> bool:
+        """Reserve a page for a fetch about to start. Return `False` if
+        a budget is spent or every page left is being fetched.
+        """
+        with self.lock:
+            if self.counts[RESERVED] >= self.max_pages or self.spent_budget():
+                return False
+            self.counts[RESERVED] += 1
+            self.counts[FETCHING] += 1
+            return True
+
+    def finish(self):
+        """Keep the page of a fetch that succeeded"""
+        with self.lock:
+            self.counts[FETCHING] -= 1
+
+    def release(self):
+        """Give back the page of a fetch that failed"""
+        with self.lock:
+            self.counts[RESERVED] -= 1
+            self.counts[FETCHING] -= 1
+
+    def add_bytes(self, count: int) -> bool:
+        """Count downloaded bytes of a page body. Return `False` if
+        the byte budget was already spent before them.
+        """
+        with self.lock:
+            left: bool = not self.bytes_spent()
+            self.counts[DOWNLOADED] += count
+            return left
+
+    def bytes_spent(self) -> bool:
+        """Check if the byte budget is spent, the lock may be held"""
+        return bool(self.max_bytes) and (
+            self.counts[DOWNLOADED] >= self.max_bytes
+        )
+
+    def spent(self) -> str:
+        """Return the budget that's spent, for good since no fetch
+        in flight can give a page back, empty if there's budget left
+        """
+        with self.lock:
+            return self.spent_budget()
+
+    def spent_budget(self) -> str:
+        """`spent` while the lock is held"""
+        if self.exhausted:
+            return self.exhausted
+
+        if self.counts[RESERVED] - self.counts[FETCHING] >= self.max_pages:
+            self.exhausted = PAGE_BUDGET
+        elif self.bytes_spent():
+            self.exhausted = BYTE_BUDGET
+        elif self.max_duration and self.elapsed() >= self.max_duration:
+            self.exhausted = TIME_BUDGET
+        return self.exhausted
+
+    def describe(self) -> str:
+        """Return a one-line summary of the budget use"""
+        with self.lock:
+            pages: int = self.counts[RESERVED] - self.counts[FETCHING]
+            downloaded: int = self.counts[DOWNLOADED]
+        summary: str = f"{pages} of {self.max_pages} pages"
+        summary += f", {downloaded / 2**20:.2f} MiB"
+        if self.max_bytes:
+            summary += f" of {self.max_bytes / 2**20:.2f} MiB"
+        summary += f" in {self.elapsed():.1f}s"
+        if self.max_duration:
+            summary += f" of {self.max_duration:g}s"
+        if self.exhausted:
+            summary += f", stopped by the {self.exhausted} budget"
+        return summary
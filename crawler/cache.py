@@ -0,0 +1,159 @@
+import json
+import sqlite3
+import time
+from sqlite3 import Connection
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS responses (
+    normalized_url TEXT PRIMARY KEY,
+    validators TEXT NOT NULL,
+    page TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+class ResponseCache:
+    """On-disk cache of response validators (`ETag`, `Last-Modified`,
+    the content digest) and extracted page data, keyed by normalized URL.
+    The least recently used entries are evicted once the cache
+    grows beyond `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int, batch_size: int):
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.batch_size: int = batch_size
+        self.connection: Connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        self.size: int = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        self.pending_writes: int = 0
+
+        # counters for the crawl summary
+        self.hits: int = 0
+        self.misses: int = 0
+        self.changed: int = 0
+        self.evicted: int = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get(
+        self, normalized_url: str
+    ) -> tuple[dict[str, str], dict[str, str | list[str]]] | None:
+        """Return cached validators and page data of the URL"""
+        row = self.connection.execute(
+            "SELECT validators, page FROM responses WHERE normalized_url = ?",
+            (normalized_url,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        return json.loads(row[0]), json.loads(row[1])
+
+    def hit(self, normalized_url: str):
+        """Record that the cached page is still valid"""
+        self.hits += 1
+        self.connection.execute(
+            "UPDATE responses SET accessed = ? WHERE normalized_url = ?",
+            (time.time(), normalized_url),
+        )
+        self.commit_if_full()
+
+    def put(
+        self,
+        normalized_url: str,
+        validators: dict[str, str],
+        page: dict[str, str | list[str]],
+        was_cached: bool = False,
+    ):
+        """Cache page data of a response, responses without validators
+        can't be revalidated and aren't cached
+        """
+        if was_cached:
+            self.changed += 1
+        if not validators:
+            if was_cached:
+                self.delete(normalized_url)
+            return
+
+        encoded_validators: str = json.dumps(validators)
+        encoded_page: str = json.dumps(page)
+        size: int = len(encoded_validators) + len(encoded_page)
+
+        self.delete(normalized_url)
+        self.connection.execute(
+            "INSERT INTO responses VALUES (?, ?, ?, ?, ?)",
+            (
+                normalized_url,
+                encoded_validators,
+                encoded_page,
+                size,
+                time.time(),
+            ),
+        )
+        self.size += size
+        self.evict()
+        self.commit_if_full()
+
+    def delete(self, normalized_url: str):
+        """Remove the URL from the cache"""
+        row = self.connection.execute(
+            "DELETE FROM responses WHERE normalized_url = ? RETURNING size",
+            (normalized_url,),
+        ).fetchone()
+        if row is not None:
+            self.size -= row[0]
+
+    def evict(self):
+        """Remove the least recently used entries until the cache
+        fits into `max_bytes`
+        """
+        if self.size <= self.max_bytes:
+            return
+
+        evicted: list[tuple[str]] = []
+        for normalized_url, size in self.connection.execute(
+            "SELECT normalized_url, size FROM responses "
+            "ORDER BY accessed, rowid"
+        ):
+            evicted.append((normalized_url,))
+            self.size -= size
+            if self.size <= self.max_bytes:
+                break
+
+        self.connection.executemany(
+            "DELETE FROM responses WHERE normalized_url = ?", evicted
+        )
+        self.evicted += len(evicted)
+
+    def commit_if_full(self):
+        """Commit once enough writes are pending"""
+        self.pending_writes += 1
+        if self.pending_writes >= self.batch_size:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def close(self):
+        """Commit pending writes and close the database"""
+        self.connection.commit()
+        self.connection.close()
+
+    def describe(self) -> str:
+        """Return a one-line summary of the cache counters"""
+        return (
+            f"{self.hits} hits, {self.misses} misses, "
+            f"{self.changed} changed, {self.evicted} evicted, "
+            f"{self.size / 2**20:.2f} MiB"
+        )
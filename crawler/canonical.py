@@ -0,0 +1,262 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import NamedTuple
+from urllib.parse import SplitResult, quote, unquote_plus, urlsplit
+
+from crawler.config import CANONICAL_CACHE_SIZE, STRIP_PARAMS
+
+# schemes of crawlable URLs and their default ports,
+# links with other schemes (`mailto:`, `javascript:`, ...) are skipped
+DEFAULT_PORTS: dict[str, int] = {"http": 80, "https": 443}
+
+# percent-encoded octets, the unreserved ones are decoded
+ESCAPE_RE: re.Pattern = re.compile(r"%([0-9A-Fa-f]{2})")
+UNRESERVED: frozenset[str] = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+# characters left as they are in paths and queries,
+# the rest (spaces, non-ASCII, ...) are percent-encoded
+PATH_SAFE: str = "/%:@!$&'()*+,;=-._~"
+QUERY_SAFE: str = PATH_SAFE + "?"
+# a URL without a scheme, whose host is followed by a port
+PORT_RE: re.Pattern = re.compile(r"\d+(?:[/?#]|$)")
+
+
+class CanonicalUrl(NamedTuple):
+    """Canonical form of a URL: the absolute `url` to request,
+    the `key` of the visited set and page data, HOST/PATH with the query
+    if there's one, and the `host` with its port
+    """
+
+    url: str
+    key: str
+    host: str
+
+
+@dataclass(frozen=True)
+class CanonicalRules:
+    """Query parameter rules of the canonicalizer. A parameter is dropped
+    if its name matches one of the `strip_params` patterns, or if there
+    are `keep_params` patterns and it matches none of them. Patterns are
+    shell-style wildcards matched case-insensitively. The parameters left
+    are sorted by name if `sort_params` is set.
+    """
+
+    keep_params: tuple[str, ...] = ()
+    strip_params: tuple[str, ...] = STRIP_PARAMS
+    sort_params: bool = True
+
+
+class Canonicalizer:
+    """Rule-driven URL canonicalization. Fragments, default ports,
+    `.` and `..` path segments, userinfo and filtered query parameters
+    are dropped, the scheme and host are lowercased, and percent-encoding
+    is normalized: unreserved characters are decoded, the other escapes
+    uppercased and unsafe characters encoded. The visited set key also
+    folds the scheme and a trailing slash. The canonical forms of
+    the `cache_size` most recently used URLs are cached, and every rule
+    counts the URLs it changed.
+    """
+
+    def __init__(
+        self,
+        rules: CanonicalRules | None = None,
+        cache_size: int = CANONICAL_CACHE_SIZE,
+    ):
+        self.rules: CanonicalRules = rules or CanonicalRules()
+        self.keep: tuple[str, ...] = tuple(
+            pattern.lower() for pattern in self.rules.keep_params
+        )
+        self.strip: tuple[str, ...] = tuple(
+            pattern.lower() for pattern in self.rules.strip_params
+        )
+        # changes made by every rule, cached URLs aren't counted again
+        self.hits: Counter[str] = Counter()
+        self.canonicalize = lru_cache(maxsize=cache_size)(self.canonical)
+
+    def canonical(self, url: str) -> CanonicalUrl | None:
+        """Return the canonical form of the `url`, `None` if it isn't
+        an HTTP(S) URL. URLs without a scheme are taken as `http`.
+        """
+        parts: SplitResult | None = self.split(url.strip())
+        if parts is None:
+            return None
+
+        try:
+            hostname: str = parts.hostname or ""
+            port: int | None = parts.port
+        except ValueError:
+            self.hits["invalid"] += 1
+            return None
+        if not hostname:
+            self.hits["invalid"] += 1
+            return None
+
+        if parts.username is not None or parts.password is not None:
+            self.hits["userinfo"] += 1
+        host: str = hostname.rstrip(".")
+        if ":" in host:
+            # IPv6 address
+            host = f"[{host}]"
+        if port is not None and port != DEFAULT_PORTS[parts.scheme]:
+            host = f"{host}:{port}"
+        elif port is not None:
+            self.hits["default_port"] += 1
+        if (netloc := parts.netloc.rpartition("@")[2]) != netloc.lower():
+            self.hits["host_case"] += 1
+
+        path: str = self.normalize_path(parts.path)
+        query: str = self.filter_query(parts.query)
+        if parts.fragment or url.endswith("#"):
+            self.hits["fragment"] += 1
+
+        suffix: str = f"?{query}" if query else ""
+        if path != "/" and path.endswith("/"):
+            self.hits["trailing_slash"] += 1
+        return CanonicalUrl(
+            f"{parts.scheme}://{host}{path}{suffix}",
+            f"{host}{path.removesuffix('/')}{suffix}",
+            host,
+        )
+
+    def split(self, url: str) -> SplitResult | None:
+        """Split the `url` into its parts with a lowercase scheme,
+        `None` if it isn't an HTTP(S) URL
+        """
+        parts: SplitResult = urlsplit(url)
+        scheme: str = parts.scheme.lower()
+        if not parts.netloc and not url.startswith("//") and "://" not in url:
+            # HOST/PATH without a scheme, or HOST:PORT/PATH which splits
+            # into a scheme and a path starting with the port
+            if scheme and not PORT_RE.match(parts.path):
+                self.hits["scheme"] += 1
+                return None
+            parts, scheme = urlsplit(f"http://{url}"), "http"
+        elif not scheme and parts.netloc:
+            # a network-path reference, `//HOST/PATH`
+            scheme = "http"
+        if scheme not in DEFAULT_PORTS:
+            self.hits["scheme"] += 1
+            return None
+        if scheme != parts.scheme:
+            self.hits["scheme_case"] += 1
+        return parts._replace(scheme=scheme)
+
+    def normalize_path(self, path: str) -> str:
+        """Return the `path` with dot segments removed and its
+        percent-encoding normalized
+        """
+        if not path:
+            return "/"
+
+        normalized: str = normalize_escapes(path, PATH_SAFE)
+        if normalized != path:
+            self.hits["percent_encoding"] += 1
+        if "/." in normalized:
+            resolved: str = remove_dot_segments(normalized)
+            if resolved != normalized:
+                self.hits["dot_segments"] += 1
+            normalized = resolved
+        return normalized
+
+    def filter_query(self, query: str) -> str:
+        """Return the `query` without the dropped parameters, sorted by
+        name if the rules ask for it, with its percent-encoding normalized
+        """
+        if not query:
+            return ""
+
+        params: list[str] = []
+        for param in query.split("&"):
+            if not param:
+                continue
+            if self.dropped(unquote_plus(param.partition("=")[0]).lower()):
+                self.hits["query_params"] += 1
+                continue
+            params.append(param)
+
+        if self.rules.sort_params:
+            ordered: list[str] = sorted(
+                params, key=lambda param: param.partition("=")[0]
+            )
+            if ordered != params:
+                self.hits["query_order"] += 1
+            params = ordered
+
+        filtered: str = "&".join(params)
+        normalized: str = normalize_escapes(filtered, QUERY_SAFE)
+        if normalized != filtered:
+            self.hits["percent_encoding"] += 1
+        return normalized
+
+    def dropped(self, name: str) -> bool:
+        """Check if the query parameter `name` is dropped by the rules"""
+        if any(fnmatchcase(name, pattern) for pattern in self.strip):
+            return True
+        return bool(self.keep) and not any(
+            fnmatchcase(name, pattern) for pattern in self.keep
+        )
+
+    def key(self, url: str) -> str:
+        """Return the visited set key of the `url`,
+        the `url` itself if it isn't an HTTP(S) URL
+        """
+        canonical: CanonicalUrl | None = self.canonicalize(url)
+        return canonical.key if canonical is not None else url
+
+    def host(self, url: str) -> str:
+        """Return the host of the `url` with its port, empty
+        if it isn't an HTTP(S) URL
+        """
+        canonical: CanonicalUrl | None = self.canonicalize(url)
+        return canonical.host if canonical is not None else ""
+
+    def describe(self) -> str:
+        """Return a one-line summary of the cache and the rule hits"""
+        info = self.canonicalize.cache_info()
+        rules: str = ", ".join(
+            f"{rule} {count}" for rule, count in self.hits.most_common()
+        )
+        return (
+            f"{info.currsize} URLs cached, {info.hits} hits, "
+            f"{info.misses} misses; rules: {rules or 'none applied'}"
+        )
+
+
+def normalize_escapes(text: str, safe: str) -> str:
+    """Decode percent-encoded unreserved characters of the `text`,
+    uppercase the other escapes and encode characters not in `safe`
+    """
+    if "%" in text:
+        text = ESCAPE_RE.sub(decode_unreserved, text)
+    if text.isascii() and " " not in text:
+        # only unsafe ASCII characters are left to encode
+        if all(char.isalnum() or char in safe for char in text):
+            return text
+    return quote(text, safe=safe)
+
+
+def decode_unreserved(match: re.Match) -> str:
+    """Return the character of an escape if it's unreserved,
+    the escape with uppercase hex digits otherwise
+    """
+    char: str = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else match.group(0).upper()
+
+
+def remove_dot_segments(path: str) -> str:
+    """Resolve the `.` and `..` segments of an absolute `path`"""
+    segments: list[str] = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(segments) > 1:
+                segments.pop()
+        elif segment != ".":
+            segments.append(segment)
+    # a path ending with a dot segment names a directory
+    if path.endswith(("/.", "/..")):
+        segments.append("")
+    return "/".join(segments)
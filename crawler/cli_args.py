@@ -1,18 +1,105 @@
 import argparse
 from argparse import ArgumentParser
 
+from crawler.config import (
+    BLOOM_CAPACITY,
+    BLOOM_ERROR_RATE,
+    CACHE_SIZE_MB,
+    CIRCUIT_FAILURES,
+    CONNECT_TIMEOUT,
+    CRAWL_ORDER,
+    CRAWL_ORDERS,
+    DEDUP,
+    FRONTIER_SIZE,
+    INLINE_EXECUTOR,
+    MAX_BYTES,
+    MAX_CONCURRENCY_CEILING,
+    MAX_DURATION,
+    MAX_PAGE_BYTES,
+    MIN_CONCURRENCY,
+    PARSE_EXECUTORS,
+    READ_TIMEOUT,
+    RETRIES,
+    RETRY_BACKOFF,
+    TOTAL_TIMEOUT,
+    WORKERS,
+    SEED_CACHE_TTL,
+    VISITED_SET,
+)
+from crawler.dedup import DEDUP_MODES
+from crawler.visited import VISITED_SETS
+
 
 def create_parser() -> ArgumentParser:
     """Create and return a CLI argument parser with the following parameters
     - `url` - URL to crawl to, a required positional parameter
     - `-s`, `--sync` - synchronous mode, a flag
     - `-c`, `--concurrency` - limit concurrent requests, an optional integer argument
+    - `--min-concurrency`, `--max-concurrency` - bounds of the adaptive
+    per-host concurrency in asynchronous mode, optional integer arguments
+    - `--concurrency-trace` - write concurrency limit changes to a JSON file,
+    an optional argument
+    - `--workers` - crawl with several processes in asynchronous mode,
+    an optional integer argument
+    - `--frontier-size` - limit URLs waiting to be crawled, an optional integer argument
     - `-p`, `--page-limit` - limit number of pages to crawl, an optional integer argument
+    - `--max-bytes` - stop fetching pages once this many bytes of pages
+    are downloaded, an optional integer argument
+    - `--max-duration` - stop fetching pages after this many seconds,
+    an optional argument
+    - `--crawl-order` - order of the frontier: `bfs` or `score`,
+    an optional argument
+    - `--max-depth` - skip pages more links away from the root,
+    an optional integer argument
+    - `--prefer` - crawl URL paths matching a regular expression first
+    in `score` order, an optional argument, may be repeated
+    - `--keep-param` - keep only the query parameters matching a wildcard
+    pattern in canonical URLs, an optional argument, may be repeated
+    - `--strip-param` - drop the query parameters matching a wildcard
+    pattern from canonical URLs, an optional argument, may be repeated
+    - `--visited` - how to track visited URLs: `exact`, `fingerprint`
+    or `bloom`, an optional argument
+    - `--bloom-capacity`, `--bloom-error-rate` - Bloom filter sizing,
+    optional arguments
+    - `--parse-executor` - where to parse HTML in asynchronous mode:
+    `inline`, `process` or `thread`, an optional argument
+    - `--stream-parse` - parse pages while they're downloaded
+    in asynchronous mode, a flag
+    - `--max-page-bytes` - skip larger pages, an optional integer argument
+    - `--connect-timeout`, `--read-timeout`, `--timeout` - request timeouts
+    in seconds, optional arguments
+    - `--retries` - retry transient failures, an optional integer argument
+    - `--retry-backoff` - base delay of the retries, an optional argument
+    - `--hedge` - send a second request when a response is slower than
+    this quantile in asynchronous mode, an optional argument
+    - `--circuit-failures` - stop requesting a host failing this many times
+    in a row for a while, an optional integer argument
+    - `--dedup` - detect copies of crawled pages: `off`, `exact`
+    or `near`, an optional argument
+    - `--state-db` - keep crawl state in an SQLite database, an optional argument
+    - `--resume` - continue an interrupted crawl from `--state-db`, a flag
+    - `--since` - recrawl pages of an earlier crawl from its JSON or NDJSON
+    report or its state database, an optional argument
+    - `--diff` - file name of the changes since the earlier crawl,
+    an optional argument
+    - `--digests` - write content digests of the pages to JSON and NDJSON
+    reports for a later `--since`, a flag
+    - `--cache` - revalidate pages cached in an SQLite database, an optional argument
+    - `--cache-size` - limit the cache size in megabytes, an optional integer argument
+    - `--sitemaps` - seed the frontier from sitemaps and obey robots.txt, a flag
+    - `--seed-cache` - reuse robots.txt and sitemap URLs cached in a JSON file,
+    an optional argument
+    - `--metrics` - write phase timings and throughput to a JSON
+    or a Prometheus text file, an optional argument
     - `-v`, `--verbose` - print CLI report, an optional parameter
     - `--csv` - specifies whether to write a report in a CSV file,
     an optional argument
     - `--json` - specifies whether to write a report in a JSON file,
     an optional argument
+    - `--ndjson` - specifies whether to write a report in an NDJSON file,
+    an optional argument
+    - `--gzip` - specifies whether to compress report files, an optional argument
+    - `--link-graph` - add link graph metrics to the reports, a flag
     - `--fname` - specifies a file name to write a report to
     """
     # create an argument parser
@@ -36,12 +123,296 @@ def create_parser() -> ArgumentParser:
         type=int,
         help="the maximum number of pages to crawl, integer (default is 10)",
     )
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        default=MAX_BYTES,
+        help="stop fetching pages once this many bytes of pages are "
+        "downloaded, downloads in flight stop, integer, 0 for no limit "
+        f"(default is {MAX_BYTES})",
+    )
+    parser.add_argument(
+        "--max-duration",
+        type=float,
+        default=MAX_DURATION,
+        metavar="SECONDS",
+        help="stop fetching pages this many seconds after the crawl "
+        "started, the fetches in flight finish, 0 for no limit "
+        f"(default is {MAX_DURATION:g})",
+    )
     # concurrency limit
     parser.add_argument(
         "-c",
         "--concurrency",
         type=int,
-        help="the maximum number of concurrent requests, integer (default is 3)",
+        help="the maximum number of concurrent requests, integer, the initial "
+        "per-host concurrency in asynchronous mode (default is 3)",
+    )
+    # adaptive concurrency bounds
+    parser.add_argument(
+        "--min-concurrency",
+        type=int,
+        default=MIN_CONCURRENCY,
+        help="the lowest per-host concurrency the crawler backs off to, "
+        f"integer, asynchronous mode only (default is {MIN_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=MAX_CONCURRENCY_CEILING,
+        help="the highest per-host concurrency the crawler grows to, "
+        "integer, asynchronous mode only "
+        f"(default is {MAX_CONCURRENCY_CEILING})",
+    )
+    parser.add_argument(
+        "--concurrency-trace",
+        metavar="PATH",
+        help="write per-host concurrency limit changes to a JSON file",
+    )
+    # crawler processes
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="the number of crawler processes, each crawling a hash "
+        "partition of the site URLs, integer, asynchronous mode only, "
+        f"concurrency limits apply per process (default is {WORKERS})",
+    )
+    # frontier queue limit
+    parser.add_argument(
+        "--frontier-size",
+        type=int,
+        default=FRONTIER_SIZE,
+        help="the maximum number of URLs waiting to be crawled, integer, "
+        f"0 for no limit (default is {FRONTIER_SIZE})",
+    )
+    # frontier order
+    parser.add_argument(
+        "--crawl-order",
+        choices=CRAWL_ORDERS,
+        default=CRAWL_ORDER,
+        help="crawl URLs breadth-first by link depth or by a score of links "
+        "found to them, link and path depth and `--prefer` patterns "
+        f"(default is `{CRAWL_ORDER}`)",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="skip URLs more than this many links away from the root, "
+        "integer (default is no limit)",
+    )
+    parser.add_argument(
+        "--prefer",
+        action="append",
+        metavar="PATTERN",
+        help="crawl URLs whose path matches this regular expression first, "
+        "`score` order only, may be repeated",
+    )
+    # URL canonicalization
+    parser.add_argument(
+        "--keep-param",
+        action="append",
+        metavar="PATTERN",
+        help="keep only the query parameters whose name matches this "
+        "wildcard pattern, e.g. `page`, may be repeated "
+        "(default is to keep all but tracking parameters)",
+    )
+    parser.add_argument(
+        "--strip-param",
+        action="append",
+        metavar="PATTERN",
+        help="also drop the query parameters whose name matches this "
+        "wildcard pattern, e.g. `sort*`, may be repeated",
+    )
+    # visited set
+    parser.add_argument(
+        "--visited",
+        choices=list(VISITED_SETS),
+        default=VISITED_SET,
+        help="track visited URLs in an exact set, as 64-bit fingerprints "
+        f"or in a fixed-size Bloom filter (default is `{VISITED_SET}`)",
+    )
+    parser.add_argument(
+        "--bloom-capacity",
+        type=int,
+        default=BLOOM_CAPACITY,
+        help="the number of URLs the Bloom filter is sized for, integer "
+        f"(default is {BLOOM_CAPACITY})",
+    )
+    parser.add_argument(
+        "--bloom-error-rate",
+        type=float,
+        default=BLOOM_ERROR_RATE,
+        help="the Bloom filter false positive rate, float "
+        f"(default is {BLOOM_ERROR_RATE})",
+    )
+    # HTML parsing executor
+    parser.add_argument(
+        "--parse-executor",
+        choices=PARSE_EXECUTORS,
+        default=INLINE_EXECUTOR,
+        help="parse HTML on the event loop (`inline`), in a process pool "
+        "or in a thread pool, asynchronous mode only (default is `inline`)",
+    )
+    parser.add_argument(
+        "--stream-parse",
+        help="parse pages on the event loop as their chunks are downloaded, "
+        "asynchronous mode only",
+        action="store_true",
+    )
+    # response body size limit
+    parser.add_argument(
+        "--max-page-bytes",
+        type=int,
+        default=MAX_PAGE_BYTES,
+        help="stop downloading pages larger than this many bytes, integer, "
+        f"0 for no limit (default is {MAX_PAGE_BYTES})",
+    )
+
+    # request timeouts, retries and hedging
+    request_group = parser.add_argument_group()
+    request_group.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=CONNECT_TIMEOUT,
+        metavar="SECONDS",
+        help="give up connecting to a server after this many seconds, "
+        f"0 for no limit (default is {CONNECT_TIMEOUT})",
+    )
+    request_group.add_argument(
+        "--read-timeout",
+        type=float,
+        default=READ_TIMEOUT,
+        metavar="SECONDS",
+        help="give up on a response sending nothing for this many seconds, "
+        f"0 for no limit (default is {READ_TIMEOUT})",
+    )
+    request_group.add_argument(
+        "--timeout",
+        type=float,
+        default=TOTAL_TIMEOUT,
+        metavar="SECONDS",
+        help="give up on a page taking longer than this many seconds, "
+        f"0 for no limit (default is {TOTAL_TIMEOUT})",
+    )
+    request_group.add_argument(
+        "--retries",
+        type=int,
+        default=RETRIES,
+        help="retry network errors, timeouts and 408/429/5xx responses "
+        f"this many times, integer (default is {RETRIES})",
+    )
+    request_group.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=RETRY_BACKOFF,
+        metavar="SECONDS",
+        help="retry `n` waits a random delay of up to this many seconds "
+        f"times 2^n (default is {RETRY_BACKOFF})",
+    )
+    request_group.add_argument(
+        "--hedge",
+        type=float,
+        default=0.0,
+        metavar="QUANTILE",
+        help="send a second request when a host is slower to respond than "
+        "this quantile of its recent responses, e.g. 0.95, asynchronous "
+        "mode only (default is 0, no hedging)",
+    )
+    request_group.add_argument(
+        "--circuit-failures",
+        type=int,
+        default=CIRCUIT_FAILURES,
+        help="stop requesting a host for a while once it fails this many "
+        f"requests in a row, integer, 0 to keep requesting "
+        f"(default is {CIRCUIT_FAILURES})",
+    )
+
+    # duplicate pages
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        default=DEDUP,
+        help="report copies of crawled pages as aliases without extracting "
+        "them, found by content hash (`exact`) or also by SimHash (`near`) "
+        f"(default is `{DEDUP}`)",
+    )
+
+    # crawl state
+    state_group = parser.add_argument_group()
+    state_group.add_argument(
+        "--state-db",
+        metavar="PATH",
+        help="keep the frontier, visited URLs and pages in an SQLite "
+        "database instead of memory",
+    )
+    state_group.add_argument(
+        "--resume",
+        help="continue an interrupted crawl saved in `--state-db`",
+        action="store_true",
+    )
+
+    # incremental recrawl
+    since_group = parser.add_argument_group()
+    since_group.add_argument(
+        "--since",
+        metavar="PATH",
+        help="fetch the pages of an earlier crawl from its JSON or NDJSON "
+        "report or its state database right away and report what changed",
+    )
+    since_group.add_argument(
+        "--diff",
+        metavar="PATH",
+        help="write added, removed and changed pages to a JSON file "
+        "(default is `report-diff.json`, named after `--fname`)",
+    )
+    since_group.add_argument(
+        "--digests",
+        action="store_true",
+        help="write content digests of the pages to JSON and NDJSON "
+        "reports, so a later `--since` doesn't extract unchanged pages "
+        "again (on with `--since`)",
+    )
+
+    # response cache
+    cache_group = parser.add_argument_group()
+    cache_group.add_argument(
+        "--cache",
+        metavar="PATH",
+        help="cache response validators and page data in an SQLite database, "
+        "unchanged pages of later crawls are not extracted again",
+    )
+    cache_group.add_argument(
+        "--cache-size",
+        type=int,
+        default=CACHE_SIZE_MB,
+        metavar="MB",
+        help="evict least recently used pages once the cache is larger, "
+        f"integer (default is {CACHE_SIZE_MB})",
+    )
+
+    # robots.txt and sitemaps
+    seed_group = parser.add_argument_group()
+    seed_group.add_argument(
+        "--sitemaps",
+        help="obey robots.txt and seed the frontier with page URLs "
+        "of the sitemaps it lists (or of `/sitemap.xml`)",
+        action="store_true",
+    )
+    seed_group.add_argument(
+        "--seed-cache",
+        metavar="PATH",
+        help="cache robots.txt and sitemap page URLs in a JSON file, "
+        f"later crawls reuse them for {SEED_CACHE_TTL // 3600} hours",
+    )
+
+    # instrumentation
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="write per-phase timing histograms and throughput to a file, "
+        "in Prometheus text format for `.prom` or `.txt` files, "
+        "JSON otherwise",
     )
 
     # reporting parameters
@@ -60,6 +431,23 @@ def create_parser() -> ArgumentParser:
     report_group.add_argument(
         "--json", help="write report to a JSON file", action="store_true"
     )
+    report_group.add_argument(
+        "--ndjson",
+        help="write report to a newline-delimited JSON file, one page per line",
+        action="store_true",
+    )
+    report_group.add_argument(
+        "--gzip",
+        help="compress report files with gzip",
+        action="store_true",
+    )
+    report_group.add_argument(
+        "--link-graph",
+        help="add in-degree, depth from the root, PageRank, orphan pages "
+        "and broken internal links to the reports, written once the crawl "
+        "is complete (requires NumPy)",
+        action="store_true",
+    )
     report_group.add_argument(
         "--fname",
         help="specify a file name to write a report to (default is `report`)",
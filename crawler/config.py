@@ -1,2 +1,105 @@
 MAX_CONCURRENCY: int = 3
+# adaptive per-host concurrency bounds
+MIN_CONCURRENCY: int = 1
+MAX_CONCURRENCY_CEILING: int = 16
 MAX_PAGES_TO_CRAWL: int = 10
+# budgets of downloaded page bytes and crawl seconds, 0 for no limit
+MAX_BYTES: int = 0
+MAX_DURATION: float = 0.0
+# crawler processes, each crawling a hash partition of the URLs,
+# idle shards check for the end of the crawl every poll interval
+WORKERS: int = 1
+SHARD_POLL_INTERVAL: float = 0.05
+# the maximum number of URLs waiting in the frontier queue
+FRONTIER_SIZE: int = 100_000
+# crawl orders of the frontier, the `score` order ranks URLs by links
+# found to them, link depth, path depth and preferred path patterns
+BFS_ORDER: str = "bfs"
+SCORE_ORDER: str = "score"
+CRAWL_ORDERS: tuple[str, ...] = (BFS_ORDER, SCORE_ORDER)
+CRAWL_ORDER: str = BFS_ORDER
+SCORE_INLINK_WEIGHT: float = 1.0
+SCORE_DEPTH_WEIGHT: float = 1.0
+SCORE_PATH_WEIGHT: float = 0.5
+SCORE_PATTERN_WEIGHT: float = 10.0
+# crawled pages waiting for the consumer of `iter_pages`,
+# crawling pauses while the buffer is full
+PAGE_BUFFER_SIZE: int = 64
+
+# larger pages are dropped while they're downloaded
+MAX_PAGE_BYTES: int = 10 * 2**20
+
+# request timeouts in seconds: opening a connection, waiting for the next
+# bytes of a response and a whole page fetch
+CONNECT_TIMEOUT: float = 10.0
+READ_TIMEOUT: float = 30.0
+TOTAL_TIMEOUT: float = 60.0
+# retries of transient failures after jittered exponential backoff,
+# the delay before retry `n` is random up to `RETRY_BACKOFF * 2 ** n`
+RETRIES: int = 2
+RETRY_BACKOFF: float = 0.5
+RETRY_MAX_BACKOFF: float = 10.0
+# hedged requests wait for this many response times of a host,
+# the recent `HEDGE_WINDOW` set the hedging delay
+HEDGE_MIN_SAMPLES: int = 20
+HEDGE_WINDOW: int = 200
+# a host failing this many times in a row is not requested
+# for `CIRCUIT_COOLDOWN` seconds
+CIRCUIT_FAILURES: int = 5
+CIRCUIT_COOLDOWN: float = 30.0
+
+# URL canonicalization, query parameters matching these patterns
+# (tracking and session IDs) are dropped, the canonical forms
+# of the most recent `CANONICAL_CACHE_SIZE` URLs are cached
+STRIP_PARAMS: tuple[str, ...] = (
+    "utm_*",
+    "fbclid",
+    "gclid",
+    "msclkid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "jsessionid",
+    "phpsessid",
+    "sessionid",
+)
+CANONICAL_CACHE_SIZE: int = 100_000
+
+# visited set
+VISITED_SET: str = "exact"
+BLOOM_CAPACITY: int = 10_000_000
+BLOOM_ERROR_RATE: float = 0.001
+
+# duplicate pages, near duplicates differ in at most
+# `SIMHASH_DISTANCE` bits of their SimHash
+DEDUP: str = "exact"
+SIMHASH_DISTANCE: int = 3
+
+# crawl state database writes committed per transaction
+STORE_BATCH_SIZE: int = 500
+# `--since` files read as crawl state databases instead of reports
+STATE_DB_EXTENSIONS: tuple[str, ...] = (".db", ".sqlite", ".sqlite3")
+
+# response cache size limit in megabytes
+CACHE_SIZE_MB: int = 256
+
+# sitemap seeding, cached robots.txt and sitemap URLs expire in a day
+MAX_SITEMAPS: int = 100
+SEED_CACHE_TTL: int = 86_400
+
+# HTML parsing executors
+INLINE_EXECUTOR: str = "inline"
+PROCESS_EXECUTOR: str = "process"
+THREAD_EXECUTOR: str = "thread"
+PARSE_EXECUTORS: tuple[str, ...] = (
+    INLINE_EXECUTOR,
+    PROCESS_EXECUTOR,
+    THREAD_EXECUTOR,
+)
+
+# link graph PageRank, iterated until the ranks change by less than
+# the tolerance
+PAGERANK_DAMPING: float = 0.85
+PAGERANK_TOLERANCE: float = 1e-6
+PAGERANK_MAX_ITERATIONS: int = 100
@@ -1,181 +1,696 @@
-from urllib.parse import urljoin, urlparse, ParseResult
+import codecs
+import re
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping
+from contextlib import closing
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urldefrag, urljoin
 
-from bs4 import BeautifulSoup as BS
-from bs4._typing import _AtMostOneElement
-from bs4.element import PageElement, Tag, ResultSet
+from lxml import etree
 
-import requests
-from requests import Response
+from crawler.budget import BudgetSpentError, CrawlBudget
+from crawler.canonical import DEFAULT_PORTS, Canonicalizer
+
+# BeautifulSoup is only loaded by the "bs4" backend
+# and requests by the sync engine
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup as BS
+    from bs4._typing import _AtMostOneElement
+    from requests import Response, Session
+
+    from crawler.retry import Timeouts
 
 
 PARSER: str = "lxml"
 
+# extraction backends: "lxml" walks the lxml tree directly,
+# "bs4" builds a BeautifulSoup tree on top of the same parser
+LXML_BACKEND: str = "lxml"
+BS4_BACKEND: str = "bs4"
+EXTRACTION_BACKEND: str = LXML_BACKEND
+
+# tags whose strings BeautifulSoup leaves out of `get_text`
+NON_TEXT_TAGS: frozenset[str] = frozenset({"script", "style", "template"})
+
+# response bodies are read in chunks of this size
+CHUNK_SIZE: int = 2**16
+# leading bytes of common non-HTML documents served as `text/html`
+NON_HTML_SIGNATURES: dict[bytes, str] = {
+    b"%PDF-": "PDF",
+    b"PK\x03\x04": "ZIP",
+    b"\x1f\x8b": "gzip",
+    b"\x89PNG": "PNG",
+    b"GIF8": "GIF",
+    b"\xff\xd8\xff": "JPEG",
+    b"RIFF": "RIFF",
+    b"\x00\x00\x01\x00": "ICO",
+}
+# byte order marks of UTF-16 documents, which contain NUL bytes
+UTF16_BOMS: tuple[bytes, ...] = (b"\xff\xfe", b"\xfe\xff")
+
+# documents are decoded from the encoding of their byte order mark,
+# the charset of the Content-Type header or a `<meta>` charset found
+# in their first `CHARSET_SNIFF_BYTES`, UTF-8 if there's none
+DEFAULT_ENCODING: str = "utf-8"
+CHARSET_SNIFF_BYTES: int = 1024
+BOM_ENCODINGS: dict[bytes, str] = {
+    b"\xef\xbb\xbf": "utf-8",
+    b"\xff\xfe": "utf-16le",
+    b"\xfe\xff": "utf-16be",
+}
+CHARSET_RE: re.Pattern = re.compile(
+    r"""charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE
+)
+META_CHARSET_RE: re.Pattern = re.compile(
+    rb"""<meta\s[^>]*?charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE
+)
+
+
+class FieldExtractor:
+    """Base class for a page field collected during a single tree walk.
+    Subclasses list the `tags` they are interested in and receive every
+    matching element in document order through `visit`.
+    """
+
+    field: str = ""
+    tags: frozenset[str] = frozenset()
+    # tags whose text is used, the rest only need their attributes
+    text_tags: frozenset[str] = frozenset()
+
+    def __init__(self, page_url: str = ""):
+        self.page_url: str = page_url
+        # set once the extractor doesn't need any more elements
+        self.done: bool = False
+
+    def visit(self, tag: str, element: Any, get_text: Callable[[Any], str]):
+        """Handle an element with one of the `tags`"""
+        raise NotImplementedError
+
+    def result(self) -> str | list[str]:
+        """Return the extracted field value"""
+        raise NotImplementedError
+
+
+class H1Extractor(FieldExtractor):
+    """Text of the first `h1` tag"""
+
+    field = "h1"
+    tags = frozenset({"h1"})
+    text_tags = frozenset({"h1"})
+
+    def __init__(self, page_url: str = ""):
+        super().__init__(page_url)
+        self.heading: str = ""
+
+    def visit(self, tag: str, element: Any, get_text: Callable[[Any], str]):
+        self.heading = get_text(element)
+        self.done = True
+
+    def result(self) -> str:
+        return self.heading
+
+
+class FirstParagraphExtractor(FieldExtractor):
+    """Text of the first paragraph, with priority given to the paragraph
+    following the first `main` tag
+    """
+
+    field = "first_paragraph"
+    tags = frozenset({"main", "p"})
+    text_tags = frozenset({"p"})
+
+    def __init__(self, page_url: str = ""):
+        super().__init__(page_url)
+        self.main_found: bool = False
+        self.first_paragraph: str | None = None
+        self.main_paragraph: str | None = None
+
+    def visit(self, tag: str, element: Any, get_text: Callable[[Any], str]):
+        if tag == "main":
+            self.main_found = True
+            return
+
+        if self.first_paragraph is None:
+            self.first_paragraph = get_text(element)
+        if self.main_found:
+            self.main_paragraph = get_text(element)
+            self.done = True
+
+    def result(self) -> str:
+        # fall back to the first paragraph of the document
+        # if there's no paragraph after the main tag or it is empty
+        return self.main_paragraph or self.first_paragraph or ""
+
+
+class LinkExtractor(FieldExtractor):
+    """Resolved URLs from the `attribute` of every tag in `tags`"""
+
+    attribute: str = ""
+
+    def __init__(self, page_url: str = ""):
+        super().__init__(page_url)
+        self.links: list[str] = []
+
+    def visit(self, tag: str, element: Any, get_text: Callable[[Any], str]):
+        url: str = str(element.get(self.attribute, "") or "")
+        if (link := resolve_url(self.page_url, url)) is not None:
+            self.links.append(link)
+
+    def result(self) -> list[str]:
+        return self.links
 
-def extract_page_data(html: str, page_url: str) -> dict[str, str | list[str]]:
+
+class AnchorExtractor(LinkExtractor):
+    """URLs from anchors"""
+
+    field = "outgoing_links"
+    tags = frozenset({"a"})
+    attribute = "href"
+
+
+class ImageExtractor(LinkExtractor):
+    """URLs from images"""
+
+    field = "image_urls"
+    tags = frozenset({"img"})
+    attribute = "src"
+
+
+# extractors used to build the page data, in the report field order
+PAGE_EXTRACTORS: tuple[type[FieldExtractor], ...] = (
+    H1Extractor,
+    FirstParagraphExtractor,
+    AnchorExtractor,
+    ImageExtractor,
+)
+
+
+def extract_page_data(
+    html: str | bytes,
+    page_url: str,
+    backend: str = EXTRACTION_BACKEND,
+    encoding: str | None = None,
+) -> dict[str, str | list[str]]:
     """Extract and return a dictionary with the following parameters:
     - `url` - current URL
     - `h1` - main heading text
     - `first_paragraph` - text block from the first paragraph
     - `outgoing_links` - a list of URLs from anchors
     - `image_urls` - a list of URLs from images
+
+    The HTML is parsed only once, all fields are collected in a single walk.
+    Downloaded HTML is parsed as bytes in its `encoding`, sniffed from
+    the document if it's not provided, without decoding it first.
     """
-    page_data: dict[str, str | list[str]] = {
-        "url": page_url,
-        "h1": get_h1_from_html(html),
-        "first_paragraph": get_first_paragraph_from_html(html),
-        "outgoing_links": get_urls_from_html(html, page_url),
-        "image_urls": get_images_from_html(html, page_url),
-    }
+    extractors: list[FieldExtractor] = [
+        extractor(page_url) for extractor in PAGE_EXTRACTORS
+    ]
+    run_extractors(html, extractors, backend, encoding)
+
+    page_data: dict[str, str | list[str]] = {"url": page_url}
+    for extractor in extractors:
+        page_data[extractor.field] = extractor.result()
 
     return page_data
 
 
+def run_extractors(
+    html: str | bytes,
+    extractors: list[FieldExtractor],
+    backend: str = EXTRACTION_BACKEND,
+    encoding: str | None = None,
+):
+    """Parse the HTML once and feed the matching elements to the `extractors`
+    in document order until all of them are done
+    """
+    tags: set[str] = set().union(*(extractor.tags for extractor in extractors))
+    elements: Iterable[tuple[str, Any]]
+    get_text: Callable[[Any], str]
+    if isinstance(html, bytes) and encoding is None:
+        encoding = sniff_encoding(html)
+
+    if backend == BS4_BACKEND:
+        from bs4 import BeautifulSoup as BS
+
+        soup: BS = BS(html, PARSER, from_encoding=encoding)
+        elements = ((tag.name, tag) for tag in soup.find_all(list(tags)))
+        get_text = extract_text_from_tag
+    elif backend == LXML_BACKEND:
+        root: etree._Element | None = parse_html(html, encoding)
+        elements = (
+            ((element.tag, element) for element in root.iter(*tags))
+            if root is not None
+            else ()
+        )
+        get_text = extract_text_from_element
+    else:
+        raise ValueError(f"unknown extraction backend: '{backend}'")
+
+    pending: list[FieldExtractor] = list(extractors)
+    for tag, element in elements:
+        for extractor in pending:
+            if tag in extractor.tags:
+                extractor.visit(tag, element, get_text)
+
+        # stop walking once every extractor has what it needs
+        if any(extractor.done for extractor in pending):
+            pending = [
+                extractor for extractor in pending if not extractor.done
+            ]
+            if not pending:
+                break
+
+
+def parse_html(
+    html: str | bytes, encoding: str | None = None
+) -> etree._Element | None:
+    """Parse the HTML into an lxml tree, return `None` for an empty document.
+    Bytes are decoded by the parser from the `encoding`.
+    """
+    if isinstance(html, bytes):
+        return etree.fromstring(html, html_parser(encoding))
+    try:
+        return etree.fromstring(html, etree.HTMLParser())
+    except ValueError:
+        # lxml refuses strings with an XML encoding declaration
+        return etree.fromstring(
+            html.encode("utf-8"), etree.HTMLParser(encoding="utf-8")
+        )
+
+
+def html_parser(
+    encoding: str | None, **options: Any
+) -> etree.HTMLParser | etree.HTMLPullParser:
+    """Create an lxml HTML parser decoding the `encoding`, UTF-8 if
+    libxml2 doesn't support it. A pull parser is created if `events`
+    are requested.
+    """
+    parser_class: type = (
+        etree.HTMLPullParser if "events" in options else etree.HTMLParser
+    )
+    try:
+        return parser_class(encoding=encoding or DEFAULT_ENCODING, **options)
+    except LookupError:
+        return parser_class(encoding=DEFAULT_ENCODING, **options)
+
+
+class StreamExtractor:
+    """Page data extraction from HTML fed in chunks as it's downloaded.
+    Elements are handed to the extractors as soon as the parser has what
+    they need: attributes on the start tag, text on the end tag. They're
+    handed over in the order of their start tags like in a tree walk, so
+    elements starting inside an element whose text is needed wait for
+    its end tag. Parsed elements are freed unless an element whose text
+    is needed is open.
+    """
+
+    def __init__(self, page_url: str, encoding: str | None = None):
+        self.page_url: str = page_url
+        self.reset(encoding)
+
+    def reset(self, encoding: str | None = None):
+        """Start over, e.g. when the download of the page is retried"""
+        self.extractors: list[FieldExtractor] = [
+            extractor(self.page_url) for extractor in PAGE_EXTRACTORS
+        ]
+        self.pending: list[FieldExtractor] = list(self.extractors)
+        self.tags: frozenset[str] = frozenset().union(
+            *(extractor.tags for extractor in self.extractors)
+        )
+        self.text_tags: frozenset[str] = frozenset().union(
+            *(extractor.text_tags for extractor in self.extractors)
+        )
+        self.open_text_tags: int = 0
+        # started elements in document order: tag, element and whether
+        # the extractors can have it
+        self.started: deque[list[Any]] = deque()
+        # the declared encoding may be set until the first chunk is fed,
+        # the document's own is sniffed from it otherwise
+        self.encoding: str | None = encoding
+        self.parser: etree.HTMLPullParser | None = None
+
+    def feed(self, chunk: bytes):
+        """Parse the next chunk of the document"""
+        if self.parser is None:
+            self.encoding = sniff_encoding(chunk, self.encoding)
+            self.parser = html_parser(self.encoding, events=("start", "end"))
+        self.parser.feed(chunk)
+        self.handle_events()
+
+    def close(self) -> dict[str, str | list[str]]:
+        """Finish parsing and return the page data"""
+        if self.parser is not None:
+            try:
+                self.parser.close()
+            except etree.XMLSyntaxError:
+                # a document without elements
+                pass
+            self.handle_events()
+
+        page_data: dict[str, str | list[str]] = {"url": self.page_url}
+        for extractor in self.extractors:
+            page_data[extractor.field] = extractor.result()
+        return page_data
+
+    def handle_events(self):
+        """Feed the parsed elements to the pending extractors"""
+        for event, element in self.parser.read_events():
+            tag: str = element.tag
+            is_text_tag: bool = tag in self.text_tags
+            if event == "start":
+                if tag in self.tags:
+                    self.started.append([tag, element, not is_text_tag])
+                if is_text_tag:
+                    self.open_text_tags += 1
+                self.visit_started()
+                continue
+
+            if is_text_tag:
+                for started in reversed(self.started):
+                    if started[1] is element:
+                        started[2] = True
+                        break
+                self.open_text_tags -= 1
+                self.visit_started()
+            # nothing needs the finished element and its earlier siblings
+            if not self.open_text_tags:
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    def visit_started(self):
+        """Hand the started elements to the pending extractors up to
+        the first one whose text isn't parsed yet
+        """
+        while self.started and self.started[0][2]:
+            tag, element, _ = self.started.popleft()
+            for extractor in self.pending:
+                if tag in extractor.tags:
+                    extractor.visit(tag, element, extract_text_from_element)
+            if any(extractor.done for extractor in self.pending):
+                self.pending = [
+                    extractor
+                    for extractor in self.pending
+                    if not extractor.done
+                ]
+
+
+def resolve_url(base_url: str, url: str) -> str | None:
+    """Resolve `url` against `base_url` without its fragment,
+    `None` if it isn't an HTTP(S) URL, e.g. `mailto:` or `javascript:`
+    """
+    resolved: str = urldefrag(urljoin(base_url, url.strip())).url
+    scheme: str = resolved.partition(":")[0].lower()
+    return resolved if scheme in DEFAULT_PORTS else None
+
+
 def get_urls_from_html(html: str, base_url: str) -> list[str]:
     """Find all anchors in the HTML and extract their references.
     Return a list of un-normalized URLs.
     """
-    soup: BS = BS(html, PARSER)
-    anchors: ResultSet[PageElement] = soup.find_all("a")
-    links: list[str] = []
-    for a in anchors:
-        if isinstance(a, Tag):
-            url: str = str(a.get("href", ""))
-            parsed_url: ParseResult = urlparse(url)
-            links.append(urljoin(base_url, parsed_url.path))
+    extractor = AnchorExtractor(base_url)
+    run_extractors(html, [extractor])
 
-    return links
+    return extractor.result()
 
 
 def get_images_from_html(html: str, base_url: str) -> list[str]:
     """Find all image tags in the HTML and extract their sources.
     Return a list of un-normalized URLs.
     """
-    soup: BS = BS(html, PARSER)
-    images: ResultSet[PageElement] = soup.find_all("img")
-    links: list[str] = []
-    for img in images:
-        if isinstance(img, Tag):
-            url: str = str(img.get("src", ""))
-            parsed_url: ParseResult = urlparse(url)
-            links.append(urljoin(base_url, parsed_url.path))
+    extractor = ImageExtractor(base_url)
+    run_extractors(html, [extractor])
 
-    return links
+    return extractor.result()
 
 
 def get_h1_from_html(html: str) -> str:
     """Extract heading text from the HTML"""
-    soup: BS = BS(html, PARSER)
-    heading: str = ""
-    h1 = soup.find("h1")
-    heading = extract_text_from_tag(h1)
+    extractor = H1Extractor()
+    run_extractors(html, [extractor])
 
-    return heading
+    return extractor.result()
 
 
 def get_first_paragraph_from_html(html: str) -> str:
     """Extract text from the first paragraph of the HTML"""
-    soup: BS = BS(html, PARSER)
-    paragraph: str = ""
-    main = soup.find("main")
-
-    # try to find paragraph inside main tag
-    if main is not None:
-        p = main.find_next("p")
-        paragraph = extract_text_from_tag(p)
-
-    # try to find paragraph outside of main tag
-    if not paragraph:
-        p = soup.find("p")
-        paragraph = extract_text_from_tag(p)
+    extractor = FirstParagraphExtractor()
+    run_extractors(html, [extractor])
 
-    return paragraph
+    return extractor.result()
 
 
-def extract_text_from_tag(tag: _AtMostOneElement) -> str:
+def extract_text_from_tag(tag: "_AtMostOneElement") -> str:
     """Check if the `tag` is of the correct type and extract inner text,
     trimming any spaces
     """
+    from bs4.element import Tag
+
     if isinstance(tag, Tag):
         return tag.get_text(strip=True)
 
     return ""
 
 
+def extract_text_from_element(element: etree._Element) -> str:
+    """Extract inner text of an lxml `element` the same way
+    `extract_text_from_tag` does: every string is trimmed, empty strings,
+    comments and script/style contents are skipped
+    """
+    strings: list[str] = []
+    # every string nested in a template is a template string for BeautifulSoup
+    if next(element.iterancestors("template"), None) is None:
+        collect_element_strings(element, strings)
+
+    return "".join(strings)
+
+
+def collect_element_strings(element: etree._Element, strings: list[str]):
+    """Append trimmed strings of the `element` subtree to `strings`"""
+    if element.tag in NON_TEXT_TAGS:
+        return
+    if element.text and (text := element.text.strip()):
+        strings.append(text)
+    for child in element:
+        # comments and processing instructions have no string tag
+        if isinstance(child.tag, str):
+            collect_element_strings(child, strings)
+        if child.tail and (tail := child.tail.strip()):
+            strings.append(tail)
+
+
 def normalize_url(url: str) -> str:
-    """Normalize received URL to format HOST/PATH"""
-    parsed_url: ParseResult = urlparse(url)
-    normalized_url: str = (
-        f"{parsed_url.netloc}{parsed_url.path.removesuffix('/')}"
-    )
+    """Normalize received URL to format HOST/PATH, followed by the query
+    if there's one, with the default canonicalization rules
+    """
+    return CANONICALIZER.key(url)
 
-    return normalized_url.lower()
 
+# canonical forms of URLs normalized without the rules of a crawl
+CANONICALIZER: Canonicalizer = Canonicalizer()
 
-def get_html(url: str) -> str:
-    """Send GET request to `url` and return its HTML or raise an exception"""
-    user_agent: str = "BootCrawler/1.0"
+USER_AGENT: str = "BootCrawler/1.0"
+
+
+def get_page(
+    url: str,
+    validators: dict[str, str] | None = None,
+    session: "Session | None" = None,
+    max_bytes: int = 0,
+    timeouts: "Timeouts | None" = None,
+    budget: CrawlBudget | None = None,
+) -> tuple[bytes | None, str, dict[str, str]]:
+    """Send GET request to `url`, conditional if cached `validators` are
+    provided, and return its undecoded HTML, its encoding and the response
+    validators. The HTML is `None` if the page wasn't modified. Reading
+    stops once the page is larger than `max_bytes` if it's set, takes
+    longer than the total of the `timeouts` or the byte `budget`
+    of the crawl is spent.
+    """
+    import requests
+
+    headers: dict[str, str] = {
+        "User-Agent": USER_AGENT,
+        **conditional_headers(validators),
+    }
+    deadline: float = (
+        time.monotonic() + timeouts.total
+        if timeouts is not None and timeouts.total
+        else 0.0
+    )
 
     # send GET request
     try:
-        resp: Response = requests.get(url, headers={"User-Agent": user_agent})
+        resp: Response = (session or requests).get(
+            url,
+            headers=headers,
+            stream=True,
+            timeout=(
+                timeouts.requests_timeout() if timeouts is not None else None
+            ),
+        )
     except Exception as e:
-        raise Exception(f"network error: {e}")
+        raise Exception(f"network error: {e}") from e
 
-    # catch errors
-    if (resp_code := resp.status_code) >= 400:
-        raise Exception(f"server responded with error: '{resp_code}'")
-    if not (content_type := resp.headers.get("content-type", "")).startswith(
-        "text/html"
-    ):
+    # the connection is released even if the body isn't read to the end
+    with closing(resp):
+        # reuse cached data of an unchanged page
+        if resp.status_code == 304 and validators:
+            return None, DEFAULT_ENCODING, validators
+
+        # catch errors
+        content_type: str = resp.headers.get("content-type", "")
+        check_response(resp.status_code, content_type)
+
+        limit: BodyLimit = BodyLimit(
+            max_bytes, resp.headers.get("content-length"), budget
+        )
+        chunks: list[bytes] = []
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            limit.check(chunk)
+            chunks.append(chunk)
+            if deadline and time.monotonic() > deadline:
+                raise requests.Timeout(
+                    f"page took longer than {timeouts.total} seconds"
+                )
+        body: bytes = b"".join(chunks)
+
+        return (
+            body,
+            sniff_encoding(body, charset_from_content_type(content_type)),
+            response_validators(resp.headers),
+        )
+
+
+class ResponseStatusError(Exception):
+    """Error status of a response"""
+
+    def __init__(self, status: int):
+        super().__init__(f"server responded with error: '{status}'")
+        self.status: int = status
+
+
+def check_response(resp_code: int, content_type: str):
+    """Raise an exception if the response is an error or not HTML"""
+    if resp_code >= 400:
+        raise ResponseStatusError(resp_code)
+    if not content_type.startswith("text/html"):
         raise Exception(
             f"server responded with unexpected content-type: '{content_type}'"
         )
 
-    return resp.text
 
+class BodyLimit:
+    """Checks of a response body read in chunks: reading stops once
+    the body is larger than `max_bytes` or its first bytes show
+    it's not an HTML document. Every chunk is counted in the byte
+    `budget` of the crawl, and reading stops once it's spent.
+    """
 
-def crawl_page(
-    base_url: str,
-    max_pages_to_crawl: int,
-    current_url: str | None = None,
-    page_data: dict[str, dict[str, str | list[str]]] | None = None,
-) -> dict[str, dict[str, str | list[str]]]:
-    """Recursively traverse found URLs"""
-    # manage missing parts
-    if current_url is None:
-        current_url = base_url
-    if page_data is None:
-        page_data = {}
+    def __init__(
+        self,
+        max_bytes: int,
+        content_length: str | None = None,
+        budget: CrawlBudget | None = None,
+    ):
+        self.max_bytes: int = max_bytes
+        self.budget: CrawlBudget | None = budget
+        self.size: int = 0
+
+        # the body isn't read once the budget is spent
+        if budget is not None and budget.bytes_spent():
+            raise BudgetSpentError()
+
+        # the declared size is checked before reading
+        if (
+            max_bytes
+            and content_length
+            and content_length.isdigit()
+            and int(content_length) > max_bytes
+        ):
+            raise Exception(f"page is larger than {max_bytes} bytes")
+
+    def check(self, chunk: bytes):
+        """Check the next chunk of the body or raise an exception"""
+        # downloaded bytes count even if the page fails
+        if self.budget is not None and not self.budget.add_bytes(len(chunk)):
+            raise BudgetSpentError()
+        if not self.size and (kind := sniff_non_html(chunk)):
+            raise Exception(f"page content is not HTML: {kind}")
+
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise Exception(f"page is larger than {self.max_bytes} bytes")
+
+
+def sniff_non_html(head: bytes) -> str | None:
+    """Return the kind of a non-HTML document recognized from its first
+    bytes, `None` if it may be HTML
+    """
+    for signature, kind in NON_HTML_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+    # text documents have no NUL bytes, except for UTF-16
+    if b"\x00" in head[:1024] and not head.startswith(UTF16_BOMS):
+        return "binary"
 
-    # check if reached limit of pages to crawl
-    if max_pages_to_crawl and (len(page_data) == max_pages_to_crawl):
-        return page_data
+    return None
 
-    # make sure the current url is on the same domain as the base url
-    if urlparse(current_url).netloc != urlparse(base_url).netloc:
-        return page_data
-    # ignore already crawled pages
-    if (normalized_url := normalize_url(current_url)) in page_data:
-        return page_data
 
-    # retrieve the HTML
-    print(f"crawling: {current_url}")
+def sniff_encoding(head: bytes, declared: str | None = None) -> str:
+    """Return the encoding of a document from its byte order mark,
+    the `declared` charset of its Content-Type header or a `<meta>`
+    charset in its first bytes, UTF-8 if neither is a known encoding
+    """
+    for bom, encoding in BOM_ENCODINGS.items():
+        if head.startswith(bom):
+            return encoding
+    if declared and (encoding := known_encoding(declared)):
+        return encoding
+    if match := META_CHARSET_RE.search(head, 0, CHARSET_SNIFF_BYTES):
+        if encoding := known_encoding(match[1].decode("ascii")):
+            return encoding
+
+    return DEFAULT_ENCODING
+
+
+def known_encoding(label: str) -> str | None:
+    """Return the encoding label if Python can decode it, `None` if not"""
+    label = label.strip().lower()
     try:
-        html: str = get_html(current_url)
-    except Exception as e:
-        print(f"error crawling {current_url}: {e}")
-        return page_data
+        codecs.lookup(label)
+    except LookupError:
+        return None
+    return label
 
-    # extract and store page data
-    page_data[normalized_url] = extract_page_data(html, current_url)
 
-    # crawl each URL on the page
-    for url in page_data[normalized_url]["outgoing_links"]:
-        page_data = crawl_page(
-            base_url=base_url,
-            max_pages_to_crawl=max_pages_to_crawl,
-            current_url=url,
-            page_data=page_data,
-        )
+def charset_from_content_type(content_type: str) -> str | None:
+    """Return the charset of a Content-Type header value or `None`"""
+    match: re.Match | None = CHARSET_RE.search(content_type)
+    return match[1] if match else None
 
-    return page_data
+
+def conditional_headers(validators: dict[str, str] | None) -> dict[str, str]:
+    """Build conditional request headers from cached response validators"""
+    headers: dict[str, str] = {}
+    if not validators:
+        return headers
+
+    if etag := validators.get("etag"):
+        headers["If-None-Match"] = etag
+    if last_modified := validators.get("last_modified"):
+        headers["If-Modified-Since"] = last_modified
+
+    return headers
+
+
+def response_validators(headers: Mapping[str, str]) -> dict[str, str]:
+    """Extract `ETag` and `Last-Modified` validators from response headers"""
+    validators: dict[str, str] = {}
+    if etag := headers.get("etag"):
+        validators["etag"] = etag
+    if last_modified := headers.get("last-modified"):
+        validators["last_modified"] = last_modified
+
+    return validators
@@ -0,0 +1,185 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+# deduplication modes
+NO_DEDUP: str = "off"
+EXACT_DEDUP: str = "exact"
+NEAR_DEDUP: str = "near"
+DEDUP_MODES: tuple[str, ...] = (NO_DEDUP, EXACT_DEDUP, NEAR_DEDUP)
+
+SIMHASH_BITS: int = 64
+# features counted per bit lane of `SPREAD_BYTES` sums
+MAX_FEATURES: int = 0xFFFF
+
+TAG_RE: re.Pattern = re.compile(r"<[^>]*>")
+WORD_RE: re.Pattern = re.compile(r"\w+")
+
+# bits of every byte spread to 16-bit lanes, adding spread bytes
+# counts the set bits of each position at once
+SPREAD_BYTES: list[int] = [
+    sum(((byte >> bit) & 1) << (16 * bit) for bit in range(8))
+    for byte in range(256)
+]
+
+
+def content_hash(html: str | bytes) -> bytes:
+    """Return a digest identifying an exact copy of the document,
+    downloaded documents are hashed as they were received
+    """
+    if isinstance(html, str):
+        html = html.encode()
+    return hashlib.blake2b(html, digest_size=16).digest()
+
+
+def feature_hash(feature: str) -> bytes:
+    """Return the 64-bit hash of a SimHash feature"""
+    return hashlib.blake2b(
+        feature.encode(), digest_size=SIMHASH_BITS // 8
+    ).digest()
+
+
+def simhash(html: str) -> int:
+    """Return the 64-bit SimHash of word trigrams of the document text.
+    Similar documents have fingerprints differing in few bits.
+    """
+    words: list[str] = WORD_RE.findall(TAG_RE.sub(" ", html).lower())
+    # features are hashed with a keyless hash and the lowest hashes
+    # are kept, so fingerprints are the same in every process and run
+    features: bytes = b"".join(
+        sorted(
+            {
+                feature_hash(" ".join(shingle))
+                for shingle in zip(words, words[1:], words[2:])
+            }
+        )[:MAX_FEATURES]
+    )
+    count: int = len(features) // 8
+    if not count:
+        return 0
+
+    fingerprint: int = 0
+    for position in range(8):
+        # set bits of every bit of the byte at this position
+        lanes: int = sum(map(SPREAD_BYTES.__getitem__, features[position::8]))
+        for bit in range(8):
+            if ((lanes >> (16 * bit)) & 0xFFFF) * 2 > count:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+class SimHashIndex:
+    """Index of SimHash fingerprints finding one within `max_distance`
+    differing bits. Fingerprints are split into `max_distance + 1` bands,
+    a near duplicate matches at least one band exactly.
+    """
+
+    def __init__(self, max_distance: int):
+        self.max_distance: int = max_distance
+        self.band_bits: int = SIMHASH_BITS // (max_distance + 1)
+        self.band_mask: int = (1 << self.band_bits) - 1
+        self.bands: dict[tuple[int, int], list[tuple[int, str]]] = {}
+
+    def band_keys(self, fingerprint: int) -> list[tuple[int, int]]:
+        return [
+            (band, (fingerprint >> (band * self.band_bits)) & self.band_mask)
+            for band in range(self.max_distance + 1)
+        ]
+
+    def find(self, fingerprint: int) -> str | None:
+        """Return the URL of a near duplicate or `None`"""
+        for key in self.band_keys(fingerprint):
+            for candidate, url in self.bands.get(key, ()):
+                if (candidate ^ fingerprint).bit_count() <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint: int, url: str):
+        for key in self.band_keys(fingerprint):
+            self.bands.setdefault(key, []).append((fingerprint, url))
+
+
+@dataclass(slots=True)
+class ContentFingerprint:
+    digest: bytes
+    simhash: int | None = None
+
+
+class DuplicateIndex:
+    """Index of downloaded documents finding copies of crawled pages
+    under other URLs before they are extracted. Exact copies are found
+    by content hash, near duplicates by SimHash if `near` is set.
+    """
+
+    def __init__(self, near: bool = False, max_distance: int = 3):
+        self.near: bool = near
+        self.digests: dict[bytes, str] = {}
+        self.simhashes: SimHashIndex = SimHashIndex(max_distance)
+        self.duplicates: int = 0
+
+    def fingerprint(
+        self, html: str | bytes, encoding: str = "utf-8"
+    ) -> ContentFingerprint:
+        """Return the fingerprint of the document, undecoded documents
+        are only decoded from their `encoding` for the SimHash
+        """
+        near: int | None = None
+        if self.near:
+            near = simhash(
+                html.decode(encoding, errors="replace")
+                if isinstance(html, bytes)
+                else html
+            )
+        return ContentFingerprint(content_hash(html), near)
+
+    def find(self, fingerprint: ContentFingerprint) -> str | None:
+        """Return the URL of the crawled page the document duplicates
+        or `None` if it's new
+        """
+        url: str | None = self.digests.get(fingerprint.digest)
+        if url is None and fingerprint.simhash is not None:
+            url = self.simhashes.find(fingerprint.simhash)
+        if url is not None:
+            self.duplicates += 1
+        return url
+
+    def add(self, fingerprint: ContentFingerprint, url: str):
+        """Remember the document of an extracted page"""
+        self.digests.setdefault(fingerprint.digest, url)
+        if fingerprint.simhash is not None:
+            self.simhashes.add(fingerprint.simhash, url)
+
+    def describe(self) -> str:
+        """Return a short summary of found duplicates"""
+        kind: str = "exact or near" if self.near else "exact"
+        return (
+            f"{self.duplicates} {kind} duplicates of {len(self.digests)} pages"
+        )
+
+
+def alias_page(url: str, canonical_url: str) -> dict[str, str | list[str]]:
+    """Return report data of a page duplicating the `canonical_url` page,
+    its data is only reported for the canonical page
+    """
+    return {
+        "url": url,
+        "h1": "",
+        "first_paragraph": "",
+        "outgoing_links": [],
+        "image_urls": [],
+        "alias_of": canonical_url,
+    }
+
+
+def create_duplicate_index(
+    mode: str, max_distance: int
+) -> DuplicateIndex | None:
+    """Create a duplicate index of the given `mode`,
+    `None` if duplicates aren't detected
+    """
+    if mode == NO_DEDUP:
+        return None
+    if mode in (EXACT_DEDUP, NEAR_DEDUP):
+        return DuplicateIndex(mode == NEAR_DEDUP, max_distance)
+
+    raise ValueError(f"unknown deduplication mode: '{mode}'")
@@ -0,0 +1,246 @@
+import asyncio
+import heapq
+import re
+from asyncio import Queue
+from collections.abc import Callable, Iterable
+from urllib.parse import urlparse
+
+from crawler.config import (
+    BFS_ORDER,
+    SCORE_DEPTH_WEIGHT,
+    SCORE_INLINK_WEIGHT,
+    SCORE_PATH_WEIGHT,
+    SCORE_ORDER,
+    SCORE_PATTERN_WEIGHT,
+)
+from crawler.visited import VisitedSet
+
+# score of a URL from the URL, its link depth and the number of links
+# to it found so far, URLs with higher scores are crawled first
+Scorer = Callable[[str, int, int], float]
+
+# replaced queue entries kept before the queue is rebuilt without them
+STALE_ENTRIES: int = 1024
+
+
+class UrlScorer:
+    """Score of the `score` crawl order. URLs found on more pages come
+    first, URLs further from the root, by links or by path segments,
+    come later, and URLs whose path matches one of the `patterns`
+    come before the others.
+    """
+
+    def __init__(
+        self,
+        patterns: Iterable[str] = (),
+        inlink_weight: float = SCORE_INLINK_WEIGHT,
+        depth_weight: float = SCORE_DEPTH_WEIGHT,
+        path_weight: float = SCORE_PATH_WEIGHT,
+        pattern_weight: float = SCORE_PATTERN_WEIGHT,
+    ):
+        self.patterns: list[re.Pattern] = [
+            re.compile(pattern) for pattern in patterns
+        ]
+        self.inlink_weight: float = inlink_weight
+        self.depth_weight: float = depth_weight
+        self.path_weight: float = path_weight
+        self.pattern_weight: float = pattern_weight
+
+    def __call__(self, url: str, depth: int, inlinks: int) -> float:
+        path: str = urlparse(url).path.strip("/")
+        segments: int = path.count("/") + 1 if path else 0
+        matches: int = sum(
+            1 for pattern in self.patterns if pattern.search(f"/{path}")
+        )
+        return (
+            self.inlink_weight * inlinks
+            - self.depth_weight * depth
+            - self.path_weight * segments
+            + self.pattern_weight * matches
+        )
+
+
+class Frontier:
+    """Deduplicating bounded priority queue of URLs waiting to be
+    crawled. Every URL is accepted at most once, so the queue grows with
+    the number of unique URLs instead of the number of links found.
+    URLs are crawled breadth-first by their link depth from the seeds,
+    or by descending score if there's a `scorer`. URLs deeper than
+    `max_depth` aren't crawled.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        visited: VisitedSet | None = None,
+        max_depth: int | None = None,
+        scorer: Scorer | None = None,
+    ):
+        self.maxsize: int = maxsize
+        self.max_depth: int | None = max_depth
+        self.scorer: Scorer | None = scorer
+        # heap of priorities, insertion sequences and normalized URLs
+        self.pending: list[tuple[float, int, str]] = []
+        # sequence, URL, depth and links found of every queued URL,
+        # heap entries replaced by a later sequence are skipped
+        self.entries: dict[str, tuple[int, str, int, int]] = {}
+        self.sequence: int = 0
+        # normalized URLs that were ever scheduled
+        self.visited: VisitedSet = (
+            visited if visited is not None else VisitedSet()
+        )
+        # URLs rejected because the queue was full
+        self.dropped: int = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, url: str, normalized_url: str, depth: int = 0) -> bool:
+        """Schedule `url`, found `depth` links away from the seeds,
+        for crawling unless it was scheduled before, it's too deep
+        or the queue is full. Return `True` if the URL was queued.
+        """
+        # a URL too deep isn't reserved, it may be linked closer
+        # to the seeds
+        if self.too_deep(depth):
+            return False
+
+        # the URL is reserved on schedule and stays reserved even if
+        # it's dropped, the frontier doesn't come back to the URLs
+        # it couldn't hold
+        if not self.visited.reserve(normalized_url):
+            self.relink(normalized_url, depth)
+            return False
+
+        if self.maxsize and len(self) >= self.maxsize:
+            self.dropped += 1
+            return False
+
+        # seeds aren't linked from a page
+        self.push(url, normalized_url, depth, int(depth > 0))
+        return True
+
+    def too_deep(self, depth: int) -> bool:
+        """Check if URLs `depth` links away from the seeds are skipped"""
+        return self.max_depth is not None and depth > self.max_depth
+
+    def put_reserved(self, url: str, normalized_url: str, depth: int = 0):
+        """Queue a URL that is already reserved in the visited set,
+        e.g. a pending URL of a resumed crawl
+        """
+        self.push(url, normalized_url, depth)
+
+    def relink(self, normalized_url: str, depth: int):
+        """Count another link found to a URL, a queued URL is moved up
+        if its score grows or it's found closer to the seeds
+        """
+        if (entry := self.entries.get(normalized_url)) is None:
+            return
+
+        sequence, url, queued_depth, inlinks = entry
+        if self.scorer is not None or depth < queued_depth:
+            self.push(
+                url, normalized_url, min(depth, queued_depth), inlinks + 1
+            )
+        else:
+            self.entries[normalized_url] = (
+                sequence,
+                url,
+                queued_depth,
+                inlinks + 1,
+            )
+
+    def priority(self, url: str, depth: int, inlinks: int) -> float:
+        """Return the sort key of a URL, lower keys are crawled first"""
+        if self.scorer is None:
+            return depth
+        return -self.scorer(url, depth, inlinks)
+
+    def push(
+        self, url: str, normalized_url: str, depth: int = 0, inlinks: int = 0
+    ):
+        """Add a URL to the queue, replacing its earlier entry"""
+        self.sequence += 1
+        self.entries[normalized_url] = (self.sequence, url, depth, inlinks)
+        heapq.heappush(
+            self.pending,
+            (
+                self.priority(url, depth, inlinks),
+                self.sequence,
+                normalized_url,
+            ),
+        )
+
+        # rebuild the heap once replaced entries pile up
+        if len(self.pending) > 2 * len(self.entries) + STALE_ENTRIES:
+            self.pending = [
+                item for item in self.pending if self.is_current(item)
+            ]
+            heapq.heapify(self.pending)
+
+    def is_current(self, item: tuple[float, int, str]) -> bool:
+        """Check if a heap item is the latest entry of its URL"""
+        entry: tuple[int, str, int, int] | None = self.entries.get(item[2])
+        return entry is not None and entry[0] == item[1]
+
+    def pop(self) -> tuple[str, str, int]:
+        """Return the next URL with its normalized form and depth"""
+        while not self.is_current(item := heapq.heappop(self.pending)):
+            pass
+        _, url, depth, _ = self.entries.pop(item[2])
+        return url, item[2], depth
+
+
+class AsyncFrontier(Frontier):
+    """Frontier served by asynchronous workers, which wait for new URLs
+    until every queued URL is processed
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        visited: VisitedSet | None = None,
+        max_depth: int | None = None,
+        scorer: Scorer | None = None,
+    ):
+        super().__init__(maxsize, visited, max_depth, scorer)
+        # one item for every queued URL, workers wait on it
+        self.queue: Queue[None] = asyncio.Queue()
+
+    def push(
+        self, url: str, normalized_url: str, depth: int = 0, inlinks: int = 0
+    ):
+        if normalized_url not in self.entries:
+            self.queue.put_nowait(None)
+        super().push(url, normalized_url, depth, inlinks)
+
+    def pop(self) -> tuple[str, str, int]:
+        self.queue.get_nowait()
+        return super().pop()
+
+    async def get(self) -> tuple[str, str, int]:
+        """Wait for the next URL and return it with its normalized form
+        and depth
+        """
+        await self.queue.get()
+        return super().pop()
+
+    def task_done(self):
+        """Mark the URL received from `get` as processed"""
+        self.queue.task_done()
+
+    async def join(self):
+        """Wait until every queued URL is processed"""
+        await self.queue.join()
+
+
+def create_scorer(order: str, patterns: Iterable[str] = ()) -> Scorer | None:
+    """Create the scorer of a crawl `order`, preferring URL paths
+    matching the `patterns`. Return `None` for breadth-first order.
+    """
+    if order == BFS_ORDER:
+        return None
+    if order == SCORE_ORDER:
+        return UrlScorer(patterns)
+
+    raise ValueError(f"unknown crawl order: '{order}'")
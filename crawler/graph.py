@@ -0,0 +1,366 @@
+from collections.abc import Collection, Iterator, Mapping
+from dataclasses import dataclass, fields
+from itertools import islice
+
+import numpy as np
+
+from crawler.config import (
+    PAGERANK_DAMPING,
+    PAGERANK_MAX_ITERATIONS,
+    PAGERANK_TOLERANCE,
+)
+from crawler.canonical import CanonicalUrl, Canonicalizer
+from crawler.crawl import CANONICALIZER
+from crawler.records import URL_ID_TYPE, PageRecords
+
+# depth of pages that can't be reached by links from the root
+UNREACHABLE: int = -1
+# target node of links leaving the host of the crawl
+EXTERNAL: int = -1
+
+
+class LinkGraph:
+    """Internal link graph of a crawl as a CSR adjacency matrix.
+    Nodes are normalized URLs, the keys of the `canonicalizer`
+    of the crawl: the crawled pages first, in the order
+    of their `page_data`, then link targets on the host of the crawl
+    that weren't crawled. The targets of node `i` are
+    `indices[indptr[i]:indptr[i + 1]]`, links to other hosts, repeated
+    links and links of a page to itself are dropped.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        pages: int,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        canonicalizer: Canonicalizer = CANONICALIZER,
+        nodes: dict[str, int] | None = None,
+    ):
+        self.urls: list[str] = urls
+        # nodes of the URLs
+        self.nodes: dict[str, int] = (
+            nodes
+            if nodes is not None
+            else {url: node for node, url in enumerate(urls)}
+        )
+        self.pages: int = pages
+        self.indptr: np.ndarray = indptr
+        self.indices: np.ndarray = indices
+        self.canonicalizer: Canonicalizer = canonicalizer
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @classmethod
+    def from_page_data(
+        cls,
+        page_data: Mapping[str, dict[str, str | list[str]]],
+        base_url: str,
+        canonicalizer: Canonicalizer = CANONICALIZER,
+    ) -> "LinkGraph":
+        """Build the graph of the outgoing links of pages crawled from
+        the `base_url` to its host, normalized by the `canonicalizer`
+        of the crawl
+        """
+        urls: list[str] = list(page_data)
+        nodes: dict[str, int] = {url: node for node, url in enumerate(urls)}
+        host: str = canonicalizer.host(base_url)
+        counts: np.ndarray
+        targets: np.ndarray
+        if isinstance(page_data, PageRecords):
+            counts, targets = record_links(
+                page_data, host, nodes, urls, canonicalizer
+            )
+        else:
+            counts, targets = page_links(
+                page_data, host, nodes, urls, canonicalizer
+            )
+        return cls.from_links(
+            urls, len(page_data), counts, targets, canonicalizer, nodes
+        )
+
+    @classmethod
+    def from_links(
+        cls,
+        urls: list[str],
+        pages: int,
+        counts: np.ndarray,
+        targets: np.ndarray,
+        canonicalizer: Canonicalizer = CANONICALIZER,
+        nodes: dict[str, int] | None = None,
+    ) -> "LinkGraph":
+        """Build the graph of the `urls` from the number of links of
+        each of the first `pages` nodes and their target nodes,
+        `EXTERNAL` for links to other hosts
+        """
+        size: int = len(urls)
+        sources: np.ndarray = np.repeat(np.arange(pages), counts)
+        targets = targets.astype(np.int64, copy=False)
+        # sorted unique edges are the rows of the matrix in order
+        keep: np.ndarray = (sources != targets) & (targets != EXTERNAL)
+        edges: np.ndarray = np.unique(sources[keep] * size + targets[keep])
+        sources, targets = np.divmod(edges, size)
+
+        indptr: np.ndarray = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+        return cls(urls, pages, indptr, targets, canonicalizer, nodes)
+
+    @property
+    def links(self) -> int:
+        return len(self.indices)
+
+    def node(self, normalized_url: str) -> int | None:
+        """Return the node of the URL, `None` if it's not in the graph"""
+        return self.nodes.get(normalized_url)
+
+    def out_degree(self) -> np.ndarray:
+        """Return the number of distinct links of every node"""
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        """Return the number of pages linking to every node"""
+        return np.bincount(self.indices, minlength=len(self))
+
+    def neighbors(self, nodes: np.ndarray) -> np.ndarray:
+        """Return the link targets of all the `nodes`"""
+        starts: np.ndarray = self.indptr[nodes]
+        counts: np.ndarray = self.indptr[nodes + 1] - starts
+        # shift a running position to the row of each node
+        offsets: np.ndarray = np.repeat(
+            starts - np.cumsum(counts) + counts, counts
+        )
+        return self.indices[offsets + np.arange(counts.sum())]
+
+    def depths(self, root_url: str) -> np.ndarray:
+        """Return the number of links to follow from the root to every
+        node, found by a breadth-first search expanding a whole level
+        at once
+        """
+        depth: np.ndarray = np.full(len(self), UNREACHABLE, dtype=np.int64)
+        if (root := self.node(self.canonicalizer.key(root_url))) is None:
+            return depth
+
+        depth[root] = 0
+        level: np.ndarray = np.array([root])
+        distance: int = 0
+        while level.size:
+            distance += 1
+            targets: np.ndarray = self.neighbors(level)
+            level = np.unique(targets[depth[targets] == UNREACHABLE])
+            depth[level] = distance
+        return depth
+
+    def pagerank(
+        self,
+        damping: float = PAGERANK_DAMPING,
+        tolerance: float = PAGERANK_TOLERANCE,
+        max_iterations: int = PAGERANK_MAX_ITERATIONS,
+    ) -> np.ndarray:
+        """Return the PageRank of every node by power iteration, the rank
+        of nodes without links is spread evenly over all nodes
+        """
+        size: int = len(self)
+        if not size:
+            return np.zeros(0)
+
+        out_degree: np.ndarray = self.out_degree()
+        sources: np.ndarray = np.repeat(np.arange(size), out_degree)
+        dangling: np.ndarray = out_degree == 0
+        rank: np.ndarray = np.full(size, 1 / size)
+        for _ in range(max_iterations):
+            shares: np.ndarray = rank / np.maximum(out_degree, 1)
+            received: np.ndarray = np.bincount(
+                self.indices, weights=shares[sources], minlength=size
+            )
+            updated: np.ndarray = (1 - damping) / size + damping * (
+                received + rank[dangling].sum() / size
+            )
+            change: float = np.abs(updated - rank).sum()
+            rank = updated
+            if change < tolerance:
+                break
+        return rank
+
+    def broken_links(self, failed: Collection[str]) -> np.ndarray:
+        """Return the number of links of every crawled page to pages
+        whose URLs failed to be crawled
+        """
+        broken: np.ndarray = np.zeros(len(self), dtype=np.int64)
+        # crawled pages didn't fail, only link targets can
+        broken[self.pages :] = np.fromiter(
+            (url in failed for url in islice(self.urls, self.pages, None)),
+            dtype=bool,
+            count=len(self) - self.pages,
+        )
+        totals: np.ndarray = np.zeros(self.links + 1, dtype=np.int64)
+        np.cumsum(broken[self.indices], out=totals[1:])
+        return (totals[self.indptr[1:]] - totals[self.indptr[:-1]])[
+            : self.pages
+        ]
+
+    def analyze(
+        self, root_url: str, failed: Collection[str] = ()
+    ) -> "LinkAnalysis":
+        """Compute link metrics of the crawled pages"""
+        in_degree: np.ndarray = self.in_degree()[: self.pages]
+        depth: np.ndarray = self.depths(root_url)[: self.pages]
+        orphan: np.ndarray = in_degree == 0
+        root: int | None = self.node(self.canonicalizer.key(root_url))
+        if root is not None and root < self.pages:
+            orphan[root] = False
+        return LinkAnalysis(
+            in_degree,
+            depth,
+            self.pagerank()[: self.pages],
+            orphan,
+            self.broken_links(failed),
+            self.links,
+        )
+
+
+@dataclass
+class LinkAnalysis:
+    """Link metrics of crawled pages, in the order of their `page_data`.
+    Orphan pages are crawled pages no other page links to, found by
+    sitemaps or an earlier crawl, `depth` is `UNREACHABLE` for pages
+    the root doesn't lead to.
+    """
+
+    in_degree: np.ndarray
+    depth: np.ndarray
+    pagerank: np.ndarray
+    orphan: np.ndarray
+    broken_links: np.ndarray
+    # number of distinct links between all pages
+    links: int = 0
+
+    def columns(self) -> Iterator[dict[str, int | float | bool]]:
+        """Yield the report columns of every page"""
+        for in_degree, depth, pagerank, orphan, broken_links in zip(
+            self.in_degree.tolist(),
+            self.depth.tolist(),
+            self.pagerank.tolist(),
+            self.orphan.tolist(),
+            self.broken_links.tolist(),
+        ):
+            yield {
+                "in_degree": in_degree,
+                "depth": depth,
+                "pagerank": float(f"{pagerank:.6g}"),
+                "orphan": orphan,
+                "broken_links": broken_links,
+            }
+
+    def annotate(
+        self, page_data: Mapping[str, dict[str, str | list[str]]]
+    ) -> Iterator[tuple[str, dict[str, object]]]:
+        """Yield the pages the metrics were computed for with their
+        report columns added
+        """
+        for (normalized_url, page), columns in zip(
+            page_data.items(), self.columns()
+        ):
+            yield normalized_url, {**page, **columns}
+
+    def describe(self) -> str:
+        """Return a short summary of the link graph"""
+        reachable: np.ndarray = self.depth[self.depth != UNREACHABLE]
+        return (
+            f"{len(self.depth)} pages, {self.links} links, "
+            f"{int(self.orphan.sum())} orphan pages, "
+            f"{int(self.broken_links.sum())} broken links, "
+            f"maximum depth {int(reachable.max()) if reachable.size else 0}"
+        )
+
+
+# report columns of the link metrics
+GRAPH_COLUMNS: tuple[str, ...] = tuple(
+    field.name for field in fields(LinkAnalysis) if field.name != "links"
+)
+
+
+def add_node(
+    normalized_url: str, nodes: dict[str, int], urls: list[str]
+) -> int:
+    """Return the node of the URL, adding it if it's new"""
+    if (node := nodes.get(normalized_url)) is None:
+        node = nodes[normalized_url] = len(urls)
+        urls.append(normalized_url)
+    return node
+
+
+def link_node(
+    link: str,
+    host: str,
+    nodes: dict[str, int],
+    urls: list[str],
+    canonicalizer: Canonicalizer,
+) -> int:
+    """Return the node of a link to the `host`, adding it if it's new,
+    `EXTERNAL` for a link to another host
+    """
+    canonical: CanonicalUrl | None = canonicalizer.canonicalize(link)
+    if canonical is None or canonical.host != host:
+        return EXTERNAL
+    return add_node(canonical.key, nodes, urls)
+
+
+def page_links(
+    page_data: Mapping[str, dict[str, str | list[str]]],
+    host: str,
+    nodes: dict[str, int],
+    urls: list[str],
+    canonicalizer: Canonicalizer,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the number of links of every page and their target nodes,
+    adding nodes of the targets on the `host` that weren't crawled
+    """
+    # every distinct link URL is normalized once
+    link_nodes: dict[str, int] = {}
+    counts: list[int] = []
+    targets: list[int] = []
+    for page in page_data.values():
+        counts.append(len(page["outgoing_links"]))
+        for link in page["outgoing_links"]:
+            if (node := link_nodes.get(link)) is None:
+                node = link_nodes[link] = link_node(
+                    link, host, nodes, urls, canonicalizer
+                )
+            targets.append(node)
+    return (
+        np.array(counts, dtype=np.int64),
+        np.array(targets, dtype=np.int64),
+    )
+
+
+def record_links(
+    page_data: PageRecords,
+    host: str,
+    nodes: dict[str, int],
+    urls: list[str],
+    canonicalizer: Canonicalizer,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the number of links of every page record and their target
+    nodes, mapping the URL IDs the links are stored as to nodes at once
+    """
+    records = page_data.records.values()
+    counts: np.ndarray = np.fromiter(
+        (len(record.outgoing_links) for record in records),
+        dtype=np.int64,
+        count=len(page_data),
+    )
+    url_ids: np.ndarray = np.frombuffer(
+        b"".join(record.outgoing_links for record in records),
+        dtype=URL_ID_TYPE,
+    )
+
+    # every distinct link URL is normalized once
+    link_ids: np.ndarray = np.unique(url_ids)
+    link_nodes: np.ndarray = np.zeros(len(page_data.table), dtype=np.int64)
+    link_nodes[link_ids] = [
+        link_node(url, host, nodes, urls, canonicalizer)
+        for url in page_data.table.resolve(link_ids.tolist())
+    ]
+    return counts, link_nodes[url_ids]
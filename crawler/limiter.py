@@ -0,0 +1,251 @@
+import asyncio
+import json
+import time
+from asyncio import Condition
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# statuses telling that the server is overloaded
+BACKOFF_STATUSES: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+
+class Slot:
+    """Outcome of a request made in a limiter slot, filled in by the caller"""
+
+    def __init__(self):
+        self.status: int | None = None
+        self.ttfb: float | None = None
+        self.retry_after: str | None = None
+
+
+class HostLimit:
+    """Adaptive concurrency state of a single host"""
+
+    def __init__(self, limit: float):
+        self.limit: float = limit
+        self.in_flight: int = 0
+        # hedged requests in flight in the reserved hedging slots
+        self.hedges: int = 0
+        self.condition: Condition = asyncio.Condition()
+        # requests are held back until this time after `Retry-After`
+        self.blocked_until: float = 0.0
+        # smoothed and lowest time to first byte
+        self.ttfb: float | None = None
+        self.baseline_ttfb: float | None = None
+        # a single overload event only backs off once
+        self.backoff_until: float = 0.0
+
+
+class AdaptiveLimiter:
+    """Per-host concurrency limiter using additive increase and
+    multiplicative decrease (AIMD). The limit of a host grows by about
+    one request per round of successful responses and is cut by
+    `backoff_factor` on 429/5xx responses, timeouts or when the time to
+    first byte rises above `latency_factor` times its baseline.
+    `Retry-After` holds back new requests to the host. Hedged requests
+    use `hedge_slots` slots of their own, so they never wait for the slow
+    requests they race.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        floor: int,
+        ceiling: int,
+        backoff_factor: float = 0.5,
+        latency_factor: float = 2.0,
+        hedge_slots: int = 1,
+    ):
+        if not 1 <= floor <= ceiling:
+            raise ValueError(
+                "concurrency floor must be between 1 and the ceiling"
+            )
+
+        self.initial: float = float(min(max(initial, floor), ceiling))
+        self.floor: int = floor
+        self.ceiling: int = ceiling
+        self.backoff_factor: float = backoff_factor
+        self.latency_factor: float = latency_factor
+        self.hedge_slots: int = hedge_slots
+        self.hosts: dict[str, HostLimit] = {}
+
+        # limit changes: seconds since start, host, new limit, reason
+        self.started: float = time.monotonic()
+        self.trace: list[tuple[float, str, float, str]] = []
+
+    def host_limit(self, host: str) -> HostLimit:
+        """Return the state of the `host`, creating it on first use"""
+        if host not in self.hosts:
+            self.hosts[host] = HostLimit(self.initial)
+            self.record(host, self.initial, "start")
+        return self.hosts[host]
+
+    def record(self, host: str, limit: float, reason: str):
+        """Add a limit change to the trace"""
+        self.trace.append(
+            (
+                round(time.monotonic() - self.started, 3),
+                host,
+                round(limit, 2),
+                reason,
+            )
+        )
+
+    @asynccontextmanager
+    async def slot(
+        self, host: str, hedge: bool = False
+    ) -> AsyncIterator[Slot]:
+        """Wait for a free request slot of the `host`, or a hedging slot
+        for a `hedge`, and hold it, then adjust the host limit to
+        the outcome stored in the slot
+        """
+        await self.acquire(host, hedge)
+        slot: Slot = Slot()
+        timed_out: bool = False
+        cancelled: bool = False
+        try:
+            yield slot
+        except asyncio.TimeoutError:
+            timed_out = True
+            raise
+        except asyncio.CancelledError:
+            # e.g. the slower of hedged requests, it tells nothing
+            # about the host
+            cancelled = True
+            raise
+        finally:
+            await self.release(host, slot, timed_out, cancelled, hedge)
+
+    async def acquire(self, host: str, hedge: bool = False):
+        """Wait until the `host` has a free request slot,
+        or a free hedging slot for a `hedge`
+        """
+        state: HostLimit = self.host_limit(host)
+        async with state.condition:
+            while True:
+                if (delay := state.blocked_until - time.monotonic()) > 0:
+                    try:
+                        await asyncio.wait_for(state.condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                elif hedge and state.hedges < self.hedge_slots:
+                    break
+                elif not hedge and state.in_flight < int(state.limit):
+                    break
+                else:
+                    await state.condition.wait()
+            if hedge:
+                state.hedges += 1
+            else:
+                state.in_flight += 1
+
+    async def release(
+        self,
+        host: str,
+        slot: Slot,
+        timed_out: bool = False,
+        cancelled: bool = False,
+        hedge: bool = False,
+    ):
+        """Free the request or hedging slot and adjust the host limit
+        unless the request was cancelled
+        """
+        state: HostLimit = self.host_limit(host)
+        async with state.condition:
+            if hedge:
+                state.hedges -= 1
+            else:
+                state.in_flight -= 1
+            if not cancelled:
+                self.adjust(host, state, slot, timed_out)
+            state.condition.notify_all()
+
+    def adjust(self, host: str, state: HostLimit, slot: Slot, timed_out: bool):
+        """Apply AIMD to the host limit based on the request outcome"""
+        now: float = time.monotonic()
+
+        if slot.retry_after and (delay := parse_retry_after(slot.retry_after)):
+            state.blocked_until = max(state.blocked_until, now + delay)
+
+        reason: str = ""
+        if timed_out:
+            reason = "timeout"
+        elif slot.status in BACKOFF_STATUSES:
+            reason = f"status {slot.status}"
+        elif slot.ttfb is not None:
+            # track the smoothed time to first byte and its baseline
+            state.ttfb = (
+                slot.ttfb
+                if state.ttfb is None
+                else 0.8 * state.ttfb + 0.2 * slot.ttfb
+            )
+            state.baseline_ttfb = min(
+                state.baseline_ttfb or state.ttfb, state.ttfb
+            )
+            if state.ttfb > self.latency_factor * state.baseline_ttfb:
+                reason = "latency"
+        elif slot.status is None:
+            # the request failed before a response, e.g. connection error
+            reason = "error"
+
+        if reason:
+            # back off once per overload event
+            if now < state.backoff_until:
+                return
+            state.limit = max(self.floor, state.limit * self.backoff_factor)
+            state.backoff_until = now + max(state.ttfb or 0.0, 1.0)
+            self.record(host, state.limit, reason)
+            return
+
+        # grow by about one request per round of responses
+        if state.limit < self.ceiling:
+            previous: int = int(state.limit)
+            state.limit = min(self.ceiling, state.limit + 1 / state.limit)
+            if int(state.limit) != previous:
+                self.record(host, state.limit, "increase")
+
+    def in_flight(self) -> int:
+        """Return the number of requests in flight to all hosts"""
+        return sum(
+            state.in_flight + state.hedges for state in self.hosts.values()
+        )
+
+    def describe(self) -> str:
+        """Return a one-line summary of the host limits"""
+        return ", ".join(
+            f"{host}: {int(state.limit)}" for host, state in self.hosts.items()
+        )
+
+    def write_trace(self, filename: str):
+        """Write the limit changes to a JSON file"""
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {"time": t, "host": host, "limit": limit, "reason": reason}
+                    for t, host, limit, reason in self.trace
+                ],
+                f,
+                indent=4,
+            )
+
+        print(f"Concurrency trace written to {filename}")
+
+
+def parse_retry_after(value: str) -> float:
+    """Return the delay in seconds from a `Retry-After` header value,
+    which is either a number of seconds or an HTTP date
+    """
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at: datetime = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -1,56 +1,486 @@
-import asyncio
+import os
+import sys
 
-from argparse import ArgumentParser, Namespace
+# run as a script (`python3 crawler/main.py`): import the package from
+# the repository root instead of the modules next to this file
+if not __package__:
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-from async_crawl import crawl_site_async
-from crawl import crawl_page
+import re  # noqa: E402
+from argparse import ArgumentParser, Namespace  # noqa: E402
+from collections.abc import Mapping, MutableMapping  # noqa: E402
+from contextlib import ExitStack  # noqa: E402
+from typing import TYPE_CHECKING  # noqa: E402
 
-from report import write_csv_report, write_json_report, print_report
+from crawler.cli_args import create_parser  # noqa: E402
 
-from cli_args import create_parser
+from crawler.config import (  # noqa: E402
+    INLINE_EXECUTOR,
+    SCORE_ORDER,
+    MAX_CONCURRENCY,
+    MAX_PAGES_TO_CRAWL,
+    MAX_SITEMAPS,
+    SEED_CACHE_TTL,
+    SIMHASH_DISTANCE,
+    STATE_DB_EXTENSIONS,
+    STORE_BATCH_SIZE,
+    STRIP_PARAMS,
+)
 
-from config import MAX_CONCURRENCY, MAX_PAGES_TO_CRAWL
+from crawler.dedup import DuplicateIndex, create_duplicate_index  # noqa: E402
 
+from crawler.metrics import CrawlMetrics  # noqa: E402
 
-async def main():
+from crawler.visited import create_visited_set  # noqa: E402
+
+# engines, report writers and databases are imported once their mode
+# is selected, so `--help` and the other modes don't load their
+# libraries (aiohttp, requests, bs4, lxml, sqlite3)
+if TYPE_CHECKING:
+    from crawler.async_crawl import AsyncCrawler
+    from crawler.budget import CrawlBudget
+    from crawler.cache import ResponseCache
+    from crawler.canonical import CanonicalRules, Canonicalizer
+    from crawler.graph import LinkAnalysis
+    from crawler.limiter import AdaptiveLimiter
+    from crawler.frontier import Scorer
+    from crawler.recrawl import PageDiff
+    from crawler.report import PageSink
+    from crawler.retry import CircuitBreaker, RetryPolicy, Timeouts
+    from crawler.seeding import SiteSeeder
+    from crawler.store import CrawlStore
+
+
+def main():
     # get CLI args
     parser: ArgumentParser = create_parser()
     cli_args: Namespace = parser.parse_args()
 
+    # validate crawl state options
+    if cli_args.resume and not cli_args.state_db:
+        parser.error("--resume requires --state-db")
+    if cli_args.seed_cache and not cli_args.sitemaps:
+        parser.error("--seed-cache requires --sitemaps")
+    if cli_args.since and cli_args.since == cli_args.state_db:
+        parser.error("--since and --state-db must be different databases")
+    if cli_args.stream_parse and cli_args.parse_executor != INLINE_EXECUTOR:
+        parser.error("--stream-parse parses pages on the event loop")
+    if cli_args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if cli_args.workers > 1 and (
+        cli_args.sync or cli_args.state_db or cli_args.cache or cli_args.since
+    ):
+        parser.error(
+            "--workers can't be combined with --sync, --state-db, "
+            "--cache or --since"
+        )
+    if cli_args.link_graph:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            parser.error("--link-graph requires NumPy: pip install numpy")
+    if cli_args.max_page_bytes < 0:
+        parser.error("--max-page-bytes must not be negative")
+    if cli_args.max_bytes < 0 or cli_args.max_duration < 0:
+        parser.error("--max-bytes and --max-duration must not be negative")
+    if (
+        min(
+            cli_args.connect_timeout,
+            cli_args.read_timeout,
+            cli_args.timeout,
+            cli_args.retries,
+            cli_args.retry_backoff,
+            cli_args.circuit_failures,
+        )
+        < 0
+    ):
+        parser.error(
+            "timeouts, --retries, --retry-backoff and --circuit-failures "
+            "must not be negative"
+        )
+    if not 0 <= cli_args.hedge < 1:
+        parser.error("--hedge must be a quantile between 0 and 1")
+    if cli_args.hedge and cli_args.sync:
+        parser.error("--hedge requires asynchronous mode")
+    if cli_args.max_depth is not None and cli_args.max_depth < 0:
+        parser.error("--max-depth must not be negative")
+    if cli_args.prefer and cli_args.crawl_order != SCORE_ORDER:
+        parser.error("--prefer requires --crawl-order score")
+    if not 1 <= cli_args.min_concurrency <= cli_args.max_concurrency:
+        parser.error(
+            "--min-concurrency must be between 1 and --max-concurrency"
+        )
+
     # set up crawling limit
     max_pages_to_crawl: int = cli_args.page_limit or MAX_PAGES_TO_CRAWL
 
     print(f"starting crawl of: {(base_url := cli_args.url)}")
 
-    page_data: dict[str, dict[str, str | list[str]]]
-    # crawl in sync mode
-    if cli_args.sync:
-        page_data = crawl_page(base_url, max_pages_to_crawl=max_pages_to_crawl)
-    # crawl in async mode
-    else:
-        # set up concurrency limit and start crawling
+    # print a simple report on fetched data
+    # if requested or no other options for output provided
+    should_print: bool = cli_args.verbose or not (
+        cli_args.csv or cli_args.json or cli_args.ndjson
+    )
+
+    with ExitStack() as stack:
+        # canonicalize URLs with the query parameter rules
+        from crawler.canonical import CanonicalRules, Canonicalizer
+
+        rules: CanonicalRules = CanonicalRules(
+            tuple(cli_args.keep_param or ()),
+            STRIP_PARAMS + tuple(cli_args.strip_param or ()),
+        )
+        canonicalizer: Canonicalizer = Canonicalizer(rules)
+        if canonicalizer.canonicalize(base_url) is None:
+            parser.error(f"can't crawl {base_url}: not an HTTP(S) URL")
+
+        # load the earlier crawl before its report may be overwritten,
+        # its pages are matched by the canonical URLs of this crawl
+        since: PageDiff | None = None
+        if cli_args.since:
+            import sqlite3
+
+            from crawler.recrawl import PageDiff
+
+            try:
+                since = PageDiff(
+                    load_previous_crawl(cli_args.since, stack), canonicalizer
+                )
+            except (OSError, ValueError, sqlite3.Error) as e:
+                parser.error(f"can't load --since {cli_args.since}: {e}")
+            print(f"recrawling {len(since)} known pages")
+
+        # keep crawl state in a database if requested
+        store: CrawlStore | None = None
+        if cli_args.state_db:
+            from crawler.store import CrawlStore
+
+            store = stack.enter_context(
+                CrawlStore(
+                    cli_args.state_db, STORE_BATCH_SIZE, cli_args.resume
+                )
+            )
+
+        # revalidate cached pages if requested
+        cache: ResponseCache | None = None
+        if cli_args.cache:
+            from crawler.cache import ResponseCache
+
+            cache = stack.enter_context(
+                ResponseCache(
+                    cli_args.cache,
+                    cli_args.cache_size * 2**20,
+                    STORE_BATCH_SIZE,
+                )
+            )
+
+        # stream pages to the report files while crawling,
+        # reports of a crawl kept in the database or with link graph
+        # metrics are written once the crawl is complete
+        sinks: list[PageSink] = []
+        if store is None and not cli_args.link_graph:
+            sinks = [
+                stack.enter_context(sink) for sink in create_sinks(cli_args)
+            ]
+
+        # obey robots.txt and seed the frontier from sitemaps if requested
+        seeder: SiteSeeder | None = None
+        if cli_args.sitemaps:
+            from crawler.crawl import USER_AGENT
+            from crawler.seeding import SeedCache, SiteSeeder
+
+            seeder = SiteSeeder(
+                base_url,
+                USER_AGENT,
+                max_pages_to_crawl,
+                MAX_SITEMAPS,
+                (
+                    SeedCache(cli_args.seed_cache, SEED_CACHE_TTL)
+                    if cli_args.seed_cache
+                    else None
+                ),
+            )
+
+        # set up concurrency limit
         max_concurrency: int = cli_args.concurrency or MAX_CONCURRENCY
-        page_data = await crawl_site_async(
-            base_url, max_concurrency, max_pages_to_crawl
+
+        # rank the frontier if requested
+        from crawler.frontier import create_scorer
+
+        try:
+            scorer: Scorer | None = create_scorer(
+                cli_args.crawl_order, cli_args.prefer or ()
+            )
+        except re.error as e:
+            parser.error(f"invalid --prefer pattern: {e}")
+
+        # time out stalled requests, retry transient failures
+        # and skip failing hosts
+        from crawler.retry import CircuitBreaker, RetryPolicy, Timeouts
+
+        timeouts: Timeouts = Timeouts(
+            cli_args.connect_timeout, cli_args.read_timeout, cli_args.timeout
+        )
+        retry: RetryPolicy = RetryPolicy(
+            cli_args.retries, cli_args.retry_backoff
         )
+        breaker: CircuitBreaker = CircuitBreaker(cli_args.circuit_failures)
 
-    print(f"\nCrawling complete. Found {len(page_data)} pages.\n")
+        # page, byte and time budgets, every fetch reserves its page
+        # so the page limit is exact
+        from crawler.budget import CrawlBudget
+
+        budget: CrawlBudget = CrawlBudget(
+            max_pages_to_crawl, cli_args.max_bytes, cli_args.max_duration
+        )
+
+        metrics: CrawlMetrics = CrawlMetrics()
+        # shards of a crawl with several workers keep their own indexes
+        dedup: DuplicateIndex | None = (
+            create_duplicate_index(cli_args.dedup, SIMHASH_DISTANCE)
+            if cli_args.workers == 1
+            else None
+        )
+
+        # pages are only kept in memory for the printed report
+        # and the link graph
+        retain_pages: bool = should_print or cli_args.link_graph
+        page_data: Mapping[str, dict[str, str | list[str]]]
+        page_count: int
+        failed: set[str] = set()
+        limiter: AdaptiveLimiter | None = None
+        # crawl in sync mode
+        if cli_args.sync:
+            from crawler.sync_crawl import SyncCrawler
+
+            with SyncCrawler(
+                base_url,
+                max_concurrency,
+                max_pages_to_crawl,
+                cli_args.frontier_size,
+                create_visited_set(
+                    cli_args.visited,
+                    cli_args.bloom_capacity,
+                    cli_args.bloom_error_rate,
+                ),
+                store,
+                sinks,
+                retain_pages=retain_pages,
+                cache=cache,
+                seeder=seeder,
+                metrics=metrics,
+                dedup=dedup,
+                since=since,
+                max_page_bytes=cli_args.max_page_bytes,
+                max_depth=cli_args.max_depth,
+                scorer=scorer,
+                timeouts=timeouts,
+                retry=retry,
+                breaker=breaker,
+                canonicalizer=canonicalizer,
+                budget=budget,
+            ) as sync_crawler:
+                page_data = sync_crawler.crawl()
+                page_count = sync_crawler.page_count
+                failed = sync_crawler.failed
+        # crawl in async mode with several processes
+        elif cli_args.workers > 1:
+            from crawler.records import PageRecords
+            from crawler.shards import ShardOptions, crawl_sharded
+
+            page_data = PageRecords()
+            page_count = crawl_sharded(
+                ShardOptions(
+                    base_url,
+                    max_pages_to_crawl,
+                    max_concurrency,
+                    cli_args.min_concurrency,
+                    cli_args.max_concurrency,
+                    cli_args.parse_executor,
+                    cli_args.frontier_size,
+                    cli_args.visited,
+                    cli_args.bloom_capacity,
+                    cli_args.bloom_error_rate,
+                    cli_args.dedup,
+                    cli_args.sitemaps,
+                    cli_args.seed_cache,
+                    SEED_CACHE_TTL,
+                    cli_args.max_page_bytes,
+                    cli_args.stream_parse,
+                    cli_args.max_depth,
+                    cli_args.crawl_order,
+                    tuple(cli_args.prefer or ()),
+                    timeouts,
+                    retry,
+                    cli_args.circuit_failures,
+                    cli_args.hedge,
+                    rules,
+                ),
+                cli_args.workers,
+                page_data,
+                sinks,
+                retain_pages=retain_pages,
+                metrics=metrics,
+                failed=failed,
+                budget=budget,
+            )
+        # crawl in async mode
+        else:
+            import asyncio
+
+            from crawler.async_crawl import AsyncCrawler
+            from crawler.limiter import AdaptiveLimiter
+            from crawler.retry import Hedger
+
+            # requests to each host start at the concurrency limit
+            # and adapt between the bounds, workers cover the highest one
+            limiter = AdaptiveLimiter(
+                max_concurrency,
+                cli_args.min_concurrency,
+                cli_args.max_concurrency,
+            )
+            crawler: AsyncCrawler = AsyncCrawler(
+                base_url,
+                max(max_concurrency, cli_args.max_concurrency),
+                max_pages_to_crawl,
+                cli_args.parse_executor,
+                cli_args.frontier_size,
+                create_visited_set(
+                    cli_args.visited,
+                    cli_args.bloom_capacity,
+                    cli_args.bloom_error_rate,
+                ),
+                store,
+                sinks,
+                retain_pages=retain_pages,
+                cache=cache,
+                limiter=limiter,
+                seeder=seeder,
+                metrics=metrics,
+                dedup=dedup,
+                since=since,
+                max_page_bytes=cli_args.max_page_bytes,
+                stream_parse=cli_args.stream_parse,
+                max_depth=cli_args.max_depth,
+                scorer=scorer,
+                timeouts=timeouts,
+                retry=retry,
+                breaker=breaker,
+                hedger=Hedger(cli_args.hedge) if cli_args.hedge else None,
+                canonicalizer=canonicalizer,
+                budget=budget,
+            )
+            page_data = asyncio.run(crawl_async(crawler))
+            page_count = crawler.page_count
+            failed = crawler.failed
+
+        print(f"\nCrawling complete. Found {page_count} pages.\n")
+        print(f"Throughput: {metrics.describe()}\n")
+        if cli_args.metrics:
+            metrics.write(cli_args.metrics)
+        if cache is not None:
+            print(f"Cache: {cache.describe()}\n")
+        if dedup is not None:
+            print(f"Duplicates: {dedup.describe()}\n")
+        if since is not None:
+            print(f"Changes: {since.describe()}\n")
+            since.write(
+                cli_args.diff or f"{cli_args.fname or 'report'}-diff.json"
+            )
+        if metrics.retries or metrics.hedges:
+            print(
+                f"Retries: {metrics.retries}, "
+                f"hedged requests: {metrics.hedges}\n"
+            )
+        if breaker.opened:
+            print(f"Circuit breaker: {breaker.describe()}\n")
+        if budget.spent():
+            print(f"Budget: {budget.describe()}\n")
+        if canonicalizer.hits:
+            print(f"URL canonicalization: {canonicalizer.describe()}\n")
+        if limiter is not None:
+            print(f"Concurrency limits: {limiter.describe()}\n")
+            if cli_args.concurrency_trace:
+                limiter.write_trace(cli_args.concurrency_trace)
+
+        # close the streamed reports
+        for sink in sinks:
+            sink.close()
+        if cli_args.link_graph:
+            from crawler.graph import GRAPH_COLUMNS, LinkGraph
+            from crawler.report import write_pages
+
+            analysis: LinkAnalysis = LinkGraph.from_page_data(
+                page_data, base_url, canonicalizer
+            ).analyze(base_url, failed)
+            print(f"Link graph: {analysis.describe()}\n")
+            for sink in create_sinks(cli_args, GRAPH_COLUMNS):
+                write_pages(analysis.annotate(page_data), sink)
+        elif store is not None:
+            from crawler.report import write_report
+
+            for sink in create_sinks(cli_args):
+                write_report(page_data, sink)
+
+        if should_print:
+            from crawler.report import print_report
+
+            print_report(page_data)
+
+
+async def crawl_async(
+    crawler: "AsyncCrawler",
+) -> MutableMapping[str, dict[str, str | list[str]]]:
+    """Run the asynchronous crawler in its client session"""
+    async with crawler:
+        return await crawler.crawl()
+
+
+def load_previous_crawl(
+    path: str, stack: ExitStack
+) -> Mapping[str, dict[str, str | list[str]]]:
+    """Load pages of an earlier crawl from its JSON or NDJSON report
+    or its crawl state database, kept open on the `stack`
+    """
+    if path.endswith(STATE_DB_EXTENSIONS):
+        from crawler.store import CrawlStore
+
+        store: CrawlStore = stack.enter_context(
+            CrawlStore(path, STORE_BATCH_SIZE, resume=True)
+        )
+        return store.pages()
+    from crawler.recrawl import load_report
+
+    return load_report(path)
+
+
+def create_sinks(
+    cli_args: Namespace, extra_columns: tuple[str, ...] = ()
+) -> list["PageSink"]:
+    """Create report files requested in the CLI args, CSV reports
+    get the `extra_columns` of the pages
+    """
+    from crawler.report import CSVSink, JSONSink, NDJSONSink
+
+    fname: str = cli_args.fname or "report"
+    sinks: list[PageSink] = []
+    # a recurring crawl keeps the digests for the next one
+    digests: bool = cli_args.digests or bool(cli_args.since)
 
     # write fetched data to a CSV file
     if cli_args.csv:
-        fname: str = cli_args.fname or "report"
-        write_csv_report(page_data, fname)
+        sinks.append(CSVSink(fname, cli_args.gzip, extra_columns))
 
     # write fetched data to a JSON file
     if cli_args.json:
-        fname: str = cli_args.fname or "report"
-        write_json_report(page_data, fname)
+        sinks.append(JSONSink(fname, cli_args.gzip, digests))
 
-    # print a simple report on fetched data
-    # if requested or no other options for output provided
-    if cli_args.verbose or not (cli_args.csv or cli_args.json):
-        print_report(page_data)
+    # write fetched data to an NDJSON file
+    if cli_args.ndjson:
+        sinks.append(NDJSONSink(fname, cli_args.gzip, digests))
+
+    return sinks
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,340 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+
+# each engine loads its own HTTP client
+if TYPE_CHECKING:
+    import aiohttp
+    from requests import Response
+
+# upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+# metrics files with these extensions are written in Prometheus
+# text format, any other file is written as JSON
+PROMETHEUS_EXTENSIONS: tuple[str, ...] = (".prom", ".txt")
+
+
+class Histogram:
+    """Latency histogram with fixed bucket bounds,
+    the last bucket counts values above every bound
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float):
+        """Add a value to its bucket"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram"):
+        """Add the values of a histogram with the same buckets"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate the `q` quantile as the upper bound of its bucket,
+        values above every bound are estimated by the highest bound
+        """
+        if not self.count:
+            return 0.0
+        rank: float = q * self.count
+        seen: int = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def summary(self) -> dict[str, float]:
+        """Return the count, total, mean and estimated quantiles"""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class CrawlMetrics:
+    """Per-phase timings and throughput counters of a crawl.
+    The phases are `dns`, `connect`, `queue` (waiting for a pooled
+    connection), `throttle` (waiting for a host slot), `ttfb`,
+    `download`, `parse`, `lock` and `page` (a whole page fetch).
+    Fetch threads of the sync engine record concurrently.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, Histogram] = {}
+        self.pages: int = 0
+        self.errors: int = 0
+        self.bytes: int = 0
+        # retried and hedged requests
+        self.retries: int = 0
+        self.hedges: int = 0
+        self.started: float = 0.0
+        self.finished: float = 0.0
+        self.lock: threading.Lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, object]:
+        # metrics of crawler processes are sent without their lock
+        state: dict[str, object] = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, object]):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def merge(self, other: "CrawlMetrics"):
+        """Add the timings and counters of another crawl, e.g. a shard
+        of this one. The duration of this crawl is kept.
+        """
+        with self.lock:
+            for phase, histogram in other.phases.items():
+                self.phases.setdefault(
+                    phase, Histogram(histogram.buckets)
+                ).merge(histogram)
+            self.pages += other.pages
+            self.errors += other.errors
+            self.bytes += other.bytes
+            self.retries += other.retries
+            self.hedges += other.hedges
+
+    def start(self):
+        """Mark the beginning of the crawl"""
+        self.started = time.perf_counter()
+        self.finished = 0.0
+
+    def stop(self):
+        """Mark the end of the crawl"""
+        self.finished = time.perf_counter()
+
+    def duration(self) -> float:
+        """Return seconds since the start of the crawl until its end"""
+        if not self.started:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def observe(self, phase: str, seconds: float):
+        """Record time spent in a phase"""
+        with self.lock:
+            if (histogram := self.phases.get(phase)) is None:
+                histogram = self.phases[phase] = Histogram()
+            histogram.observe(seconds)
+
+    def add_bytes(self, count: int):
+        """Count downloaded response bytes"""
+        with self.lock:
+            self.bytes += count
+
+    def add_retry(self):
+        """Count a retried request"""
+        with self.lock:
+            self.retries += 1
+
+    def add_hedge(self):
+        """Count a hedged request sent to race a slow one"""
+        with self.lock:
+            self.hedges += 1
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block as a phase"""
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def trace_config(self) -> "aiohttp.TraceConfig":
+        """Create an aiohttp trace config recording connection phases,
+        time to the response headers and downloaded bytes
+        """
+        import aiohttp
+
+        async def on_request_start(session, ctx: SimpleNamespace, params):
+            ctx.request_start = time.perf_counter()
+
+        async def on_request_end(session, ctx: SimpleNamespace, params):
+            self.observe("ttfb", time.perf_counter() - ctx.request_start)
+
+        def phase_signals(phase: str):
+            async def on_start(session, ctx: SimpleNamespace, params):
+                setattr(ctx, phase, time.perf_counter())
+
+            async def on_end(session, ctx: SimpleNamespace, params):
+                self.observe(phase, time.perf_counter() - getattr(ctx, phase))
+
+            return on_start, on_end
+
+        async def on_chunk(session, ctx: SimpleNamespace, params):
+            self.add_bytes(len(params.chunk))
+
+        trace_config: aiohttp.TraceConfig = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        for phase, start_signal, end_signal in (
+            (
+                "dns",
+                trace_config.on_dns_resolvehost_start,
+                trace_config.on_dns_resolvehost_end,
+            ),
+            (
+                "connect",
+                trace_config.on_connection_create_start,
+                trace_config.on_connection_create_end,
+            ),
+            (
+                "queue",
+                trace_config.on_connection_queued_start,
+                trace_config.on_connection_queued_end,
+            ),
+        ):
+            on_start, on_end = phase_signals(phase)
+            start_signal.append(on_start)
+            end_signal.append(on_end)
+        trace_config.on_response_chunk_received.append(on_chunk)
+        return trace_config
+
+    def response_hook(self, resp: "Response", *args, **kwargs) -> "Response":
+        """`requests` response hook recording time to the response
+        headers, body download time and downloaded bytes
+        """
+        self.observe("ttfb", resp.elapsed.total_seconds())
+        # streamed bodies are measured while the caller reads them
+        if kwargs.get("stream"):
+            resp.iter_content = self.measure_chunks(resp.iter_content)
+            return resp
+        # the body is read here instead of right after the hooks
+        with self.timer("download"):
+            self.add_bytes(len(resp.content))
+        return resp
+
+    def measure_chunks(
+        self, iter_content: Callable[..., Iterator[bytes]]
+    ) -> Callable[..., Iterator[bytes]]:
+        """Wrap `Response.iter_content` recording body download time
+        and downloaded bytes
+        """
+
+        def measured(*args, **kwargs) -> Iterator[bytes]:
+            started: float = time.perf_counter()
+            for chunk in iter_content(*args, **kwargs):
+                self.add_bytes(len(chunk))
+                yield chunk
+            self.observe("download", time.perf_counter() - started)
+
+        return measured
+
+    def summary(self) -> dict[str, object]:
+        """Return throughput of the crawl and per-phase timings"""
+        duration: float = self.duration()
+        return {
+            "duration": round(duration, 3),
+            "pages": self.pages,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "pages_per_sec": (
+                round(self.pages / duration, 3) if duration else 0.0
+            ),
+            "bytes_per_sec": (
+                round(self.bytes / duration, 3) if duration else 0.0
+            ),
+            "phases": {
+                phase: histogram.summary()
+                for phase, histogram in sorted(self.phases.items())
+            },
+        }
+
+    def describe(self) -> str:
+        """Return a short throughput summary"""
+        duration: float = self.duration()
+        if not duration:
+            return "no crawl"
+        return (
+            f"{self.pages / duration:.1f} pages/s, "
+            f"{self.bytes / duration / 2**20:.2f} MiB/s "
+            f"over {duration:.1f}s"
+        )
+
+    def prometheus(self) -> str:
+        """Return the metrics in Prometheus text exposition format"""
+        lines: list[str] = [
+            "# HELP crawler_phase_seconds Time spent in each crawl phase.",
+            "# TYPE crawler_phase_seconds histogram",
+        ]
+        for phase, histogram in sorted(self.phases.items()):
+            cumulative: int = 0
+            for bound, count in zip(
+                (*histogram.buckets, "+Inf"), histogram.counts
+            ):
+                cumulative += count
+                lines.append(
+                    f'crawler_phase_seconds_bucket{{phase="{phase}",'
+                    f'le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'crawler_phase_seconds_sum{{phase="{phase}"}} '
+                f"{histogram.sum}"
+            )
+            lines.append(
+                f'crawler_phase_seconds_count{{phase="{phase}"}} '
+                f"{histogram.count}"
+            )
+
+        summary: dict[str, object] = self.summary()
+        for name, metric, kind, help_text in (
+            ("pages", "pages_total", "counter", "Crawled pages."),
+            ("errors", "errors_total", "counter", "Failed pages."),
+            ("bytes", "bytes_total", "counter", "Downloaded bytes."),
+            ("retries", "retries_total", "counter", "Retried requests."),
+            ("hedges", "hedges_total", "counter", "Hedged requests."),
+            ("duration", "duration_seconds", "gauge", "Crawl duration."),
+            ("pages_per_sec", "pages_per_second", "gauge", "Page rate."),
+            ("bytes_per_sec", "bytes_per_second", "gauge", "Byte rate."),
+        ):
+            lines.append(f"# HELP crawler_{metric} {help_text}")
+            lines.append(f"# TYPE crawler_{metric} {kind}")
+            lines.append(f"crawler_{metric} {summary[name]}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, filename: str):
+        """Write the metrics to a JSON or a Prometheus text file,
+        depending on the file extension
+        """
+        with open(filename, "w", encoding="utf-8") as f:
+            if filename.endswith(PROMETHEUS_EXTENSIONS):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.summary(), f, indent=4)
+        print(f"Metrics written to {filename}")
@@ -0,0 +1,112 @@
+from array import array
+from collections.abc import Iterable, Iterator, MutableMapping
+from dataclasses import dataclass
+
+# type code of URL ID arrays, 4 bytes per link
+URL_ID_TYPE: str = "I"
+
+
+class UrlTable:
+    """Intern table of absolute URLs. Every URL is kept once and
+    referred to by its integer ID, assigned in order of appearance.
+    """
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.urls: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def intern(self, url: str) -> int:
+        """Return the ID of the `url`, adding it if it's new"""
+        if (url_id := self.ids.get(url)) is None:
+            url_id = self.ids[url] = len(self.urls)
+            self.urls.append(url)
+        return url_id
+
+    def intern_all(self, urls: Iterable[str]) -> array:
+        """Return an array of IDs of the `urls`"""
+        return array(URL_ID_TYPE, map(self.intern, urls))
+
+    def resolve(self, url_ids: Iterable[int]) -> list[str]:
+        """Return the URLs of the IDs"""
+        urls: list[str] = self.urls
+        return [urls[url_id] for url_id in url_ids]
+
+
+@dataclass(slots=True)
+class PageRecord:
+    """Compact page data with URLs stored as IDs of a `UrlTable`"""
+
+    url: int
+    h1: str
+    first_paragraph: str
+    outgoing_links: array
+    image_urls: array
+    # the page this one is a copy of, only set for aliases
+    alias_of: int | None = None
+    # content digest of the downloaded page
+    digest: bytes | None = None
+
+    @classmethod
+    def from_page(
+        cls, page: dict[str, str | list[str]], table: UrlTable
+    ) -> "PageRecord":
+        """Create a record of the page data, interning its URLs"""
+        return cls(
+            table.intern(str(page["url"])),
+            str(page["h1"]),
+            str(page["first_paragraph"]),
+            table.intern_all(page["outgoing_links"]),
+            table.intern_all(page["image_urls"]),
+            (
+                table.intern(str(page["alias_of"]))
+                if "alias_of" in page
+                else None
+            ),
+            bytes.fromhex(str(page["digest"])) if "digest" in page else None,
+        )
+
+    def to_page(self, table: UrlTable) -> dict[str, str | list[str]]:
+        """Return the page data with resolved URLs"""
+        page: dict[str, str | list[str]] = {
+            "url": table.urls[self.url],
+            "h1": self.h1,
+            "first_paragraph": self.first_paragraph,
+            "outgoing_links": table.resolve(self.outgoing_links),
+            "image_urls": table.resolve(self.image_urls),
+        }
+        if self.alias_of is not None:
+            page["alias_of"] = table.urls[self.alias_of]
+        if self.digest is not None:
+            page["digest"] = self.digest.hex()
+        return page
+
+
+class PageRecords(MutableMapping):
+    """In-memory `page_data` mapping keeping pages as `PageRecord`s.
+    Pages are stored and returned as page data dictionaries, the URLs
+    repeated across pages are only kept once.
+    """
+
+    def __init__(self, table: UrlTable | None = None):
+        self.table: UrlTable = table if table is not None else UrlTable()
+        self.records: dict[str, PageRecord] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, normalized_url: str) -> dict[str, str | list[str]]:
+        return self.records[normalized_url].to_page(self.table)
+
+    def __setitem__(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        self.records[normalized_url] = PageRecord.from_page(page, self.table)
+
+    def __delitem__(self, normalized_url: str):
+        del self.records[normalized_url]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.records)
@@ -0,0 +1,192 @@
+import gzip
+import json
+from collections.abc import Mapping
+from typing import TextIO
+
+from crawler.canonical import Canonicalizer
+from crawler.crawl import CANONICALIZER
+
+# page data fields compared between crawls
+PAGE_FIELDS: tuple[str, ...] = (
+    "h1",
+    "first_paragraph",
+    "outgoing_links",
+    "image_urls",
+    "alias_of",
+)
+
+
+def open_report(filename: str) -> TextIO:
+    """Open a report file, decompressing it if it's gzipped"""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt", encoding="utf-8")
+    return open(filename, encoding="utf-8")
+
+
+def load_report(filename: str) -> dict[str, dict[str, str | list[str]]]:
+    """Load pages of a JSON or NDJSON report keyed by normalized URLs"""
+    with open_report(filename) as f:
+        if filename.removesuffix(".gz").endswith(".ndjson"):
+            page_data: dict[str, dict[str, str | list[str]]] = {}
+            for line in f:
+                if not line.strip():
+                    continue
+                page: dict[str, str | list[str]] = json.loads(line)
+                page_data[str(page.pop("normalized_url"))] = page
+            return page_data
+
+        return json.load(f)
+
+
+def unchanged_page(
+    previous: dict[str, str | list[str]] | None, digest: str | None
+) -> dict[str, str | list[str]] | None:
+    """Return the page data of the `previous` crawl of a page if it still
+    has the content `digest` it had then, `None` if it has to be
+    extracted again. Copies of other pages are always extracted again.
+    """
+    if (
+        previous is None
+        or digest is None
+        or previous.get("digest") != digest
+        or "alias_of" in previous
+    ):
+        return None
+    return previous
+
+
+class PageDiff:
+    """Changes between the pages of an earlier crawl and the pages
+    crawled again. Earlier pages that failed to be crawled again are
+    reported as removed, as are earlier pages left out of a crawl that
+    ran to completion. Earlier pages left out because the crawl budget
+    stopped the crawl are reported as not recrawled. Earlier pages are
+    keyed by the `canonicalizer` of this crawl, so reports written with
+    other normalization rules still match.
+    """
+
+    def __init__(
+        self,
+        previous: Mapping[str, dict[str, str | list[str]]],
+        canonicalizer: Canonicalizer = CANONICALIZER,
+    ):
+        self.previous: Mapping[str, dict[str, str | list[str]]] = previous
+        # keys of the earlier pages by their key in this crawl
+        self.keys: dict[str, str] = {
+            canonicalizer.key(str(page["url"])): normalized_url
+            for normalized_url, page in previous.items()
+        }
+        self.added: dict[str, dict[str, str | list[str]]] = {}
+        self.changed: dict[str, dict[str, object]] = {}
+        self.unchanged: int = 0
+        self.seen: set[str] = set()
+        # earlier pages that are gone or fail now
+        self.failed: set[str] = set()
+        # set once the crawl budget stops the crawl
+        self.stopped: bool = False
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def urls(self) -> list[str]:
+        """Return URLs of the earlier crawl"""
+        return [str(page["url"]) for page in self.previous.values()]
+
+    def get(self, normalized_url: str) -> dict[str, str | list[str]] | None:
+        """Return the earlier page of a URL of this crawl, `None`
+        if it wasn't crawled before
+        """
+        if (key := self.keys.get(normalized_url)) is None:
+            return None
+        return self.previous[key]
+
+    def record(self, normalized_url: str, page: dict[str, str | list[str]]):
+        """Compare a crawled page with the earlier crawl"""
+        if normalized_url in self.seen:
+            return
+        self.seen.add(normalized_url)
+
+        before: dict[str, str | list[str]] | None = self.get(normalized_url)
+        if before is None:
+            self.added[normalized_url] = page
+            return
+
+        fields: list[str] = [
+            field
+            for field in PAGE_FIELDS
+            if before.get(field) != page.get(field)
+        ]
+        if not fields:
+            self.unchanged += 1
+            return
+
+        self.changed[normalized_url] = {
+            "fields": fields,
+            "before": before,
+            "after": page,
+        }
+
+    def record_failure(self, normalized_url: str):
+        """Note a page that failed to be crawled"""
+        if normalized_url in self.keys and normalized_url not in self.seen:
+            self.seen.add(normalized_url)
+            self.failed.add(normalized_url)
+
+    def left_out(self) -> dict[str, dict[str, str | list[str]]]:
+        """Return pages of the earlier crawl that weren't crawled again"""
+        return {
+            normalized_url: self.previous[key]
+            for normalized_url, key in self.keys.items()
+            if normalized_url not in self.seen
+        }
+
+    def removed(self) -> dict[str, dict[str, str | list[str]]]:
+        """Return pages of the earlier crawl that are gone"""
+        return {
+            **{
+                normalized_url: self.previous[self.keys[normalized_url]]
+                for normalized_url in self.failed
+            },
+            **({} if self.stopped else self.left_out()),
+        }
+
+    def not_recrawled(self) -> dict[str, dict[str, str | list[str]]]:
+        """Return pages of the earlier crawl that the crawl budget
+        left out, they may still be online
+        """
+        return self.left_out() if self.stopped else {}
+
+    def describe(self) -> str:
+        """Return a short summary of the changes"""
+        not_recrawled: int = len(self.not_recrawled())
+        return (
+            f"{len(self.added)} added, {len(self.removed())} removed, "
+            f"{len(self.changed)} changed, {self.unchanged} unchanged"
+            + (f", {not_recrawled} not recrawled" if not_recrawled else "")
+        )
+
+    def write(self, filename: str):
+        """Write the changes to a JSON report"""
+        removed: dict[str, dict[str, str | list[str]]] = self.removed()
+        not_recrawled: dict[str, dict[str, str | list[str]]] = (
+            self.not_recrawled()
+        )
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "summary": {
+                        "added": len(self.added),
+                        "removed": len(removed),
+                        "changed": len(self.changed),
+                        "unchanged": self.unchanged,
+                        "not_recrawled": len(not_recrawled),
+                    },
+                    "added": self.added,
+                    "removed": removed,
+                    "changed": self.changed,
+                    "not_recrawled": not_recrawled,
+                },
+                f,
+                indent=4,
+            )
+        print(f"Diff report written to {filename}")
@@ -1,70 +1,235 @@
 import csv
+import gzip
 import json
+import os
+from collections.abc import Iterable, Mapping
+from typing import TextIO
 
+# pages written between flushes of a gzip-compressed report,
+# plain reports are flushed after every page
+GZIP_FLUSH_INTERVAL: int = 100
 
-def write_csv_report(
-    page_data: dict[str, dict[str, str | list[str]]],
-    filename: str,
-):
-    """Write crawling report to a CSV file using the provided file name."""
-    if not page_data:
-        print("No data to write to CSV")
-        return
 
-    if not filename.endswith(".csv"):
-        filename = f"{filename}.csv"
+class PageSink:
+    """Report file receiving pages one by one as they are crawled.
+    The file is flushed as it grows, so partial results can be read
+    while the crawl is running. Content digests of the pages are only
+    written if `digests` is set, for a later recrawl.
+    """
+
+    extension: str = ""
+    label: str = ""
+
+    def __init__(
+        self, filename: str, compress: bool = False, digests: bool = False
+    ):
+        if not filename.endswith(self.extension):
+            filename = f"{filename}{self.extension}"
+        if compress and not filename.endswith(".gz"):
+            filename = f"{filename}.gz"
+
+        self.filename: str = filename
+        self.compress: bool = compress
+        self.digests: bool = digests
+        self.count: int = 0
+        self.file: TextIO = (
+            gzip.open(filename, "wt", newline="", encoding="utf-8")
+            if compress
+            else open(filename, "w", newline="", encoding="utf-8")
+        )
+        self.write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_header(self):
+        """Write the beginning of the report"""
+
+    def write_footer(self):
+        """Write the end of the report"""
 
-    with open(filename, "w", newline="", encoding="utf-8") as f:
+    def write_page(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        """Write a single page to the report"""
+        raise NotImplementedError
+
+    def write(self, normalized_url: str, page: dict[str, str | list[str]]):
+        """Add a page to the report"""
+        if not self.digests and "digest" in page:
+            page = {
+                field: value
+                for field, value in page.items()
+                if field != "digest"
+            }
+        self.write_page(normalized_url, page)
+        self.count += 1
+
+        if not self.compress or not self.count % GZIP_FLUSH_INTERVAL:
+            self.file.flush()
+
+    def close(self):
+        """Finish the report, an empty report file is removed"""
+        if self.file.closed:
+            return
+
+        self.write_footer()
+        self.file.close()
+
+        if not self.count:
+            os.remove(self.filename)
+            print(f"No data to write to {self.label}")
+            return
+
+        print(f"Report written to {self.filename}")
+
+
+class CSVSink(PageSink):
+    """CSV report, one row per page, with `extra_columns` of the pages
+    after the page data columns
+    """
+
+    extension = ".csv"
+    label = "CSV"
+
+    def __init__(
+        self,
+        filename: str,
+        compress: bool = False,
+        extra_columns: tuple[str, ...] = (),
+    ):
+        self.extra_columns: tuple[str, ...] = extra_columns
+        super().__init__(filename, compress)
+
+    def write_header(self):
         # create writer for further data writing
-        writer = csv.DictWriter(
-            f,
+        self.writer = csv.DictWriter(
+            self.file,
             fieldnames=[
                 "page_url",
                 "h1",
                 "first_paragraph",
                 "outgoing_link_urls",
                 "image_urls",
+                "alias_of",
+                *self.extra_columns,
             ],
         )
-
         # write column names
-        writer.writeheader()
-        # write rows
-        for page in page_data.values():
-            processed_page: dict[str, str] = {
-                "page_url": str(page["url"]),
-                "h1": str(page["h1"]),
-                "first_paragraph": str(page["first_paragraph"]),
-                "outgoing_link_urls": ";".join(page["outgoing_links"]),
-                "image_urls": ";".join(page["image_urls"]),
-            }
+        self.writer.writeheader()
 
-            writer.writerow(processed_page)
+    def write_page(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        processed_page: dict[str, str] = {
+            "page_url": str(page["url"]),
+            "h1": str(page["h1"]),
+            "first_paragraph": str(page["first_paragraph"]),
+            "outgoing_link_urls": ";".join(page["outgoing_links"]),
+            "image_urls": ";".join(page["image_urls"]),
+            "alias_of": str(page.get("alias_of", "")),
+        }
+        for column in self.extra_columns:
+            processed_page[column] = str(page.get(column, ""))
 
-    print(f"Report written to {filename}")
+        self.writer.writerow(processed_page)
+
+
+class JSONSink(PageSink):
+    """JSON report, an object of pages keyed by their normalized URLs.
+    The output is the same as `json.dump` with indent 4,
+    it's only valid JSON after the report is closed.
+    """
+
+    extension = ".json"
+    label = "JSON"
+
+    def write_header(self):
+        self.file.write("{")
+
+    def write_page(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        self.file.write(",\n    " if self.count else "\n    ")
+        self.file.write(json.dumps(normalized_url))
+        self.file.write(": ")
+        self.file.write(json.dumps(page, indent=4).replace("\n", "\n    "))
+
+    def write_footer(self):
+        self.file.write("\n}" if self.count else "}")
+
+
+class NDJSONSink(PageSink):
+    """Newline-delimited JSON report, one page object per line
+    with its normalized URL. Every complete line is valid JSON,
+    so the report can be tailed during the crawl.
+    """
+
+    extension = ".ndjson"
+    label = "NDJSON"
+
+    def write_page(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        self.file.write(json.dumps({"normalized_url": normalized_url, **page}))
+        self.file.write("\n")
+
+
+def write_report(
+    page_data: Mapping[str, dict[str, str | list[str]]], sink: PageSink
+):
+    """Write every page to the `sink` and close it"""
+    write_pages(page_data.items(), sink)
+
+
+def write_pages(
+    pages: Iterable[tuple[str, dict[str, object]]], sink: PageSink
+):
+    """Write pages given with their normalized URLs to the `sink`
+    and close it
+    """
+    with sink:
+        for normalized_url, page in pages:
+            sink.write(normalized_url, page)
+
+
+def write_csv_report(
+    page_data: Mapping[str, dict[str, str | list[str]]],
+    filename: str,
+):
+    """Write crawling report to a CSV file using the provided file name."""
+    if not page_data:
+        print("No data to write to CSV")
+        return
+
+    write_report(page_data, CSVSink(filename))
 
 
 def write_json_report(
-    page_data: dict[str, dict[str, str | list[str]]], filename: str
+    page_data: Mapping[str, dict[str, str | list[str]]], filename: str
 ):
     """Write crawling report to a JSON file using the provided file name."""
     if not page_data:
         print("No data to write to JSON")
         return
 
-    if not filename.endswith(".json"):
-        filename = f"{filename}.json"
-
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(page_data, f, indent=4)
-
-    print(f"Report written to {filename}")
+    write_report(page_data, JSONSink(filename))
 
 
-def print_report(page_data: dict[str, dict[str, str | list[str]]]):
+def print_report(page_data: Mapping[str, dict[str, str | list[str]]]):
     """Print a simplified crawling report"""
     print("=" * 120, "Crawling Report".center(120, " "), "=" * 120, sep="\n")
     for id, page in enumerate(page_data.values(), 1):
+        if "alias_of" in page:
+            print(
+                f"{id}.",
+                f"'{page['url']}' is a copy of '{page['alias_of']}'",
+                "\n" + "-" * 120,
+            )
+            continue
         print(
             f"{id}.",
             f"'{page['url']}' contains:",
@@ -0,0 +1,206 @@
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from crawler.config import (
+    CIRCUIT_COOLDOWN,
+    CIRCUIT_FAILURES,
+    CONNECT_TIMEOUT,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_WINDOW,
+    READ_TIMEOUT,
+    RETRIES,
+    RETRY_BACKOFF,
+    RETRY_MAX_BACKOFF,
+    TOTAL_TIMEOUT,
+)
+from crawler.crawl import ResponseStatusError
+
+# statuses of transient server errors, requests failing with them
+# are retried
+RETRY_STATUSES: frozenset[int] = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class Timeouts:
+    """Request timeouts in seconds, 0 for no limit. `connect` limits
+    opening a connection, `read` waiting for the next bytes
+    of the response and `total` a whole page fetch.
+    """
+
+    connect: float = CONNECT_TIMEOUT
+    read: float = READ_TIMEOUT
+    total: float = TOTAL_TIMEOUT
+
+    def requests_timeout(self) -> tuple[float | None, float | None]:
+        """Return the connect and read timeouts as `requests` takes them"""
+        return self.connect or None, self.read or None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retries of requests failing for a transient reason, a network
+    error, a timeout or a transient server error status. Retry `n`
+    waits a random delay of up to `backoff * 2 ** n` seconds,
+    at most `max_backoff`, so requests failing together don't come
+    back together.
+    """
+
+    retries: int = RETRIES
+    backoff: float = RETRY_BACKOFF
+    max_backoff: float = RETRY_MAX_BACKOFF
+
+    def delay(self, attempt: int) -> float:
+        """Return the seconds to wait before retry `attempt`,
+        counted from 0
+        """
+        return random.uniform(
+            0.0, min(self.max_backoff, self.backoff * 2**attempt)
+        )
+
+
+class CircuitOpenError(Exception):
+    """Request to a host whose circuit is open"""
+
+
+class HostCircuit:
+    """Circuit breaker state of a single host"""
+
+    def __init__(self):
+        self.failures: int = 0
+        self.open_until: float = 0.0
+        # a request was let through to check if the host recovered
+        self.probing: bool = False
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker. Once a host fails `threshold` requests
+    in a row, requests to it fail right away for `cooldown` seconds.
+    Then a single probe request is let through, the circuit closes if
+    it gets a response and opens again if it fails. A probe that ends
+    without an outcome is released, so another request can probe.
+    A `threshold` of 0 disables the breaker. Fetch threads of the sync
+    engine share it.
+    """
+
+    def __init__(
+        self,
+        threshold: int = CIRCUIT_FAILURES,
+        cooldown: float = CIRCUIT_COOLDOWN,
+    ):
+        self.threshold: int = threshold
+        self.cooldown: float = cooldown
+        self.hosts: dict[str, HostCircuit] = {}
+        self.lock: threading.Lock = threading.Lock()
+        # times a circuit opened and requests failed without being sent
+        self.opened: int = 0
+        self.rejected: int = 0
+
+    def check(self, host: str) -> bool:
+        """Raise `CircuitOpenError` if requests to the `host`
+        are held back. Return `True` if the request is the probe,
+        which has to be recorded or released.
+        """
+        if not self.threshold:
+            return False
+
+        with self.lock:
+            state: HostCircuit | None = self.hosts.get(host)
+            if state is None or state.failures < self.threshold:
+                return False
+            if state.probing or time.monotonic() < state.open_until:
+                self.rejected += 1
+                raise CircuitOpenError(f"circuit open for {host}")
+            state.probing = True
+            return True
+
+    def release(self, host: str):
+        """Let another request probe the `host` after the probe ended
+        without an outcome, e.g. it was cancelled
+        """
+        with self.lock:
+            if (state := self.hosts.get(host)) is not None:
+                state.probing = False
+
+    def record(self, host: str, failed: bool):
+        """Record the outcome of a request to the `host`, `failed` if it
+        failed for a transient reason
+        """
+        if not self.threshold:
+            return
+
+        with self.lock:
+            state: HostCircuit = self.hosts.setdefault(host, HostCircuit())
+            probed: bool = state.probing
+            state.probing = False
+            if not failed:
+                state.failures = 0
+                return
+
+            state.failures += 1
+            # requests in flight when the circuit opened don't reopen it
+            if state.failures == self.threshold or (
+                probed and state.failures > self.threshold
+            ):
+                state.open_until = time.monotonic() + self.cooldown
+                self.opened += 1
+
+    def describe(self) -> str:
+        """Return a one-line summary of the circuits"""
+        return (
+            f"opened {self.opened} times, "
+            f"{self.rejected} requests not sent"
+        )
+
+
+class Hedger:
+    """Delays of hedged requests. A request to a host without
+    a response after the `quantile` of the recent response times
+    of the host is raced by a second request.
+    """
+
+    def __init__(
+        self,
+        quantile: float,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        window: int = HEDGE_WINDOW,
+    ):
+        self.quantile: float = quantile
+        self.min_samples: int = min_samples
+        self.window: int = window
+        self.samples: dict[str, deque[float]] = {}
+
+    def observe(self, host: str, seconds: float):
+        """Record the time to the response headers of a request"""
+        if (samples := self.samples.get(host)) is None:
+            samples = self.samples[host] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def delay(self, host: str) -> float | None:
+        """Return the seconds to wait for a response before sending
+        a hedged request, `None` while the host has too few samples
+        """
+        samples: deque[float] | None = self.samples.get(host)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered: list[float] = sorted(samples)
+        return ordered[
+            min(len(ordered) - 1, int(self.quantile * len(ordered)))
+        ]
+
+
+def is_transient(
+    error: BaseException, network_errors: tuple[type[BaseException], ...]
+) -> bool:
+    """Check if a request failed for a reason that may go away,
+    one of the `network_errors` of the HTTP client or a transient
+    server error status, also if it caused the `error`
+    """
+    for cause in (error, error.__cause__):
+        if isinstance(cause, ResponseStatusError):
+            return cause.status in RETRY_STATUSES
+        if isinstance(cause, network_errors):
+            return True
+    return False
@@ -0,0 +1,216 @@
+import json
+import os
+import time
+import zlib
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+from lxml import etree
+
+GZIP_MAGIC: bytes = b"\x1f\x8b"
+
+
+class SitemapParser:
+    """Incremental parser of a sitemap or a sitemap index, optionally
+    gzip-compressed. Chunks of the document are fed as they arrive and
+    the URLs found so far are returned right away.
+    """
+
+    def __init__(self):
+        self.parser: etree.XMLPullParser = etree.XMLPullParser(
+            events=("end",), recover=True, resolve_entities=False
+        )
+        self.decompressor = None
+        self.started: bool = False
+
+    def feed(self, chunk: bytes) -> list[tuple[str, str]]:
+        """Parse the next chunk and return found `(kind, url)` pairs,
+        the kind is `page` for page URLs or `sitemap` for nested sitemaps
+        """
+        if not self.started:
+            self.started = True
+            # gzip-compressed sitemaps are decompressed on the fly
+            if chunk.startswith(GZIP_MAGIC):
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.decompressor is not None:
+            chunk = self.decompressor.decompress(chunk)
+
+        self.parser.feed(chunk)
+        return self.read_urls()
+
+    def close(self) -> list[tuple[str, str]]:
+        """Finish parsing and return the remaining URLs"""
+        if self.decompressor is not None:
+            self.parser.feed(self.decompressor.flush())
+        try:
+            self.parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        return self.read_urls()
+
+    def read_urls(self) -> list[tuple[str, str]]:
+        """Collect URLs from the parsed `loc` tags"""
+        urls: list[tuple[str, str]] = []
+        for _, element in self.parser.read_events():
+            tag: str = local_name(element.tag)
+            if tag == "loc" and element.text:
+                parent = element.getparent()
+                kind: str = (
+                    "sitemap"
+                    if parent is not None
+                    and local_name(parent.tag) == "sitemap"
+                    else "page"
+                )
+                urls.append((kind, element.text.strip()))
+            elif tag in ("url", "sitemap"):
+                # free parsed entries, sitemaps may hold 50,000 of them
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        return urls
+
+
+def local_name(tag: object) -> str:
+    """Return an XML tag name without its namespace"""
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def get_robots_url(base_url: str) -> str:
+    """Return the robots.txt URL of the `base_url` site"""
+    return urljoin(base_url, "/robots.txt")
+
+
+def parse_robots(robots_txt: str) -> RobotFileParser:
+    """Parse robots.txt rules"""
+    robots: RobotFileParser = RobotFileParser()
+    robots.parse(robots_txt.splitlines())
+    return robots
+
+
+def get_sitemap_urls(robots: RobotFileParser, base_url: str) -> list[str]:
+    """Return sitemaps listed in robots.txt or the default sitemap"""
+    return robots.site_maps() or [urljoin(base_url, "/sitemap.xml")]
+
+
+class SeedCache:
+    """JSON file with robots.txt and sitemap page URLs of crawled sites,
+    reused by later crawls for `ttl` seconds
+    """
+
+    def __init__(self, filename: str, ttl: float):
+        self.filename: str = filename
+        self.ttl: float = ttl
+        self.sites: dict[str, dict] = {}
+
+        if os.path.exists(filename):
+            try:
+                with open(filename, encoding="utf-8") as f:
+                    self.sites = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"ignoring unreadable seed cache {filename}: {e}")
+
+    def get(self, robots_url: str) -> tuple[str, list[str]] | None:
+        """Return cached robots.txt and sitemap page URLs of a site"""
+        site: dict | None = self.sites.get(robots_url)
+        if site is None or time.time() - site["time"] > self.ttl:
+            return None
+        return site["robots_txt"], site["urls"]
+
+    def put(self, robots_url: str, robots_txt: str, urls: list[str]):
+        """Cache robots.txt and sitemap page URLs of a site"""
+        self.sites[robots_url] = {
+            "time": time.time(),
+            "robots_txt": robots_txt,
+            "urls": urls,
+        }
+        with open(self.filename, "w", encoding="utf-8") as f:
+            json.dump(self.sites, f)
+
+
+class SiteSeeder:
+    """Robots.txt rules and sitemap traversal state of a crawled site.
+    Engines fetch robots.txt and sitemaps, feed them to the seeder and
+    schedule the page URLs it returns.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        user_agent: str,
+        max_urls: int,
+        max_sitemaps: int,
+        cache: SeedCache | None = None,
+    ):
+        self.base_url: str = base_url
+        self.user_agent: str = user_agent
+        self.robots_url: str = get_robots_url(base_url)
+        self.max_urls: int = max_urls
+        self.max_sitemaps: int = max_sitemaps
+        self.cache: SeedCache | None = cache
+
+        self.robots_txt: str = ""
+        self.robots: RobotFileParser = parse_robots("")
+        self.sitemaps: list[str] = []
+        self.fetched_sitemaps: set[str] = set()
+        self.urls: list[str] = []
+        # page URLs came from the cache, no sitemap has to be fetched
+        self.from_cache: bool = False
+
+    def load_cached(self) -> bool:
+        """Use the cached robots.txt and sitemap URLs if there are any"""
+        if self.cache is None:
+            return False
+        if (cached := self.cache.get(self.robots_url)) is None:
+            return False
+
+        self.set_robots(cached[0])
+        self.urls = cached[1]
+        self.from_cache = True
+        return True
+
+    def set_robots(self, robots_txt: str):
+        """Apply fetched robots.txt, an empty one allows everything"""
+        self.robots_txt = robots_txt
+        self.robots = parse_robots(robots_txt)
+        self.sitemaps = get_sitemap_urls(self.robots, self.base_url)
+
+    def allowed(self, url: str) -> bool:
+        """Check if robots.txt allows crawling the `url`"""
+        return self.robots.can_fetch(self.user_agent, url)
+
+    def next_sitemap(self) -> str | None:
+        """Return the next sitemap to fetch or `None` if done"""
+        while (
+            self.sitemaps
+            and len(self.fetched_sitemaps) < self.max_sitemaps
+            and not self.is_full()
+        ):
+            sitemap_url: str = self.sitemaps.pop(0)
+            if sitemap_url not in self.fetched_sitemaps and (
+                urlparse(sitemap_url).scheme in ("http", "https")
+            ):
+                self.fetched_sitemaps.add(sitemap_url)
+                return sitemap_url
+        return None
+
+    def add_urls(self, found: list[tuple[str, str]]) -> list[str]:
+        """Remember nested sitemaps and return new page URLs
+        allowed by robots.txt
+        """
+        pages: list[str] = []
+        for kind, url in found:
+            if kind == "sitemap":
+                self.sitemaps.append(url)
+            elif not self.is_full() and self.allowed(url):
+                self.urls.append(url)
+                pages.append(url)
+        return pages
+
+    def is_full(self) -> bool:
+        """Check if enough page URLs were seeded"""
+        return len(self.urls) >= self.max_urls
+
+    def save(self):
+        """Cache robots.txt and the seeded page URLs"""
+        if self.cache is not None and not self.from_cache:
+            self.cache.put(self.robots_url, self.robots_txt, self.urls)
@@ -0,0 +1,329 @@
+import asyncio
+import multiprocessing
+import queue
+import threading
+import zlib
+from asyncio import AbstractEventLoop
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+from multiprocessing.context import SpawnProcess
+from multiprocessing.queues import Queue
+from multiprocessing.sharedctypes import Synchronized, SynchronizedArray
+
+from crawler.async_crawl import AsyncCrawler
+from crawler.budget import CrawlBudget
+from crawler.canonical import CanonicalRules, Canonicalizer
+from crawler.config import (
+    BFS_ORDER,
+    CIRCUIT_FAILURES,
+    MAX_SITEMAPS,
+    SHARD_POLL_INTERVAL,
+    SIMHASH_DISTANCE,
+)
+from crawler.crawl import USER_AGENT
+from crawler.dedup import create_duplicate_index
+from crawler.frontier import create_scorer
+from crawler.limiter import AdaptiveLimiter
+from crawler.metrics import CrawlMetrics
+from crawler.report import PageSink
+from crawler.retry import CircuitBreaker, Hedger, RetryPolicy, Timeouts
+from crawler.seeding import SeedCache, SiteSeeder
+from crawler.visited import create_visited_set
+
+# messages of the shards to the main process
+PAGE_MESSAGE: str = "page"
+DONE_MESSAGE: str = "done"
+
+
+def shard_of(normalized_url: str, shards: int) -> int:
+    """Return the shard owning the URL, the same in every process"""
+    return zlib.crc32(normalized_url.encode()) % shards
+
+
+@dataclass
+class ShardOptions:
+    """Crawl options every shard builds its crawler from"""
+
+    base_url: str
+    max_pages: int
+    concurrency: int
+    min_concurrency: int
+    max_concurrency: int
+    parse_executor: str
+    frontier_size: int
+    visited: str
+    bloom_capacity: int
+    bloom_error_rate: float
+    dedup: str
+    sitemaps: bool = False
+    seed_cache: str | None = None
+    seed_cache_ttl: float = 0.0
+    max_page_bytes: int = 0
+    stream_parse: bool = False
+    max_depth: int | None = None
+    crawl_order: str = BFS_ORDER
+    prefer: tuple[str, ...] = ()
+    timeouts: Timeouts = Timeouts()
+    retry: RetryPolicy = RetryPolicy()
+    circuit_failures: int = CIRCUIT_FAILURES
+    hedge: float = 0.0
+    canonical: CanonicalRules = CanonicalRules()
+
+
+@dataclass
+class ShardChannels:
+    """Queues and counters shared by the shards.
+    `outstanding` counts URLs queued in any frontier, being crawled
+    or on their way to their shard, the crawl is over once it's zero.
+    The counters of the crawl `budget` are in shared memory.
+    """
+
+    inboxes: list[Queue]
+    results: Queue
+    outstanding: Synchronized
+    budget: CrawlBudget
+
+
+class ShardCrawler(AsyncCrawler):
+    """Asynchronous crawler of the URLs of one shard. Links owned by
+    other shards are sent to their inboxes, crawled pages are sent
+    to the main process, and the page limit is shared by all shards.
+    """
+
+    def __init__(self, shard: int, channels: ShardChannels, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard: int = shard
+        self.channels: ShardChannels = channels
+
+    def add_outstanding(self, count: int):
+        with self.channels.outstanding.get_lock():
+            self.channels.outstanding.value += count
+
+    async def reserve_page(self) -> bool:
+        """Reserve a page of the budget shared by all shards, polling
+        while every page left is being fetched
+        """
+        while not self.budget.reserve():
+            if self.budget_spent():
+                return False
+            await asyncio.sleep(SHARD_POLL_INTERVAL)
+        return True
+
+    def enqueue(self, url: str, normalized_url: str, depth: int = 0) -> bool:
+        """Queue a URL of this shard or send it to its owner,
+        each URL is only sent once
+        """
+        owner: int = shard_of(normalized_url, len(self.channels.inboxes))
+        if owner == self.shard:
+            if not super().enqueue(url, normalized_url, depth):
+                return False
+        else:
+            if self.frontier.too_deep(depth):
+                return False
+            if not self.frontier.visited.reserve(normalized_url):
+                return False
+            self.channels.inboxes[owner].put((url, normalized_url, depth))
+        self.add_outstanding(1)
+        return True
+
+    def receive(self, url: str, normalized_url: str, depth: int):
+        """Queue a URL sent by another shard"""
+        if not super().enqueue(url, normalized_url, depth):
+            self.add_outstanding(-1)
+
+    def read_inbox(self, loop: AbstractEventLoop):
+        """Hand URLs of the inbox to the event loop until stopped"""
+        inbox: Queue = self.channels.inboxes[self.shard]
+        for url, normalized_url, depth in iter(inbox.get, None):
+            loop.call_soon_threadsafe(self.receive, url, normalized_url, depth)
+
+    async def crawl_page(
+        self, current_url: str, normalized_url: str, depth: int = 0
+    ):
+        try:
+            await super().crawl_page(current_url, normalized_url, depth)
+        finally:
+            self.add_outstanding(-1)
+
+    async def store_page(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        await super().store_page(normalized_url, page)
+        self.channels.results.put((PAGE_MESSAGE, normalized_url, page))
+
+    async def seed_sitemaps(self):
+        """Read the sitemaps in the first shard only"""
+        if self.shard == 0:
+            await super().seed_sitemaps()
+
+    async def wait_until_done(self):
+        """Wait until no shard has URLs left to crawl"""
+        # every shard holds the crawl open until its frontier is seeded
+        self.add_outstanding(-1)
+        while True:
+            await super().wait_until_done()
+            if not self.channels.outstanding.value:
+                return
+            await asyncio.sleep(SHARD_POLL_INTERVAL)
+
+    async def crawl(self) -> MutableMapping[str, dict[str, str | list[str]]]:
+        """Crawl the shard while receiving its URLs from other shards"""
+        reader: threading.Thread = threading.Thread(
+            target=self.read_inbox,
+            args=(asyncio.get_running_loop(),),
+            daemon=True,
+        )
+        reader.start()
+        try:
+            return await super().crawl()
+        finally:
+            self.channels.inboxes[self.shard].put(None)
+            await asyncio.to_thread(reader.join)
+
+
+async def crawl_shard(
+    shard: int, options: ShardOptions, channels: ShardChannels
+):
+    """Crawl one shard and send its metrics and failed URLs
+    to the main process
+    """
+    # robots.txt is obeyed by every shard, sitemaps are read by the first
+    seeder: SiteSeeder | None = None
+    if options.sitemaps:
+        seeder = SiteSeeder(
+            options.base_url,
+            USER_AGENT,
+            options.max_pages,
+            MAX_SITEMAPS,
+            (
+                SeedCache(options.seed_cache, options.seed_cache_ttl)
+                if options.seed_cache and shard == 0
+                else None
+            ),
+        )
+
+    metrics: CrawlMetrics = CrawlMetrics()
+    async with ShardCrawler(
+        shard,
+        channels,
+        options.base_url,
+        max(options.concurrency, options.max_concurrency),
+        options.max_pages,
+        options.parse_executor,
+        options.frontier_size,
+        create_visited_set(
+            options.visited, options.bloom_capacity, options.bloom_error_rate
+        ),
+        # pages are kept by the main process
+        retain_pages=False,
+        limiter=AdaptiveLimiter(
+            options.concurrency,
+            options.min_concurrency,
+            options.max_concurrency,
+        ),
+        seeder=seeder,
+        metrics=metrics,
+        dedup=create_duplicate_index(options.dedup, SIMHASH_DISTANCE),
+        max_page_bytes=options.max_page_bytes,
+        stream_parse=options.stream_parse,
+        max_depth=options.max_depth,
+        scorer=create_scorer(options.crawl_order, options.prefer),
+        timeouts=options.timeouts,
+        retry=options.retry,
+        breaker=CircuitBreaker(options.circuit_failures),
+        hedger=Hedger(options.hedge) if options.hedge else None,
+        canonicalizer=Canonicalizer(options.canonical),
+        budget=channels.budget,
+    ) as crawler:
+        await crawler.crawl()
+
+    channels.results.put((DONE_MESSAGE, shard, metrics, crawler.failed))
+
+
+def run_shard(shard: int, options: ShardOptions, channels: ShardChannels):
+    """Entry point of a shard process"""
+    asyncio.run(crawl_shard(shard, options, channels))
+
+
+def crawl_sharded(
+    options: ShardOptions,
+    workers: int,
+    page_data: MutableMapping[str, dict[str, str | list[str]]],
+    sinks: list[PageSink] | None = None,
+    retain_pages: bool = True,
+    metrics: CrawlMetrics | None = None,
+    failed: set[str] | None = None,
+    budget: CrawlBudget | None = None,
+) -> int:
+    """Crawl with `workers` processes, each owning a hash partition of
+    the normalized URLs. Pages of all shards are written to the `sinks`
+    and kept in `page_data` if `retain_pages` is set, URLs of pages that
+    failed are added to `failed`. The shards share the `budget`, the page
+    limit of the options by default. Return the number of crawled pages.
+    """
+    context = multiprocessing.get_context("spawn")
+    budget = budget or CrawlBudget(options.max_pages)
+    # the budget counters are moved to shared memory
+    counts: SynchronizedArray = context.Array("q", list(budget.counts))
+    budget.counts, budget.lock = counts, counts.get_lock()
+    budget.start()
+    channels: ShardChannels = ShardChannels(
+        [context.Queue() for _ in range(workers)],
+        context.Queue(),
+        # released by every shard once it's seeded
+        context.Value("q", workers),
+        budget,
+    )
+    processes: list[SpawnProcess] = [
+        context.Process(
+            target=run_shard,
+            args=(shard, options, channels),
+            name=f"crawler-shard-{shard}",
+        )
+        for shard in range(workers)
+    ]
+    if metrics is not None:
+        metrics.start()
+    for process in processes:
+        process.start()
+
+    page_count: int = 0
+    running: set[int] = set(range(workers))
+    try:
+        while running:
+            try:
+                message: tuple = channels.results.get(timeout=1.0)
+            except queue.Empty:
+                # a shard that died can't finish its part of the crawl
+                for shard in running:
+                    if processes[shard].exitcode not in (None, 0):
+                        raise RuntimeError(
+                            f"crawler shard {shard} exited "
+                            f"with code {processes[shard].exitcode}"
+                        )
+                continue
+
+            if message[0] == PAGE_MESSAGE:
+                _, normalized_url, page = message
+                page_count += 1
+                if retain_pages:
+                    page_data[normalized_url] = page
+                for sink in sinks or []:
+                    sink.write(normalized_url, page)
+            elif message[0] == DONE_MESSAGE:
+                _, shard, shard_metrics, shard_failed = message
+                running.discard(shard)
+                if metrics is not None:
+                    metrics.merge(shard_metrics)
+                if failed is not None:
+                    failed.update(shard_failed)
+    finally:
+        if metrics is not None:
+            metrics.stop()
+        budget.stop()
+        for process in processes:
+            if running:
+                process.terminate()
+            process.join()
+
+    return page_count
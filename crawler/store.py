@@ -0,0 +1,267 @@
+import json
+import sqlite3
+from collections.abc import ItemsView, Iterator, MutableMapping, ValuesView
+from sqlite3 import Connection
+
+# frontier statuses
+PENDING: int = 0
+DONE: int = 1
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS frontier (
+    normalized_url TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    depth INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS pages (
+    normalized_url TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    h1 TEXT NOT NULL,
+    first_paragraph TEXT NOT NULL,
+    outgoing_links TEXT NOT NULL,
+    image_urls TEXT NOT NULL,
+    alias_of TEXT,
+    digest TEXT
+);
+"""
+
+
+class CrawlStore:
+    """SQLite-backed crawl state: the frontier, the visited set and
+    the extracted page records. Writes are buffered and committed
+    in batches of `batch_size` operations.
+    """
+
+    def __init__(self, path: str, batch_size: int, resume: bool = False):
+        self.path: str = path
+        self.batch_size: int = batch_size
+        self.connection: Connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        # state databases of earlier versions have no aliases
+        columns: list[str] = [
+            row[1]
+            for row in self.connection.execute("PRAGMA table_info(pages)")
+        ]
+        if "alias_of" not in columns:
+            with self.connection:
+                self.connection.execute(
+                    "ALTER TABLE pages ADD COLUMN alias_of TEXT"
+                )
+        # nor content digests
+        if "digest" not in columns:
+            with self.connection:
+                self.connection.execute(
+                    "ALTER TABLE pages ADD COLUMN digest TEXT"
+                )
+        # nor link depths, their pending URLs are treated as seeds
+        columns = [
+            row[1]
+            for row in self.connection.execute("PRAGMA table_info(frontier)")
+        ]
+        if "depth" not in columns:
+            with self.connection:
+                self.connection.execute(
+                    "ALTER TABLE frontier "
+                    "ADD COLUMN depth INTEGER NOT NULL DEFAULT 0"
+                )
+
+        # a new crawl starts from an empty state
+        if not resume:
+            with self.connection:
+                self.connection.execute("DELETE FROM frontier")
+                self.connection.execute("DELETE FROM pages")
+
+        # buffered writes
+        self.new_urls: list[tuple[str, str, int, int]] = []
+        self.done_urls: list[tuple[int, str]] = []
+        self.new_pages: list[
+            tuple[str, str, str, str, str, str, str | None, str | None]
+        ] = []
+
+        self.page_count: int = self.connection.execute(
+            "SELECT COUNT(*) FROM pages"
+        ).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add_url(self, url: str, normalized_url: str, depth: int = 0):
+        """Save a URL scheduled for crawling with its link depth"""
+        self.new_urls.append((normalized_url, url, PENDING, depth))
+        self.flush_if_full()
+
+    def mark_done(self, normalized_url: str):
+        """Mark a URL as crawled, whether it succeeded or not"""
+        self.done_urls.append((DONE, normalized_url))
+        self.flush_if_full()
+
+    def add_page(self, normalized_url: str, page: dict[str, str | list[str]]):
+        """Save extracted page data"""
+        self.new_pages.append(
+            (
+                normalized_url,
+                str(page["url"]),
+                str(page["h1"]),
+                str(page["first_paragraph"]),
+                json.dumps(page["outgoing_links"]),
+                json.dumps(page["image_urls"]),
+                page.get("alias_of"),
+                page.get("digest"),
+            )
+        )
+        self.page_count += 1
+        self.flush_if_full()
+
+    def flush_if_full(self):
+        """Commit buffered writes once there are enough of them"""
+        if (
+            len(self.new_urls) + len(self.done_urls) + len(self.new_pages)
+            >= self.batch_size
+        ):
+            self.flush()
+
+    def flush(self):
+        """Commit buffered writes in one transaction"""
+        if not (self.new_urls or self.done_urls or self.new_pages):
+            return
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO frontier VALUES (?, ?, ?, ?)",
+                self.new_urls,
+            )
+            self.connection.executemany(
+                "UPDATE frontier SET status = ? WHERE normalized_url = ?",
+                self.done_urls,
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self.new_pages,
+            )
+        self.new_urls.clear()
+        self.done_urls.clear()
+        self.new_pages.clear()
+
+    def close(self):
+        """Commit remaining writes and close the database"""
+        self.flush()
+        self.connection.close()
+
+    def visited_urls(self) -> Iterator[str]:
+        """Yield normalized URLs that were ever scheduled"""
+        self.flush()
+        for (normalized_url,) in self.connection.execute(
+            "SELECT normalized_url FROM frontier"
+        ):
+            yield normalized_url
+
+    def pending_urls(self) -> list[tuple[str, str, int]]:
+        """Return URLs scheduled but not crawled yet
+        with their normalized form and link depth
+        """
+        self.flush()
+        return self.connection.execute(
+            "SELECT url, normalized_url, depth FROM frontier "
+            "WHERE status = ?",
+            (PENDING,),
+        ).fetchall()
+
+    def iter_pages(self) -> Iterator[tuple[str, dict[str, str | list[str]]]]:
+        """Yield stored pages with their normalized URLs
+        in the order they were crawled
+        """
+        self.flush()
+        for row in self.connection.execute(
+            "SELECT * FROM pages ORDER BY rowid"
+        ):
+            yield row[0], page_from_row(row)
+
+    def get_page(self, normalized_url: str) -> dict[str, str | list[str]]:
+        """Return stored page data or raise `KeyError`"""
+        self.flush()
+        row = self.connection.execute(
+            "SELECT * FROM pages WHERE normalized_url = ?", (normalized_url,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(normalized_url)
+        return page_from_row(row)
+
+    def pages(self) -> "StorePageData":
+        """Return a `page_data` mapping backed by the store"""
+        return StorePageData(self)
+
+
+def page_from_row(row: tuple) -> dict[str, str | list[str]]:
+    """Build page data from a `pages` row"""
+    page: dict[str, str | list[str]] = {
+        "url": row[1],
+        "h1": row[2],
+        "first_paragraph": row[3],
+        "outgoing_links": json.loads(row[4]),
+        "image_urls": json.loads(row[5]),
+    }
+    if row[6] is not None:
+        page["alias_of"] = row[6]
+    if row[7] is not None:
+        page["digest"] = row[7]
+    return page
+
+
+class StorePageData(MutableMapping):
+    """`page_data` mapping that keeps pages in a `CrawlStore`
+    instead of memory
+    """
+
+    def __init__(self, store: CrawlStore):
+        self.store: CrawlStore = store
+
+    def __len__(self) -> int:
+        return self.store.page_count
+
+    def __getitem__(self, normalized_url: str) -> dict[str, str | list[str]]:
+        return self.store.get_page(normalized_url)
+
+    def __setitem__(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        self.store.add_page(normalized_url, page)
+
+    def __delitem__(self, normalized_url: str):
+        raise TypeError("stored pages can't be deleted")
+
+    def __iter__(self) -> Iterator[str]:
+        for normalized_url, _ in self.store.iter_pages():
+            yield normalized_url
+
+    def items(self) -> "StorePageItems":
+        return StorePageItems(self)
+
+    def values(self) -> "StorePageValues":
+        return StorePageValues(self)
+
+
+class StorePageItems(ItemsView):
+    """Pages of a `StorePageData` with their normalized URLs
+    read with a single query
+    """
+
+    _mapping: StorePageData
+
+    def __iter__(self) -> Iterator[tuple[str, dict[str, str | list[str]]]]:
+        yield from self._mapping.store.iter_pages()
+
+
+class StorePageValues(ValuesView):
+    """Pages of a `StorePageData` read with a single query"""
+
+    _mapping: StorePageData
+
+    def __iter__(self) -> Iterator[dict[str, str | list[str]]]:
+        for _, page in self._mapping.store.iter_pages():
+            yield page
@@ -0,0 +1,583 @@
+import threading
+import time
+from collections.abc import Callable, Iterator, MutableMapping
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import ExitStack
+from typing import Any
+
+import requests
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from crawler.budget import BudgetSpentError, CrawlBudget
+from crawler.cache import ResponseCache
+from crawler.canonical import CanonicalUrl, Canonicalizer
+from crawler.config import FRONTIER_SIZE
+from crawler.crawl import (
+    EXTRACTION_BACKEND,
+    USER_AGENT,
+    extract_page_data,
+    get_page,
+)
+from crawler.dedup import (
+    ContentFingerprint,
+    DuplicateIndex,
+    alias_page,
+    content_hash,
+)
+from crawler.frontier import Frontier, Scorer
+from crawler.metrics import CrawlMetrics
+from crawler.recrawl import PageDiff, unchanged_page
+from crawler.records import PageRecords
+from crawler.report import PageSink
+from crawler.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    Timeouts,
+    is_transient,
+)
+from crawler.seeding import SitemapParser, SiteSeeder
+from crawler.store import CrawlStore
+from crawler.visited import VisitedSet
+
+# errors of requests that may succeed if retried
+NETWORK_ERRORS: tuple[type[BaseException], ...] = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class SyncCrawler:
+    """Iterative synchronous crawler. Pages are fetched over a pooled
+    `requests.Session`, concurrently in a thread pool if
+    `max_concurrency` is greater than 1, and the frontier is processed
+    in a loop, so there's no recursion depth limit.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_concurrency: int,
+        max_pages_to_crawl: int,
+        frontier_size: int = FRONTIER_SIZE,
+        visited: VisitedSet | None = None,
+        store: CrawlStore | None = None,
+        sinks: list[PageSink] | None = None,
+        retain_pages: bool = True,
+        cache: ResponseCache | None = None,
+        seeder: SiteSeeder | None = None,
+        metrics: CrawlMetrics | None = None,
+        dedup: DuplicateIndex | None = None,
+        since: PageDiff | None = None,
+        max_page_bytes: int = 0,
+        max_depth: int | None = None,
+        scorer: Scorer | None = None,
+        timeouts: Timeouts | None = None,
+        retry: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        canonicalizer: Canonicalizer | None = None,
+        budget: CrawlBudget | None = None,
+    ):
+        self.base_url = base_url
+        # canonical forms of the URLs found, the visited set keys
+        self.canonicalizer: Canonicalizer = canonicalizer or Canonicalizer()
+        self.base_domain: str = self.canonicalizer.host(self.base_url)
+        # pages are kept in memory as compact records or in the crawl
+        # state database, a crawl that only streams pages to sinks
+        # doesn't keep them
+        self.store: CrawlStore | None = store
+        self.page_data: MutableMapping[str, dict[str, str | list[str]]] = (
+            store.pages() if store is not None else PageRecords()
+        )
+        self.retain_pages: bool = retain_pages or store is not None
+        self.page_count: int = len(self.page_data)
+        self.sinks: list[PageSink] = sinks or []
+        # validators and page data of earlier crawls
+        self.cache: ResponseCache | None = cache
+        # robots.txt rules and sitemap seeding
+        self.seeder: SiteSeeder | None = seeder
+        # phase timings and throughput
+        self.metrics: CrawlMetrics = metrics or CrawlMetrics()
+        # content fingerprints of crawled pages, shared by the fetch
+        # threads
+        self.dedup: DuplicateIndex | None = dedup
+        self.dedup_lock: threading.Lock = threading.Lock()
+        # pages of an earlier crawl compared with the new ones
+        self.since: PageDiff | None = since
+        # normalized URLs of pages that failed to be crawled
+        self.failed: set[str] = set()
+        # larger pages are dropped, 0 for no limit
+        self.max_page_bytes: int = max_page_bytes
+        # stalled requests time out and transient failures are retried,
+        # hosts failing every request are skipped for a while
+        self.timeouts: Timeouts = timeouts or Timeouts()
+        self.retry: RetryPolicy = retry or RetryPolicy()
+        self.breaker: CircuitBreaker = breaker or CircuitBreaker()
+
+        self.max_concurrency: int = max(1, max_concurrency)
+        self.frontier: Frontier = Frontier(
+            frontier_size, visited, max_depth, scorer
+        )
+        self.session: Session
+        self.executor: ThreadPoolExecutor | None = None
+
+        # page, byte and time budgets of the crawl, a fetch reserves
+        # its page before it starts and pages crawled before count
+        self.budget: CrawlBudget = budget or CrawlBudget(max_pages_to_crawl)
+        self.budget.add_crawled(self.page_count)
+        self.should_stop: bool = False
+
+    def __enter__(self):
+        """Open a pooled session and start the fetch threads"""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_concurrency,
+            pool_maxsize=self.max_concurrency,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.hooks["response"].append(self.metrics.response_hook)
+        if self.max_concurrency > 1:
+            self.executor = ThreadPoolExecutor(self.max_concurrency)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Stop the fetch threads and close the session"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def budget_spent(self) -> bool:
+        """Check if the crawl budget is spent, no more pages are fetched"""
+        if not self.should_stop and (budget := self.budget.spent()):
+            self.should_stop = True
+            print(f"Reached the {budget} budget of the crawl.")
+            # pages of the earlier crawl left in the frontier
+            # aren't removed
+            if self.since is not None:
+                self.since.stopped = True
+
+        return self.should_stop
+
+    def schedule(self, url: str, depth: int = 0):
+        """Add `url` to the frontier if it's on the same domain as the base URL,
+        `depth` is the number of links followed from the seeds to it
+        """
+        canonical: CanonicalUrl | None = self.canonicalizer.canonicalize(url)
+        if canonical is None or canonical.host != self.base_domain:
+            return
+        # obey robots.txt before the URL is ever requested
+        if self.seeder is not None and not self.seeder.allowed(canonical.url):
+            return
+        if (
+            self.frontier.put(canonical.url, canonical.key, depth)
+            and self.store is not None
+        ):
+            self.store.add_url(canonical.url, canonical.key, depth)
+
+    def mark_done(self, normalized_url: str):
+        """Keep a crawled URL out of the frontier of a resumed crawl"""
+        if self.store is not None:
+            self.store.mark_done(normalized_url)
+
+    def resume(self) -> bool:
+        """Restore the visited set and the frontier from the crawl state
+        database. Return `False` if there's nothing to resume.
+        """
+        if self.store is None:
+            return False
+
+        pending: list[tuple[str, str, int]] = self.store.pending_urls()
+        for normalized_url in self.store.visited_urls():
+            self.frontier.visited.reserve(normalized_url)
+        for url, normalized_url, depth in pending:
+            self.frontier.put_reserved(url, normalized_url, depth)
+
+        if pending:
+            print(
+                f"resuming crawl: {self.page_count} pages crawled, "
+                f"{len(pending)} URLs pending"
+            )
+        return bool(pending)
+
+    def load_robots(self):
+        """Apply cached or fetched robots.txt of the site"""
+        if self.seeder is None or self.seeder.load_cached():
+            return
+
+        robots_txt: str = ""
+        try:
+            resp = self.session.get(
+                self.seeder.robots_url,
+                headers={"User-Agent": USER_AGENT},
+                timeout=self.timeouts.requests_timeout(),
+            )
+            if resp.status_code < 400:
+                robots_txt = resp.text
+        except requests.RequestException as e:
+            print(f"error fetching {self.seeder.robots_url}: {e}")
+        self.seeder.set_robots(robots_txt)
+
+    def seed_sitemaps(self):
+        """Stream page URLs from the sitemaps into the frontier"""
+        if self.seeder is None:
+            return
+
+        # sitemap URLs of an earlier crawl
+        if self.seeder.from_cache:
+            for url in self.seeder.urls:
+                self.schedule(url)
+            return
+
+        while (sitemap_url := self.seeder.next_sitemap()) is not None:
+            print(f"reading sitemap: {sitemap_url}")
+            parser: SitemapParser = SitemapParser()
+            try:
+                with self.session.get(
+                    sitemap_url,
+                    headers={"User-Agent": USER_AGENT},
+                    stream=True,
+                    timeout=self.timeouts.requests_timeout(),
+                ) as resp:
+                    if resp.status_code >= 400:
+                        raise Exception(
+                            "server responded with error: "
+                            f"'{resp.status_code}'"
+                        )
+                    for chunk in resp.iter_content(2**16):
+                        for url in self.seeder.add_urls(parser.feed(chunk)):
+                            self.schedule(url)
+                        if self.seeder.is_full():
+                            break
+                    else:
+                        for url in self.seeder.add_urls(parser.close()):
+                            self.schedule(url)
+            except Exception as e:
+                print(f"error reading sitemap {sitemap_url}: {e}")
+
+        self.seeder.save()
+        print(f"Seeded {len(self.seeder.urls)} URLs from sitemaps.")
+
+    def request_page(
+        self, url: str, validators: dict[str, str] | None
+    ) -> tuple[bytes | None, str, dict[str, str]]:
+        """Fetch a page with `get_page`, retrying transient failures"""
+        host: str = self.canonicalizer.host(url)
+
+        attempt: int = 0
+        while True:
+            probe: bool = False
+            try:
+                probe = self.breaker.check(host)
+                page: tuple[bytes | None, str, dict[str, str]] = get_page(
+                    url,
+                    validators,
+                    self.session,
+                    self.max_page_bytes,
+                    self.timeouts,
+                    self.budget,
+                )
+            except CircuitOpenError as e:
+                raise Exception(f"network error: {e}") from e
+            except BudgetSpentError:
+                raise
+            except Exception as e:
+                transient: bool = is_transient(e, NETWORK_ERRORS)
+                self.breaker.record(host, transient)
+                probe = False
+                if not transient or attempt >= self.retry.retries:
+                    raise
+            else:
+                self.breaker.record(host, False)
+                probe = False
+                return page
+            finally:
+                # a probe stopped by the budget or cancelled has
+                # no outcome
+                if probe:
+                    self.breaker.release(host)
+
+            # back off in the fetch thread before the retry
+            time.sleep(self.retry.delay(attempt))
+            attempt += 1
+            self.metrics.add_retry()
+            print(f"retrying: {url} (attempt {attempt + 1})")
+
+    def fetch_page_data(
+        self,
+        url: str,
+        validators: dict[str, str] | None,
+        previous: dict[str, str | list[str]] | None = None,
+    ) -> tuple[dict[str, str | list[str]] | None, dict[str, str]]:
+        """Fetch and extract page data in a fetch thread. Return `None`
+        instead of the page data if the cached page wasn't modified.
+        The `previous` data of a page whose content didn't change since
+        the earlier crawl is reused.
+        """
+        with self.metrics.timer("page"):
+            html, encoding, new_validators = self.request_page(url, validators)
+        if html is None:
+            return None, new_validators
+
+        # a page with the cached content isn't extracted again,
+        # even if the server doesn't send validators
+        digest: str = content_hash(html).hex()
+        new_validators["digest"] = digest
+        if self.cache is not None and (
+            validators and validators.get("digest") == digest
+        ):
+            return None, new_validators
+
+        # a copy of a crawled page isn't extracted again, the page claims
+        # its content before it's extracted, so copies fetched by other
+        # threads meanwhile are aliases of it
+        canonical_url: str | None = None
+        if self.dedup is not None:
+            fingerprint: ContentFingerprint = self.dedup.fingerprint(
+                html, encoding
+            )
+            with self.dedup_lock:
+                canonical_url = self.dedup.find(fingerprint)
+                if canonical_url is None:
+                    self.dedup.add(fingerprint, url)
+
+        # a page unchanged since the earlier crawl isn't extracted again
+        page: dict[str, str | list[str]]
+        if canonical_url is not None:
+            page = alias_page(url, canonical_url)
+        elif (unchanged := unchanged_page(previous, digest)) is not None:
+            page = {**unchanged, "url": url}
+        else:
+            with self.metrics.timer("parse"):
+                page = extract_page_data(
+                    html, url, EXTRACTION_BACKEND, encoding
+                )
+        page["digest"] = digest
+        return page, new_validators
+
+    def submit(self, function: Callable[..., Any], *args: Any) -> Future:
+        """Run the `function` in a fetch thread,
+        or right away if there's no thread pool
+        """
+        if self.executor is not None:
+            return self.executor.submit(function, *args)
+
+        future: Future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def store_page(
+        self,
+        url: str,
+        normalized_url: str,
+        depth: int,
+        future: Future,
+        cached: tuple[dict[str, str], dict[str, str | list[str]]] | None,
+    ) -> dict[str, str | list[str]] | None:
+        """Store the fetched page, found `depth` links away from
+        the seeds, and schedule its outgoing links. Return the page data,
+        `None` if the page failed.
+        """
+        try:
+            page, new_validators = future.result()
+        except BudgetSpentError as e:
+            # the page is left for a resumed crawl
+            self.budget.release()
+            print(f"stopped crawling {url}: {e}")
+            return None
+        except Exception as e:
+            # the page of the failed fetch goes back to the budget
+            self.budget.release()
+            print(f"error crawling {url}: {e}")
+            self.metrics.errors += 1
+            self.failed.add(normalized_url)
+            if self.since is not None:
+                self.since.record_failure(normalized_url)
+            self.mark_done(normalized_url)
+            return None
+
+        if self.cache is not None:
+            # the page wasn't modified, reuse its cached data
+            if page is None and cached is not None:
+                self.cache.hit(normalized_url)
+                page = {**cached[1], "url": url}
+            else:
+                self.cache.put(
+                    normalized_url, new_validators, page, cached is not None
+                )
+
+        # store page data, a fetch in flight when the budget ran out
+        # is still stored
+        self.budget.finish()
+        if self.retain_pages:
+            self.page_data[normalized_url] = page
+        self.page_count += 1
+        self.metrics.pages += 1
+        self.mark_done(normalized_url)
+        if self.since is not None:
+            self.since.record(normalized_url, page)
+
+        # stream the page to the reports
+        for sink in self.sinks:
+            sink.write(normalized_url, page)
+
+        # don't grow the frontier once the budget is spent,
+        # a resumable crawl still saves the links for later
+        if self.budget_spent() and self.store is None:
+            return page
+
+        # schedule crawling for each URL on the page
+        for link in page["outgoing_links"]:
+            self.schedule(link, depth + 1)
+        return page
+
+    def crawl(self) -> MutableMapping[str, dict[str, str | list[str]]]:
+        """Start crawling from `base_url` or continue an interrupted crawl
+        and return the page data
+        """
+        for _ in self.iter_pages():
+            pass
+        return self.page_data
+
+    def iter_pages(self) -> Iterator[dict[str, str | list[str]]]:
+        """Crawl like `crawl` and yield the data of every page as soon
+        as it's stored. No more pages are fetched until the consumer asks
+        for the next one, besides those already in the fetch threads.
+        Pages are still kept in `page_data` unless `retain_pages` is off.
+        A crawler used outside of `with` opens its own session.
+        """
+        with ExitStack() as stack:
+            if getattr(self, "session", None) is None:
+                stack.enter_context(self)
+            try:
+                yield from self.fetch_pages()
+            finally:
+                # the consumer may stop before the end of the crawl
+                self.metrics.stop()
+                self.budget.stop()
+
+    def fetch_pages(self) -> Iterator[dict[str, str | list[str]]]:
+        """Crawl in the open session, yielding every stored page"""
+        self.metrics.start()
+        self.budget.start()
+        if self.seeder is not None:
+            self.load_robots()
+        if not self.resume():
+            self.schedule(self.base_url)
+        # pages of the earlier crawl are fetched right away
+        # instead of being rediscovered through links
+        if self.since is not None:
+            for url in self.since.urls():
+                self.schedule(url)
+        # sitemaps are read before crawling, the sync engine
+        # has no way to interleave them with page fetches
+        self.seed_sitemaps()
+
+        in_flight: dict[Future, tuple[str, str, int, Any]] = {}
+        while self.frontier or in_flight:
+            # keep every fetch thread busy while there's budget left,
+            # every fetch reserves its page before it starts
+            while (
+                self.frontier
+                and len(in_flight) < self.max_concurrency
+                and self.budget.reserve()
+            ):
+                url, normalized_url, depth = self.frontier.pop()
+                cached = (
+                    self.cache.get(normalized_url)
+                    if self.cache is not None
+                    else None
+                )
+                # the earlier crawl is read here, the store isn't shared
+                # with the fetch threads
+                previous: dict[str, str | list[str]] | None = (
+                    self.since.get(normalized_url)
+                    if self.since is not None
+                    else None
+                )
+                print(f"crawling: {url} (Active: {len(in_flight) + 1})")
+                future: Future = self.submit(
+                    self.fetch_page_data, url, cached and cached[0], previous
+                )
+                in_flight[future] = (url, normalized_url, depth, cached)
+
+            # the budget is spent, the rest of the frontier isn't crawled
+            # and the fetches in flight finish
+            if not in_flight:
+                self.budget_spent()
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, normalized_url, depth, cached = in_flight.pop(future)
+                page: dict[str, str | list[str]] | None = self.store_page(
+                    url, normalized_url, depth, future, cached
+                )
+                if page is not None:
+                    yield page
+
+        if self.frontier.dropped:
+            print(f"Frontier was full, skipped {self.frontier.dropped} URLs.")
+        print(f"Visited set: {self.frontier.visited.describe()}")
+
+
+def crawl_site_sync(
+    base_url: str,
+    max_concurrency: int,
+    max_pages_to_crawl: int,
+    frontier_size: int = FRONTIER_SIZE,
+    visited: VisitedSet | None = None,
+    store: CrawlStore | None = None,
+    sinks: list[PageSink] | None = None,
+    retain_pages: bool = True,
+    cache: ResponseCache | None = None,
+    seeder: SiteSeeder | None = None,
+    metrics: CrawlMetrics | None = None,
+    dedup: DuplicateIndex | None = None,
+    since: PageDiff | None = None,
+    max_page_bytes: int = 0,
+    max_depth: int | None = None,
+    scorer: Scorer | None = None,
+    timeouts: Timeouts | None = None,
+    retry: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+    canonicalizer: Canonicalizer | None = None,
+    budget: CrawlBudget | None = None,
+) -> MutableMapping[str, dict[str, str | list[str]]]:
+    """Create a `SyncCrawler`'s instance on the `base_url`
+    and start crawling
+    """
+    with SyncCrawler(
+        base_url,
+        max_concurrency,
+        max_pages_to_crawl,
+        frontier_size,
+        visited,
+        store,
+        sinks,
+        retain_pages,
+        cache,
+        seeder,
+        metrics,
+        dedup,
+        since,
+        max_page_bytes,
+        max_depth,
+        scorer,
+        timeouts,
+        retry,
+        breaker,
+        canonicalizer,
+        budget,
+    ) as crawler:
+        return crawler.crawl()
@@ -0,0 +1,160 @@
+import math
+import sys
+from hashlib import blake2b
+
+
+class VisitedSet:
+    """Exact set of normalized URLs reserved for crawling.
+    A URL is reserved when it's scheduled, so it can never be fetched twice,
+    even while its first fetch is still in flight.
+    """
+
+    kind: str = "exact"
+
+    def __init__(self):
+        self.urls: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __contains__(self, normalized_url: str) -> bool:
+        return normalized_url in self.urls
+
+    def reserve(self, normalized_url: str) -> bool:
+        """Reserve the URL, return `False` if it was reserved before"""
+        if normalized_url in self.urls:
+            return False
+        self.urls.add(normalized_url)
+        return True
+
+    def memory_bytes(self) -> int:
+        """Return the approximate memory used by the set"""
+        return sys.getsizeof(self.urls) + sum(
+            sys.getsizeof(url) for url in self.urls
+        )
+
+    def describe(self) -> str:
+        """Return a one-line summary of the set size and memory"""
+        return (
+            f"{len(self)} URLs, "
+            f"{self.memory_bytes() / 2**20:.2f} MiB ({self.kind})"
+        )
+
+
+class FingerprintSet(VisitedSet):
+    """Set of 64-bit URL fingerprints. Uses a fraction of the memory
+    of an exact set, at the cost of a negligible collision probability.
+    """
+
+    kind: str = "fingerprint"
+
+    def __init__(self):
+        self.fingerprints: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def __contains__(self, normalized_url: str) -> bool:
+        return url_fingerprint(normalized_url) in self.fingerprints
+
+    def reserve(self, normalized_url: str) -> bool:
+        fingerprint: int = url_fingerprint(normalized_url)
+        if fingerprint in self.fingerprints:
+            return False
+        self.fingerprints.add(fingerprint)
+        return True
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self.fingerprints) + len(
+            self.fingerprints
+        ) * sys.getsizeof(2**63)
+
+
+class BloomFilter(VisitedSet):
+    """Fixed-size Bloom filter sized for `capacity` URLs with
+    the given false positive rate. Memory doesn't grow with the crawl,
+    a false positive makes the crawler skip a URL it hasn't seen.
+    """
+
+    kind: str = "bloom"
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity <= 0:
+            raise ValueError("Bloom filter capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("Bloom filter error rate must be between 0 and 1")
+
+        self.capacity: int = capacity
+        self.error_rate: float = error_rate
+        # optimal number of bits and hash functions
+        self.size: int = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hash_count: int = max(
+            1, round(self.size / capacity * math.log(2))
+        )
+        self.bits: bytearray = bytearray((self.size + 7) // 8)
+        self.count: int = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, normalized_url: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(normalized_url)
+        )
+
+    def reserve(self, normalized_url: str) -> bool:
+        is_new: bool = False
+        for position in self.positions(normalized_url):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                is_new = True
+
+        if is_new:
+            self.count += 1
+        return is_new
+
+    def positions(self, normalized_url: str) -> list[int]:
+        """Return bit positions of the URL using double hashing"""
+        digest: bytes = blake2b(
+            normalized_url.encode("utf-8"), digest_size=16
+        ).digest()
+        first: int = int.from_bytes(digest[:8], "little")
+        second: int = int.from_bytes(digest[8:], "little") | 1
+        return [
+            (first + i * second) % self.size for i in range(self.hash_count)
+        ]
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self.bits)
+
+
+def url_fingerprint(normalized_url: str) -> int:
+    """Return a 64-bit fingerprint of the URL"""
+    return int.from_bytes(
+        blake2b(normalized_url.encode("utf-8"), digest_size=8).digest(),
+        "little",
+    )
+
+
+VISITED_SETS: dict[str, type[VisitedSet]] = {
+    visited_set.kind: visited_set
+    for visited_set in (VisitedSet, FingerprintSet, BloomFilter)
+}
+
+
+def create_visited_set(
+    kind: str, capacity: int, error_rate: float
+) -> VisitedSet:
+    """Create a visited set of the given `kind`,
+    `capacity` and `error_rate` only apply to a Bloom filter
+    """
+    if kind == BloomFilter.kind:
+        return BloomFilter(capacity, error_rate)
+    if kind in VISITED_SETS:
+        return VISITED_SETS[kind]()
+
+    raise ValueError(f"unknown visited set: '{kind}'")
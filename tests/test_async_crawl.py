@@ -0,0 +1,126 @@
+import asyncio
+import contextlib
+import io
+import unittest
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer
+from crawler.async_crawl import AsyncCrawler
+from crawler.dedup import DuplicateIndex
+from tests.test_sync_crawl import CopySite
+
+# a crawl that doesn't shut down fails the test instead of hanging it
+CRAWL_TIMEOUT: float = 30.0
+
+
+class FailingCrawler(AsyncCrawler):
+    """Crawler whose workers fail on some pages outside of the error
+    handling of the crawl
+    """
+
+    def __init__(self, *args, failing: set[str], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failing: set[str] = failing
+
+    async def store_page(
+        self, normalized_url: str, page: dict[str, str | list[str]]
+    ):
+        if normalized_url.split("/", 1)[-1] in self.failing:
+            raise RuntimeError(f"can't store {normalized_url}")
+        await super().store_page(normalized_url, page)
+
+
+class SlowParseCrawler(AsyncCrawler):
+    """Crawler taking a while to parse pages, so other pages arrive
+    while a page is parsed
+    """
+
+    async def parse_page(
+        self, html: bytes, url: str, encoding: str
+    ) -> dict[str, str | list[str]]:
+        await asyncio.sleep(0.05)
+        return await super().parse_page(html, url, encoding)
+
+
+class TestAsyncCrawl(unittest.TestCase):
+    def setUp(self):
+        # keep the crawl progress out of the test output
+        self.stdout: io.StringIO = io.StringIO()
+        self.output = contextlib.redirect_stdout(self.stdout)
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+
+    def crawl(self, crawler: AsyncCrawler) -> set[asyncio.Task]:
+        """Crawl and return the tasks left running after the crawl"""
+
+        async def crawl() -> set[asyncio.Task]:
+            async with crawler:
+                await asyncio.wait_for(crawler.crawl(), CRAWL_TIMEOUT)
+            return asyncio.all_tasks() - {asyncio.current_task()}
+
+        return asyncio.run(crawl())
+
+    def test_workers_exit_when_done(self):
+        # a root without links and one with 30 pages behind it
+        for pages, fan_out, page_count in ((1, 0, 1), (30, 3, 31)):
+            config = SiteConfig(pages=pages, fan_out=fan_out, latency=0.002)
+            with SiteServer(config) as server:
+                crawler = AsyncCrawler(server.url, 8, 100)
+                tasks = self.crawl(crawler)
+
+            with self.subTest(pages=pages):
+                self.assertEqual(crawler.page_count, page_count)
+                self.assertEqual(len(crawler.frontier), 0)
+                self.assertEqual(crawler.active, 0)
+                self.assertEqual(tasks, set())
+
+    def test_worker_exception(self):
+        config = SiteConfig(pages=30, fan_out=3, latency=0.002)
+        with SiteServer(config) as server:
+            crawler = FailingCrawler(
+                server.url, 8, 100, failing={"p/1", "p/7"}
+            )
+            tasks = self.crawl(crawler)
+
+        # the workers go on with the rest of the frontier
+        self.assertEqual(self.stdout.getvalue().count("can't store"), 2)
+        self.assertEqual(tasks, set())
+        self.assertEqual(len(crawler.frontier), 0)
+        self.assertGreater(crawler.page_count, 1)
+        self.assertFalse(
+            {
+                url
+                for url in crawler.page_data
+                if url.endswith(("/p/1", "/p/7"))
+            }
+        )
+
+    def test_copies_in_flight(self):
+        # the copies arrive while the first of them is parsed
+        config = SiteConfig(pages=9, latency=0.02)
+        server = SiteServer(config)
+        server.site = CopySite(config)
+        with server:
+            crawler = SlowParseCrawler(
+                server.url, 8, 100, dedup=DuplicateIndex()
+            )
+            self.crawl(crawler)
+
+        copies = [
+            page
+            for normalized_url, page in crawler.page_data.items()
+            if "/p/" in normalized_url
+        ]
+        self.assertEqual(len(copies), 8)
+        # a single copy is extracted, the others are its aliases
+        extracted = [page for page in copies if "alias_of" not in page]
+        self.assertEqual(len(extracted), 1)
+        self.assertEqual(crawler.dedup.duplicates, 7)
+        self.assertEqual(
+            {page["digest"] for page in copies}, {extracted[0]["digest"]}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import asyncio
+import contextlib
+import io
+import time
+import unittest
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer, SyntheticSite
+from crawler.async_crawl import AsyncCrawler
+from crawler.budget import DOWNLOADED, BudgetSpentError, CrawlBudget
+from crawler.crawl import CHUNK_SIZE, BodyLimit
+from crawler.retry import RetryPolicy
+from crawler.sync_crawl import SyncCrawler
+
+
+class CountingSite(SyntheticSite):
+    """Synthetic site counting the requests of every page"""
+
+    def __init__(self, config: SiteConfig):
+        super().__init__(config)
+        self.requests: Counter = Counter()
+
+    async def handle_page(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        return await super().handle_page(request)
+
+
+class TestBudget(unittest.TestCase):
+    def test_page_budget(self):
+        budget = CrawlBudget(2)
+        self.assertTrue(budget.reserve())
+        self.assertTrue(budget.reserve())
+        # every page left is being fetched
+        self.assertFalse(budget.reserve())
+        self.assertEqual(budget.spent(), "")
+
+        # a failed fetch gives its page back
+        budget.release()
+        self.assertTrue(budget.reserve())
+        budget.finish()
+        budget.finish()
+        self.assertFalse(budget.reserve())
+        self.assertEqual(budget.spent(), "page")
+
+    def test_crawled_pages_count(self):
+        budget = CrawlBudget(3)
+        budget.add_crawled(2)
+        self.assertTrue(budget.reserve())
+        self.assertFalse(budget.reserve())
+
+    def test_byte_budget(self):
+        budget = CrawlBudget(10, max_bytes=100)
+        self.assertTrue(budget.reserve())
+        budget.add_bytes(100)
+        budget.finish()
+        self.assertFalse(budget.reserve())
+        self.assertEqual(budget.spent(), "byte")
+
+    def test_failed_downloads_count(self):
+        budget = CrawlBudget(10, max_bytes=100)
+        limit = BodyLimit(60, budget=budget)
+        limit.check(b"<html>" + b" " * 44)
+        with self.assertRaises(Exception):
+            limit.check(b" " * 50)
+        self.assertEqual(budget.counts[DOWNLOADED], 100)
+
+        # downloads stop once the budget is spent
+        with self.assertRaises(BudgetSpentError):
+            BodyLimit(0, budget=budget)
+
+    def test_time_budget(self):
+        budget = CrawlBudget(10, max_duration=0.05)
+        budget.start()
+        self.assertTrue(budget.reserve())
+        time.sleep(0.06)
+        self.assertFalse(budget.reserve())
+        self.assertEqual(budget.spent(), "time")
+
+
+class TestCrawlBudget(unittest.TestCase):
+    def setUp(self):
+        self.config = SiteConfig(pages=100, fan_out=5, latency=0.005)
+        # keep the crawl progress out of the test output
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+
+    def serve(self, site: CountingSite) -> SiteServer:
+        server = SiteServer(self.config)
+        server.site = site
+        return server
+
+    def crawl_async(self, crawler: AsyncCrawler):
+        async def crawl():
+            async with crawler:
+                await crawler.crawl()
+
+        asyncio.run(crawl())
+
+    def test_async_page_limit(self):
+        with self.serve(CountingSite(self.config)) as server:
+            crawler = AsyncCrawler(server.url, 16, 10)
+            self.crawl_async(crawler)
+
+        # no page is downloaded past the limit
+        self.assertEqual(crawler.page_count, 10)
+        self.assertEqual(sum(server.site.requests.values()), 10)
+
+    def test_sync_page_limit(self):
+        with self.serve(CountingSite(self.config)) as server:
+            with SyncCrawler(server.url, 8, 10) as crawler:
+                crawler.crawl()
+
+        self.assertEqual(crawler.page_count, 10)
+        self.assertEqual(sum(server.site.requests.values()), 10)
+
+    def test_failed_pages_are_replaced(self):
+        self.config.error_rate = 0.3
+        with self.serve(CountingSite(self.config)) as server:
+            crawler = AsyncCrawler(
+                server.url, 8, 10, retry=RetryPolicy(retries=0)
+            )
+            self.crawl_async(crawler)
+
+        self.assertEqual(crawler.page_count, 10)
+        self.assertEqual(
+            sum(server.site.requests.values()), 10 + len(crawler.failed)
+        )
+
+    def test_byte_budget_overshoot(self):
+        # pages of several chunks, downloads in flight stop at their
+        # next chunk once the budget is spent
+        self.config.page_bytes = 8 * CHUNK_SIZE
+        max_bytes: int = 16 * CHUNK_SIZE
+        for engine in ("async", "sync"):
+            budget = CrawlBudget(100, max_bytes=max_bytes)
+            with self.serve(CountingSite(self.config)) as server:
+                if engine == "async":
+                    crawler = AsyncCrawler(server.url, 4, 100, budget=budget)
+                    self.crawl_async(crawler)
+                else:
+                    with SyncCrawler(
+                        server.url, 4, 100, budget=budget
+                    ) as crawler:
+                        crawler.crawl()
+
+            with self.subTest(engine=engine):
+                self.assertEqual(budget.spent(), "byte")
+                downloaded: int = budget.counts[DOWNLOADED]
+                self.assertGreaterEqual(downloaded, max_bytes)
+                self.assertLessEqual(downloaded, max_bytes + 4 * CHUNK_SIZE)
+                # stopped downloads aren't stored or failed
+                self.assertLessEqual(crawler.page_count, 2)
+                self.assertFalse(crawler.failed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from crawler.cache import ResponseCache
+
+
+class TestCache(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.normalized_url: str = "blog.boot.dev/some/path"
+        self.validators: dict[str, str] = {
+            "etag": '"abc"',
+            "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+        }
+        self.page: dict[str, str | list[str]] = {
+            "url": "https://blog.boot.dev/some/path",
+            "h1": "Some Fancy Title",
+            "first_paragraph": "This paragraph is expected.",
+            "outgoing_links": ["https://blog.boot.dev"],
+            "image_urls": [],
+        }
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path: str = os.path.join(self.tmp_dir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cache_round_trip(self):
+        with ResponseCache(self.db_path, 2**20, 10) as cache:
+            self.assertIsNone(cache.get(self.normalized_url))
+            cache.put(self.normalized_url, self.validators, self.page)
+
+        with ResponseCache(self.db_path, 2**20, 10) as cache:
+            actual = cache.get(self.normalized_url)
+            cache.hit(self.normalized_url)
+            self.assertEqual(actual, (self.validators, self.page))
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_cache_skips_responses_without_validators(self):
+        with ResponseCache(self.db_path, 2**20, 10) as cache:
+            cache.put(self.normalized_url, {}, self.page)
+            self.assertIsNone(cache.get(self.normalized_url))
+            self.assertEqual(cache.size, 0)
+
+    def test_cache_evicts_least_recently_used(self):
+        with ResponseCache(self.db_path, 2**20, 10) as cache:
+            cache.put("blog.boot.dev/old", self.validators, self.page)
+            cache.max_bytes = cache.size
+            cache.put(self.normalized_url, self.validators, self.page)
+
+            self.assertIsNone(cache.get("blog.boot.dev/old"))
+            self.assertIsNotNone(cache.get(self.normalized_url))
+            self.assertEqual(cache.evicted, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
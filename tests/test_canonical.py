@@ -0,0 +1,123 @@
+import unittest
+
+from crawler.canonical import CanonicalRules, CanonicalUrl, Canonicalizer
+from crawler.crawl import get_urls_from_html, resolve_url
+
+
+class TestCanonical(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.base_url: str = "https://blog.boot.dev"
+        self.html_template: str = "<html><body>{}</body></html>"
+        self.a_template: str = '<a href="{}">Link text</a>'
+
+    def test_scheme_host_and_port(self):
+        canonicalizer = Canonicalizer()
+        canonical = canonicalizer.canonicalize(
+            "HTTPS://Blog.Boot.dev:443/Path"
+        )
+        self.assertEqual(
+            canonical,
+            CanonicalUrl(
+                "https://blog.boot.dev/Path",
+                "blog.boot.dev/Path",
+                "blog.boot.dev",
+            ),
+        )
+        # other ports are kept
+        self.assertEqual(
+            canonicalizer.host("http://blog.boot.dev:8080/"),
+            "blog.boot.dev:8080",
+        )
+        self.assertEqual(
+            canonicalizer.key("blog.boot.dev:8080/path"),
+            "blog.boot.dev:8080/path",
+        )
+
+    def test_non_http_urls(self):
+        canonicalizer = Canonicalizer()
+        for url in (
+            "mailto:team@boot.dev",
+            "javascript:void(0)",
+            "tel:+15555550100",
+            "ftp://blog.boot.dev/file",
+        ):
+            self.assertIsNone(canonicalizer.canonicalize(url))
+        self.assertEqual(canonicalizer.hits["scheme"], 4)
+
+    def test_fragment_and_path(self):
+        canonicalizer = Canonicalizer()
+        self.assertEqual(
+            canonicalizer.key("https://blog.boot.dev/a/./b/../c/#top"),
+            "blog.boot.dev/a/c",
+        )
+        self.assertEqual(
+            canonicalizer.key("https://blog.boot.dev/%7euser/a b/%2f"),
+            "blog.boot.dev/~user/a%20b/%2F",
+        )
+        self.assertEqual(
+            canonicalizer.key("https://blog.boot.dev"), "blog.boot.dev"
+        )
+
+    def test_query_params(self):
+        canonicalizer = Canonicalizer()
+        # tracking parameters are dropped and the others sorted
+        self.assertEqual(
+            canonicalizer.key(
+                "https://blog.boot.dev/?utm_source=x&page=2&FBCLID=1&q=go"
+            ),
+            "blog.boot.dev?page=2&q=go",
+        )
+
+        canonicalizer = Canonicalizer(
+            CanonicalRules(keep_params=("page",), sort_params=False)
+        )
+        self.assertEqual(
+            canonicalizer.key("https://blog.boot.dev/?q=go&page=2&sort=new"),
+            "blog.boot.dev?page=2",
+        )
+        canonicalizer = Canonicalizer(CanonicalRules(strip_params=("s*",)))
+        self.assertEqual(
+            canonicalizer.key("https://blog.boot.dev/?sort=new&utm_id=1"),
+            "blog.boot.dev?utm_id=1",
+        )
+
+    def test_cache(self):
+        canonicalizer = Canonicalizer(cache_size=2)
+        for url in ("https://blog.boot.dev/a#1", "https://blog.boot.dev/a#1"):
+            canonicalizer.canonicalize(url)
+        info = canonicalizer.canonicalize.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+        # rules count every distinct URL once
+        self.assertEqual(canonicalizer.hits["fragment"], 1)
+
+        for number in range(3):
+            canonicalizer.canonicalize(f"https://blog.boot.dev/{number}")
+        self.assertEqual(canonicalizer.canonicalize.cache_info().currsize, 2)
+
+    def test_resolve_url(self):
+        self.assertEqual(
+            resolve_url(f"{self.base_url}/a/b", "../c?page=2#top"),
+            f"{self.base_url}/c?page=2",
+        )
+        self.assertIsNone(resolve_url(self.base_url, "mailto:team@boot.dev"))
+        self.assertIsNone(resolve_url(self.base_url, "javascript:void(0)"))
+
+    def test_get_urls_from_html_keeps_queries(self):
+        content: str = "".join(
+            self.a_template.format(url)
+            for url in ("/search?q=go", "mailto:team@boot.dev", "#top")
+        )
+        actual: list[str] = get_urls_from_html(
+            self.html_template.format(content), self.base_url
+        )
+        expected: list[str] = [
+            f"{self.base_url}/search?q=go",
+            self.base_url,
+        ]
+        self.assertListEqual(actual, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,12 @@ from crawler.crawl import (
     get_urls_from_html,
     get_images_from_html,
     extract_page_data,
+    sniff_encoding,
+    sniff_non_html,
+    BodyLimit,
+    StreamExtractor,
+    BS4_BACKEND,
+    LXML_BACKEND,
 )
 
 
@@ -267,6 +273,191 @@ class TestCrawl(unittest.TestCase):
         }
         self.assertDictEqual(actual, expected)
 
+    def test_extract_page_data_backends_match(self):
+        h1: str = self.h1_template.format(
+            "<!-- comment -->"
+            f"{self.expected_h1_text}"
+            "<script>var a;</script><template>Template text</template>"
+        )
+        p: str = self.p_template.format(self.expected_p_text)
+        main: str = self.main_template.format(p)
+        a: str = self.a_template.format(self.path)
+        img: str = self.img_template.format(self.rel_img_url)
+        content: str = f"{h1}\n{main}\n{a}\n{img}"
+        html: str = self.html_template.format(content=content)
+
+        actual_lxml: dict[str, str | list[str]] = extract_page_data(
+            html, self.abs_url_https, LXML_BACKEND
+        )
+        actual_bs4: dict[str, str | list[str]] = extract_page_data(
+            html, self.abs_url_https, BS4_BACKEND
+        )
+        expected: dict[str, str | list[str]] = {
+            "url": self.abs_url_https,
+            "h1": self.expected_h1_text,
+            "first_paragraph": self.expected_p_text,
+            "outgoing_links": [self.abs_url_with_path],
+            "image_urls": [self.abs_img_url],
+        }
+        self.assertDictEqual(actual_lxml, expected)
+        self.assertDictEqual(actual_bs4, expected)
+
+    def test_extract_page_data_empty_document(self):
+        actual: dict[str, str | list[str]] = extract_page_data(
+            "", self.abs_url_https
+        )
+        expected: dict[str, str | list[str]] = {
+            "url": self.abs_url_https,
+            "h1": "",
+            "first_paragraph": "",
+            "outgoing_links": [],
+            "image_urls": [],
+        }
+        self.assertDictEqual(actual, expected)
+
+    def test_extract_page_data_bytes_match_text(self):
+        h1: str = self.h1_template.format("Café Zürich")
+        p: str = self.p_template.format(self.expected_p_text)
+        a: str = self.a_template.format(self.path)
+        html: str = self.html_template.format(content=f"{h1}\n{p}\n{a}")
+        expected: dict[str, str | list[str]] = extract_page_data(
+            html, self.abs_url_https
+        )
+
+        for backend in (LXML_BACKEND, BS4_BACKEND):
+            # declared encoding
+            self.assertDictEqual(
+                extract_page_data(
+                    html.encode("cp1252"),
+                    self.abs_url_https,
+                    backend,
+                    "cp1252",
+                ),
+                expected,
+            )
+            # sniffed encoding
+            meta_html: str = html.replace(
+                "<html>", '<html><meta charset="windows-1252">'
+            )
+            self.assertDictEqual(
+                extract_page_data(
+                    meta_html.encode("cp1252"), self.abs_url_https, backend
+                ),
+                expected,
+            )
+
+    def test_sniff_encoding(self):
+        self.assertEqual(sniff_encoding(b"<html>"), "utf-8")
+        self.assertEqual(sniff_encoding(b"<html>", "ISO-8859-2"), "iso-8859-2")
+        self.assertEqual(
+            sniff_encoding(b'<meta charset="Shift_JIS"><p>'), "shift_jis"
+        )
+        self.assertEqual(
+            sniff_encoding(
+                b'<meta http-equiv="Content-Type" '
+                b'content="text/html; charset=koi8-r">'
+            ),
+            "koi8-r",
+        )
+        # the header wins over the document, a byte order mark over both
+        self.assertEqual(
+            sniff_encoding(b'<meta charset="koi8-r">', "utf-8"), "utf-8"
+        )
+        self.assertEqual(
+            sniff_encoding(b"\xef\xbb\xbf<meta charset=koi8-r>", "cp1252"),
+            "utf-8",
+        )
+        # unknown and late declarations are ignored
+        self.assertEqual(sniff_encoding(b"<html>", "x-unknown"), "utf-8")
+        self.assertEqual(
+            sniff_encoding(b" " * 2048 + b'<meta charset="koi8-r">'), "utf-8"
+        )
+
+    # Streaming extraction
+
+    def test_stream_extractor_matches_lxml(self):
+        h1: str = self.h1_template.format(
+            f"<b>{self.expected_h1_text}</b><script>var a;</script>"
+        )
+        early_p: str = self.p_template.format("Before main.")
+        p: str = self.p_template.format(
+            f"<i>{self.expected_p_text}</i> <a href='/in-p'>x</a>"
+        )
+        main: str = self.main_template.format(p)
+        links: str = "\n".join(
+            f"<div>{self.a_template.format(f'/page/{i}')}"
+            f"{self.img_template.format(f'/img/{i}.png')}</div>"
+            for i in range(200)
+        )
+        content: str = f"{early_p}\n{links}\n{h1}\n{main}"
+        html: str = self.html_template.format(content=content)
+        body: bytes = html.encode()
+
+        for chunk_size in (1, 7, 1024, len(body)):
+            stream: StreamExtractor = StreamExtractor(self.abs_url_https)
+            for start in range(0, len(body), chunk_size):
+                stream.feed(body[start : start + chunk_size])
+            self.assertDictEqual(
+                stream.close(),
+                extract_page_data(html, self.abs_url_https, LXML_BACKEND),
+            )
+
+    def test_stream_extractor_nested_main(self):
+        # elements starting inside a paragraph come after it, like
+        # in the tree walk
+        documents: list[str] = [
+            "<p>outer <main>inner</main> end</p><p>n</p>",
+            "<p>a<main>b<p>c</p></main></p><p>d</p>",
+            "<main><p>first <main>again</main></p><p>second</p></main>",
+            "<p>x <a href='/a'>y</a><img src='/y.png'></p>"
+            "<main><a href='/b'>z</a><p>q</p></main>",
+        ]
+        for html in documents:
+            body: bytes = self.html_template.format(content=html).encode()
+            expected = extract_page_data(
+                body, self.abs_url_https, LXML_BACKEND
+            )
+            for chunk_size in (1, len(body)):
+                with self.subTest(html=html, chunk_size=chunk_size):
+                    stream: StreamExtractor = StreamExtractor(
+                        self.abs_url_https
+                    )
+                    for start in range(0, len(body), chunk_size):
+                        stream.feed(body[start : start + chunk_size])
+                    self.assertDictEqual(stream.close(), expected)
+
+    def test_stream_extractor_empty_document(self):
+        stream: StreamExtractor = StreamExtractor(self.abs_url_https)
+        expected: dict[str, str | list[str]] = {
+            "url": self.abs_url_https,
+            "h1": "",
+            "first_paragraph": "",
+            "outgoing_links": [],
+            "image_urls": [],
+        }
+        self.assertDictEqual(stream.close(), expected)
+
+    # Response body checks
+
+    def test_sniff_non_html(self):
+        self.assertEqual(sniff_non_html(b"%PDF-1.7\n"), "PDF")
+        self.assertEqual(sniff_non_html(b"\x89PNG\r\n"), "PNG")
+        self.assertEqual(sniff_non_html(b"abc\x00\x01"), "binary")
+        self.assertIsNone(sniff_non_html(b"<!DOCTYPE html><html>"))
+        self.assertIsNone(sniff_non_html("<html>".encode("utf-16")))
+
+    def test_body_limit(self):
+        limit: BodyLimit = BodyLimit(10)
+        limit.check(b"<html>")
+        with self.assertRaises(Exception):
+            limit.check(b"<body>")
+
+        with self.assertRaises(Exception):
+            BodyLimit(10, "11")
+        with self.assertRaises(Exception):
+            BodyLimit(0).check(b"%PDF-1.7")
+        BodyLimit(0, "11").check(b"<html>" * 100)
+
 
 if __name__ == "__main__":
     unittest.main()
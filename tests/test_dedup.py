@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from crawler.dedup import (
+    DuplicateIndex,
+    SimHashIndex,
+    alias_page,
+    create_duplicate_index,
+    simhash,
+)
+
+
+class TestDedup(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.html: str = """<html><head><title>Learn Go</title></head><body>
+<nav><a href="/">Home</a> <a href="/courses">Courses</a></nav>
+<h1>Learn Go concurrency</h1>
+<p>Goroutines are lightweight threads managed by the Go runtime. Starting one
+is as simple as putting the go keyword in front of a function call, and
+thousands of them can run in a single program without much memory.</p>
+<p>Channels let goroutines communicate by sending typed values to each other.
+A send blocks until another goroutine receives the value, which makes
+channels a simple way to synchronize work without locks.</p>
+<p>The select statement waits on several channel operations at once and runs
+the first one that is ready. Combined with a timeout channel it keeps slow
+operations from blocking a program forever.</p>
+<footer>Updated on March 3, 2024</footer></body></html>"""
+        # the same article updated on another day
+        self.updated_html: str = self.html.replace("March 3", "March 4")
+        self.other_html: str = (
+            self.html.replace("Go", "Rust")
+            .replace("goroutine", "task")
+            .replace("channel", "queue")
+        )
+
+    def test_simhash(self):
+        self.assertEqual(simhash(self.html), simhash(self.html))
+        self.assertLessEqual(
+            (simhash(self.html) ^ simhash(self.updated_html)).bit_count(), 3
+        )
+        self.assertGreater(
+            (simhash(self.html) ^ simhash(self.other_html)).bit_count(), 3
+        )
+        self.assertEqual(simhash("<p>too short</p>"), 0)
+
+    def test_simhash_is_stable(self):
+        # fingerprints don't depend on the hash seed of the interpreter
+        fingerprints: set[str] = {
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys; from crawler.dedup import simhash; "
+                    "print(simhash(sys.stdin.read()))",
+                ],
+                input=self.html,
+                capture_output=True,
+                text=True,
+                check=True,
+                env={**os.environ, "PYTHONHASHSEED": seed},
+            ).stdout.strip()
+            for seed in ("1", "2")
+        }
+        self.assertEqual(fingerprints, {str(simhash(self.html))})
+
+    def test_simhash_index(self):
+        index = SimHashIndex(3)
+        index.add(0b1111, "https://blog.boot.dev")
+
+        self.assertEqual(index.find(0b1111), "https://blog.boot.dev")
+        self.assertEqual(index.find(0b1000), "https://blog.boot.dev")
+        self.assertIsNone(index.find(0b10000))
+        self.assertIsNone(index.find(0b1111 << 32))
+
+    def test_exact_duplicates(self):
+        index = DuplicateIndex()
+        fingerprint = index.fingerprint(self.html)
+        self.assertIsNone(index.find(fingerprint))
+        index.add(fingerprint, "https://blog.boot.dev")
+
+        self.assertEqual(
+            index.find(index.fingerprint(self.html)), "https://blog.boot.dev"
+        )
+        self.assertIsNone(index.find(index.fingerprint(self.updated_html)))
+        self.assertEqual(index.duplicates, 1)
+
+    def test_near_duplicates(self):
+        index = DuplicateIndex(near=True)
+        index.add(index.fingerprint(self.html), "https://blog.boot.dev")
+
+        self.assertEqual(
+            index.find(index.fingerprint(self.updated_html)),
+            "https://blog.boot.dev",
+        )
+        self.assertIsNone(index.find(index.fingerprint(self.other_html)))
+
+    def test_undecoded_documents(self):
+        index = DuplicateIndex(near=True)
+        index.add(index.fingerprint(self.html), "https://blog.boot.dev")
+
+        self.assertEqual(
+            index.find(
+                index.fingerprint(self.html.encode("utf-16"), "utf-16")
+            ),
+            "https://blog.boot.dev",
+        )
+        self.assertEqual(
+            index.fingerprint(self.html.encode()).digest,
+            index.fingerprint(self.html).digest,
+        )
+
+    def test_alias_page(self):
+        page = alias_page(
+            "https://blog.boot.dev/print", "https://blog.boot.dev"
+        )
+        self.assertEqual(page["alias_of"], "https://blog.boot.dev")
+        self.assertEqual(page["outgoing_links"], [])
+
+    def test_create_duplicate_index(self):
+        self.assertIsNone(create_duplicate_index("off", 3))
+        self.assertFalse(create_duplicate_index("exact", 3).near)
+        self.assertTrue(create_duplicate_index("near", 3).near)
+        with self.assertRaises(ValueError):
+            create_duplicate_index("fuzzy", 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+
+from crawler.frontier import AsyncFrontier, Frontier, UrlScorer, create_scorer
+
+
+def put(frontier: Frontier, path: str, depth: int = 0) -> bool:
+    return frontier.put(
+        f"https://blog.boot.dev{path}", f"blog.boot.dev{path}", depth
+    )
+
+
+def drain(frontier: Frontier) -> list[str]:
+    return [frontier.pop()[1] for _ in range(len(frontier))]
+
+
+class TestFrontier(unittest.TestCase):
+    def test_bfs_order(self):
+        frontier = Frontier(0)
+        put(frontier, "/a/b", 2)
+        put(frontier, "/a", 1)
+        put(frontier, "/c", 1)
+        put(frontier, "", 0)
+
+        self.assertEqual(
+            drain(frontier),
+            [
+                "blog.boot.dev",
+                "blog.boot.dev/a",
+                "blog.boot.dev/c",
+                "blog.boot.dev/a/b",
+            ],
+        )
+
+    def test_closer_link(self):
+        frontier = Frontier(0)
+        put(frontier, "/a", 1)
+        put(frontier, "/b", 3)
+        self.assertFalse(put(frontier, "/b", 0))
+
+        self.assertEqual(
+            frontier.pop(), ("https://blog.boot.dev/b", "blog.boot.dev/b", 0)
+        )
+        self.assertEqual(len(frontier), 1)
+
+    def test_max_depth(self):
+        frontier = Frontier(0, max_depth=1)
+        self.assertFalse(put(frontier, "/a/b", 2))
+        # a URL too deep isn't reserved
+        self.assertTrue(put(frontier, "/a/b", 1))
+        self.assertFalse(put(frontier, "/a/b", 1))
+        self.assertEqual(len(frontier), 1)
+
+    def test_maxsize(self):
+        frontier = Frontier(1)
+        self.assertTrue(put(frontier, "/a"))
+        self.assertFalse(put(frontier, "/b"))
+        self.assertEqual(frontier.dropped, 1)
+
+    def test_score_inlinks(self):
+        frontier = Frontier(0, scorer=UrlScorer())
+        put(frontier, "/a", 1)
+        put(frontier, "/b", 1)
+        put(frontier, "/c", 1)
+        # links found later move a URL up
+        put(frontier, "/c", 1)
+        put(frontier, "/c", 2)
+        put(frontier, "/b", 1)
+
+        self.assertEqual(
+            drain(frontier),
+            ["blog.boot.dev/c", "blog.boot.dev/b", "blog.boot.dev/a"],
+        )
+
+    def test_score_patterns(self):
+        frontier = Frontier(0, scorer=create_scorer("score", [r"^/posts/"]))
+        put(frontier, "/about", 1)
+        put(frontier, "/tags/go", 1)
+        put(frontier, "/posts/go/intro", 3)
+
+        self.assertEqual(
+            drain(frontier),
+            [
+                "blog.boot.dev/posts/go/intro",
+                "blog.boot.dev/about",
+                "blog.boot.dev/tags/go",
+            ],
+        )
+
+    def test_stale_entries(self):
+        frontier = Frontier(0, scorer=UrlScorer())
+        put(frontier, "/a", 1)
+        for _ in range(5000):
+            put(frontier, "/a", 1)
+
+        # replaced entries don't pile up
+        self.assertLess(len(frontier.pending), 2000)
+        self.assertEqual(frontier.pop()[2], 1)
+        self.assertEqual(len(frontier), 0)
+
+    def test_create_scorer(self):
+        self.assertIsNone(create_scorer("bfs"))
+        with self.assertRaises(ValueError):
+            create_scorer("dfs")
+
+    def test_async_frontier(self):
+        async def crawl() -> list[str]:
+            frontier = AsyncFrontier(0)
+            put(frontier, "/a/b", 2)
+            put(frontier, "/a", 1)
+            # relinked URLs are only handed out once
+            put(frontier, "/a/b", 1)
+            urls: list[str] = []
+            for _ in range(2):
+                urls.append((await frontier.get())[1])
+                frontier.task_done()
+            await asyncio.wait_for(frontier.join(), 1)
+            return urls
+
+        self.assertEqual(
+            asyncio.run(crawl()), ["blog.boot.dev/a", "blog.boot.dev/a/b"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
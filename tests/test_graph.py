@@ -0,0 +1,158 @@
+import importlib.util
+import unittest
+
+from crawler.records import PageRecords
+
+# the link graph needs the optional NumPy dependency
+HAS_NUMPY: bool = importlib.util.find_spec("numpy") is not None
+if HAS_NUMPY:
+    from crawler.graph import GRAPH_COLUMNS, UNREACHABLE, LinkGraph
+
+
+def page(url: str, links: list[str]) -> dict[str, str | list[str]]:
+    return {
+        "url": url,
+        "h1": "",
+        "first_paragraph": "",
+        "outgoing_links": links,
+        "image_urls": ["https://blog.boot.dev/logo.png"],
+    }
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+class TestGraph(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.base_url: str = "https://blog.boot.dev"
+        self.page_data: dict[str, dict[str, str | list[str]]] = {
+            "blog.boot.dev": page(
+                "https://blog.boot.dev/",
+                [
+                    "https://blog.boot.dev/about",
+                    "https://blog.boot.dev/posts/",
+                    "https://blog.boot.dev/about",
+                    "https://blog.boot.dev",
+                ],
+            ),
+            "blog.boot.dev/about": page(
+                "https://blog.boot.dev/about",
+                ["https://blog.boot.dev/posts", "https://blog.boot.dev/gone"],
+            ),
+            "blog.boot.dev/posts": page(
+                "https://blog.boot.dev/posts",
+                ["https://blog.boot.dev/posts/1"],
+            ),
+            "blog.boot.dev/posts/1": page(
+                "https://blog.boot.dev/posts/1",
+                ["https://blog.boot.dev/"],
+            ),
+            "blog.boot.dev/archive": page(
+                "https://blog.boot.dev/archive",
+                ["https://blog.boot.dev/posts/1"],
+            ),
+        }
+
+    def test_csr_matrix(self):
+        graph = LinkGraph.from_page_data(self.page_data, self.base_url)
+
+        # link targets that weren't crawled follow the crawled pages
+        self.assertEqual(graph.urls, [*self.page_data, "blog.boot.dev/gone"])
+        self.assertEqual(graph.indptr.tolist(), [0, 2, 4, 5, 6, 7, 7])
+        # repeated links and links to the page itself are dropped
+        self.assertEqual(graph.indices.tolist(), [1, 2, 2, 5, 3, 0, 3])
+        self.assertEqual(graph.links, 7)
+
+    def test_records(self):
+        records = PageRecords()
+        records.update(self.page_data)
+
+        graph = LinkGraph.from_page_data(records, self.base_url)
+        expected = LinkGraph.from_page_data(self.page_data, self.base_url)
+        self.assertEqual(graph.urls, expected.urls)
+        self.assertEqual(graph.indptr.tolist(), expected.indptr.tolist())
+        self.assertEqual(graph.indices.tolist(), expected.indices.tolist())
+
+    def test_external_links(self):
+        page_data = {
+            **self.page_data,
+            "blog.boot.dev/links": page(
+                "https://blog.boot.dev/links",
+                [
+                    "https://boot.dev/courses",
+                    "https://github.com/bootdotdev",
+                    "https://blog.boot.dev:8080/posts",
+                    "https://blog.boot.dev/posts",
+                ],
+            ),
+        }
+        records = PageRecords()
+        records.update(page_data)
+
+        for pages in (page_data, records):
+            graph = LinkGraph.from_page_data(pages, self.base_url)
+            # links to other hosts aren't nodes of the graph
+            self.assertEqual(graph.urls, [*page_data, "blog.boot.dev/gone"])
+            self.assertEqual(graph.links, 8)
+            self.assertEqual(graph.node("blog.boot.dev/gone"), 6)
+            self.assertIsNone(graph.node("boot.dev/courses"))
+
+    def test_analysis(self):
+        analysis = LinkGraph.from_page_data(
+            self.page_data, self.base_url
+        ).analyze("https://blog.boot.dev", {"blog.boot.dev/gone"})
+
+        self.assertEqual(analysis.in_degree.tolist(), [1, 1, 2, 2, 0])
+        self.assertEqual(analysis.depth.tolist(), [0, 1, 1, 2, UNREACHABLE])
+        # the root isn't an orphan even if no page links to it
+        self.assertEqual(
+            analysis.orphan.tolist(), [False, False, False, False, True]
+        )
+        self.assertEqual(analysis.broken_links.tolist(), [0, 1, 0, 0, 0])
+        self.assertEqual(
+            analysis.describe(),
+            "5 pages, 7 links, 1 orphan pages, 1 broken links, "
+            "maximum depth 2",
+        )
+
+    def test_pagerank(self):
+        ranks = LinkGraph.from_page_data(
+            self.page_data, self.base_url
+        ).pagerank()
+
+        self.assertAlmostEqual(ranks.sum(), 1.0)
+        # the archive only gets the share every page gets
+        self.assertEqual(ranks.argmin(), 4)
+        self.assertGreater(ranks[3], ranks[2])
+
+    def test_annotate(self):
+        analysis = LinkGraph.from_page_data(
+            self.page_data, self.base_url
+        ).analyze("https://blog.boot.dev")
+        pages = dict(analysis.annotate(self.page_data))
+
+        self.assertEqual(list(pages), list(self.page_data))
+        about = pages["blog.boot.dev/about"]
+        self.assertEqual(about["h1"], "")
+        self.assertEqual(
+            {column: about[column] for column in GRAPH_COLUMNS},
+            {
+                "in_degree": 1,
+                "depth": 1,
+                "pagerank": about["pagerank"],
+                "orphan": False,
+                "broken_links": 0,
+            },
+        )
+
+    def test_empty(self):
+        analysis = LinkGraph.from_page_data({}, self.base_url).analyze(
+            self.base_url
+        )
+
+        self.assertEqual(analysis.describe().split(",")[0], "0 pages")
+        self.assertEqual(list(analysis.annotate({})), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import contextlib
+import io
+import unittest
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer
+from crawler.async_crawl import AsyncCrawler
+from crawler.sync_crawl import SyncCrawler
+
+
+class TestIterPages(unittest.TestCase):
+    def setUp(self):
+        self.server = SiteServer(SiteConfig(pages=20, fan_out=3, latency=0))
+        self.server.__enter__()
+        # keep the crawl progress out of the test output
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.server.__exit__(None, None, None)
+
+    def test_async_pages(self):
+        crawler = AsyncCrawler(self.server.url, 4, 100, retain_pages=False)
+
+        async def collect() -> list[str]:
+            return [page["url"] async for page in crawler.iter_pages()]
+
+        urls = asyncio.run(collect())
+        # the root and its 20 pages
+        self.assertEqual(len(urls), 21)
+        self.assertEqual(len(set(urls)), 21)
+        self.assertEqual(len(crawler.page_data), 0)
+
+    def test_async_backpressure(self):
+        crawler = AsyncCrawler(self.server.url, 2, 100)
+
+        async def consume_slowly() -> int:
+            async with contextlib.aclosing(
+                crawler.iter_pages(buffer_size=1)
+            ) as pages:
+                async for _ in pages:
+                    await asyncio.sleep(0.05)
+                    # the buffered page and the pages held by waiting
+                    # workers are crawled ahead of the consumer
+                    return crawler.page_count
+            return 0
+
+        self.assertLessEqual(asyncio.run(consume_slowly()), 4)
+        # the crawl stops with the consumer
+        self.assertIsNone(crawler.page_queue)
+
+    def test_sync_pages(self):
+        crawler = SyncCrawler(self.server.url, 2, 100)
+        pages = crawler.iter_pages()
+
+        first = next(pages)
+        self.assertEqual(first["url"], self.server.url)
+        # fetching waits for the consumer
+        self.assertLessEqual(crawler.page_count, 2)
+        self.assertEqual(len(list(pages)), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import time
+import unittest
+
+from crawler.limiter import AdaptiveLimiter, parse_retry_after
+
+
+class TestLimiter(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.host: str = "blog.boot.dev"
+
+    def run_requests(
+        self, limiter: AdaptiveLimiter, count: int, status: int, ttfb: float
+    ):
+        async def request():
+            async with limiter.slot(self.host) as slot:
+                slot.status = status
+                slot.ttfb = ttfb
+
+        async def run():
+            for _ in range(count):
+                await request()
+
+        asyncio.run(run())
+
+    def test_limiter_increases_on_success(self):
+        limiter: AdaptiveLimiter = AdaptiveLimiter(2, 1, 8)
+        self.run_requests(limiter, 50, 200, 0.01)
+        self.assertEqual(limiter.hosts[self.host].limit, 8)
+
+    def test_limiter_backs_off_on_overload(self):
+        limiter: AdaptiveLimiter = AdaptiveLimiter(8, 2, 8)
+        self.run_requests(limiter, 1, 503, 0.01)
+        self.assertEqual(limiter.hosts[self.host].limit, 4)
+        # the same overload event doesn't back off twice
+        self.run_requests(limiter, 1, 429, 0.01)
+        self.assertEqual(limiter.hosts[self.host].limit, 4)
+        self.assertEqual(limiter.trace[-1][3], "status 503")
+
+    def test_limiter_respects_floor(self):
+        limiter: AdaptiveLimiter = AdaptiveLimiter(2, 2, 8)
+        self.run_requests(limiter, 1, 503, 0.01)
+        self.assertEqual(limiter.hosts[self.host].limit, 2)
+
+    def test_limiter_caps_in_flight_requests(self):
+        limiter: AdaptiveLimiter = AdaptiveLimiter(2, 1, 2)
+        in_flight: list[int] = []
+
+        async def request():
+            async with limiter.slot(self.host) as slot:
+                in_flight.append(limiter.in_flight())
+                await asyncio.sleep(0.01)
+                slot.status = 200
+
+        async def run():
+            await asyncio.gather(*(request() for _ in range(6)))
+
+        asyncio.run(run())
+        self.assertEqual(max(in_flight), 2)
+
+    def test_limiter_ignores_cancelled_requests(self):
+        limiter: AdaptiveLimiter = AdaptiveLimiter(8, 2, 8)
+
+        async def request():
+            async with limiter.slot(self.host):
+                await asyncio.sleep(1)
+
+        async def run():
+            task = asyncio.create_task(request())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertEqual(limiter.hosts[self.host].limit, 8)
+        self.assertEqual(limiter.in_flight(), 0)
+
+    def test_hedges_have_their_own_slots(self):
+        limiter: AdaptiveLimiter = AdaptiveLimiter(1, 1, 1)
+        hedged: list[float] = []
+
+        async def stalled():
+            async with limiter.slot(self.host):
+                await asyncio.sleep(1)
+
+        async def hedge():
+            async with limiter.slot(self.host, hedge=True) as slot:
+                hedged.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+                slot.status = 200
+
+        async def run():
+            task = asyncio.create_task(stalled())
+            await asyncio.sleep(0.01)
+            # hedges wait for each other, not for the stalled request
+            await asyncio.gather(hedge(), hedge())
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        started: float = time.perf_counter()
+        asyncio.run(run())
+        self.assertEqual(len(hedged), 2)
+        self.assertLess(max(hedged), 0.5)
+        self.assertGreater(hedged[1] - hedged[0], 0.005)
+        self.assertEqual(limiter.in_flight(), 0)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertEqual(parse_retry_after("soon"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
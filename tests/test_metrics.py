@@ -0,0 +1,91 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from crawler.metrics import CrawlMetrics, Histogram
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.75), 1.0)
+        # values above every bound are estimated by the highest bound
+        self.assertEqual(histogram.quantile(1.0), 1.0)
+
+    def test_summary(self):
+        metrics = CrawlMetrics()
+        self.assertEqual(metrics.summary()["pages_per_sec"], 0.0)
+
+        metrics.start()
+        with metrics.timer("parse"):
+            pass
+        metrics.observe("ttfb", 0.02)
+        metrics.add_bytes(1000)
+        metrics.pages += 2
+        metrics.stop()
+
+        summary = metrics.summary()
+        self.assertEqual(summary["pages"], 2)
+        self.assertEqual(summary["bytes"], 1000)
+        self.assertGreater(summary["pages_per_sec"], 0)
+        self.assertEqual(list(summary["phases"]), ["parse", "ttfb"])
+        self.assertEqual(summary["phases"]["ttfb"]["p50"], 0.025)
+
+    def test_merge(self):
+        metrics = CrawlMetrics()
+        metrics.observe("ttfb", 0.02)
+        metrics.pages += 1
+
+        shard = CrawlMetrics()
+        shard.observe("ttfb", 0.5)
+        shard.observe("parse", 0.01)
+        shard.add_bytes(1000)
+        shard.pages += 2
+        shard.errors += 1
+        # shards send their metrics to the main process
+        metrics.merge(pickle.loads(pickle.dumps(shard)))
+
+        summary = metrics.summary()
+        self.assertEqual(summary["pages"], 3)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["bytes"], 1000)
+        self.assertEqual(summary["phases"]["ttfb"]["count"], 2)
+        self.assertEqual(summary["phases"]["parse"]["count"], 1)
+
+    def test_write(self):
+        metrics = CrawlMetrics()
+        metrics.observe("ttfb", 0.02)
+        metrics.observe("ttfb", 50)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path: str = os.path.join(tmp_dir, "metrics.json")
+            metrics.write(json_path)
+            with open(json_path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["phases"]["ttfb"]["count"], 2)
+
+            prom_path: str = os.path.join(tmp_dir, "metrics.prom")
+            metrics.write(prom_path)
+            with open(prom_path, encoding="utf-8") as f:
+                lines: list[str] = f.read().splitlines()
+
+        self.assertIn(
+            'crawler_phase_seconds_bucket{phase="ttfb",le="0.025"} 1', lines
+        )
+        self.assertIn(
+            'crawler_phase_seconds_bucket{phase="ttfb",le="+Inf"} 2', lines
+        )
+        self.assertIn('crawler_phase_seconds_count{phase="ttfb"} 2', lines)
+        self.assertIn("crawler_pages_total 0", lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
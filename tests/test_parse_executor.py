@@ -0,0 +1,96 @@
+import asyncio
+import contextlib
+import io
+import os
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer
+from crawler.async_crawl import AsyncCrawler, create_parse_executor
+from crawler.config import (
+    INLINE_EXECUTOR,
+    PROCESS_EXECUTOR,
+    THREAD_EXECUTOR,
+)
+
+
+def broken_process_pool() -> ProcessPoolExecutor:
+    """Return a process pool whose worker died"""
+    pool = ProcessPoolExecutor(max_workers=1)
+    with contextlib.suppress(BrokenProcessPool):
+        pool.submit(os._exit, 1).result()
+    return pool
+
+
+class TestParseExecutor(unittest.TestCase):
+    def setUp(self):
+        self.server = SiteServer(SiteConfig(pages=20, fan_out=3, latency=0))
+        self.server.__enter__()
+        # keep the crawl progress out of the test output
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.server.__exit__(None, None, None)
+
+    def crawl(self, parse_executor: str, broken: bool = False) -> AsyncCrawler:
+        async def crawl() -> AsyncCrawler:
+            async with AsyncCrawler(
+                self.server.url, 4, 100, parse_executor
+            ) as crawler:
+                if broken:
+                    crawler.executor.shutdown()
+                    crawler.executor = broken_process_pool()
+                await crawler.crawl()
+            return crawler
+
+        return asyncio.run(crawl())
+
+    def test_same_page_data(self):
+        inline = dict(self.crawl(INLINE_EXECUTOR).page_data.items())
+        # the root and its 20 pages
+        self.assertEqual(len(inline), 21)
+        for parse_executor in (THREAD_EXECUTOR, PROCESS_EXECUTOR):
+            with self.subTest(parse_executor=parse_executor):
+                crawler = self.crawl(parse_executor)
+                self.assertEqual(dict(crawler.page_data.items()), inline)
+                self.assertIn("parse", crawler.metrics.phases)
+
+    def test_broken_process_pool(self):
+        inline = dict(self.crawl(INLINE_EXECUTOR).page_data.items())
+
+        # pages are parsed in threads once the worker processes die
+        crawler = self.crawl(PROCESS_EXECUTOR, broken=True)
+        self.assertIsInstance(crawler.executor, ThreadPoolExecutor)
+        self.assertEqual(dict(crawler.page_data.items()), inline)
+        self.assertFalse(crawler.failed)
+
+    def test_create_parse_executor(self):
+        self.assertIsNone(create_parse_executor(INLINE_EXECUTOR))
+        for kind, executor_type in (
+            (THREAD_EXECUTOR, ThreadPoolExecutor),
+            (PROCESS_EXECUTOR, ProcessPoolExecutor),
+        ):
+            executor = create_parse_executor(kind)
+            self.assertIsInstance(executor, executor_type)
+            executor.shutdown()
+
+        with self.assertRaises(ValueError):
+            create_parse_executor("fork")
+
+    def test_process_pool_unavailable(self):
+        # e.g. platforms without working semaphores
+        with mock.patch(
+            "crawler.async_crawl.ProcessPoolExecutor",
+            side_effect=NotImplementedError("no sem_open"),
+        ):
+            executor = create_parse_executor(PROCESS_EXECUTOR)
+        self.assertIsInstance(executor, ThreadPoolExecutor)
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
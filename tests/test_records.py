@@ -0,0 +1,86 @@
+import json
+import unittest
+
+from crawler.records import PageRecords, UrlTable
+
+
+class TestRecords(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.page_data: dict[str, dict[str, str | list[str]]] = {
+            "blog.boot.dev": {
+                "url": "https://blog.boot.dev",
+                "h1": "Boot.dev Blog",
+                "first_paragraph": "Welcome.",
+                "outgoing_links": [
+                    "https://blog.boot.dev/about",
+                    "https://blog.boot.dev/posts",
+                ],
+                "image_urls": ["https://blog.boot.dev/logo.png"],
+                "digest": "0123456789abcdef" * 2,
+            },
+            "blog.boot.dev/about": {
+                "url": "https://blog.boot.dev/about",
+                "h1": "",
+                "first_paragraph": "",
+                "outgoing_links": [
+                    "https://blog.boot.dev",
+                    "https://blog.boot.dev/posts",
+                    "https://blog.boot.dev/posts",
+                ],
+                "image_urls": ["https://blog.boot.dev/logo.png"],
+            },
+        }
+
+    def test_url_table(self):
+        table = UrlTable()
+        self.assertEqual(table.intern("https://blog.boot.dev"), 0)
+        self.assertEqual(table.intern("https://blog.boot.dev/about"), 1)
+        self.assertEqual(table.intern("https://blog.boot.dev"), 0)
+
+        url_ids = table.intern_all(
+            ["https://blog.boot.dev/about", "https://blog.boot.dev/posts"]
+        )
+        self.assertEqual(list(url_ids), [1, 2])
+        self.assertEqual(
+            table.resolve(url_ids),
+            ["https://blog.boot.dev/about", "https://blog.boot.dev/posts"],
+        )
+        self.assertEqual(len(table), 3)
+
+    def test_page_records(self):
+        records = PageRecords()
+        for normalized_url, page in self.page_data.items():
+            records[normalized_url] = page
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(dict(records.items()), self.page_data)
+        # the JSON report of the records doesn't change
+        self.assertEqual(
+            json.dumps(dict(records.items()), indent=4),
+            json.dumps(self.page_data, indent=4),
+        )
+        # URLs repeated across pages are kept once
+        self.assertEqual(len(records.table), 4)
+
+        # aliases keep the URL of the page they are a copy of
+        alias = {
+            "url": "https://blog.boot.dev/print",
+            "h1": "",
+            "first_paragraph": "",
+            "outgoing_links": [],
+            "image_urls": [],
+            "alias_of": "https://blog.boot.dev",
+        }
+        records["blog.boot.dev/print"] = alias
+        self.assertEqual(records["blog.boot.dev/print"], alias)
+        self.assertNotIn("alias_of", records["blog.boot.dev"])
+        del records["blog.boot.dev/print"]
+
+        del records["blog.boot.dev"]
+        self.assertEqual(list(records), ["blog.boot.dev/about"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer
+from crawler.async_crawl import AsyncCrawler
+from crawler.recrawl import PageDiff, load_report, unchanged_page
+from crawler.report import JSONSink, NDJSONSink, write_report
+from crawler.sync_crawl import SyncCrawler
+
+
+class TestRecrawl(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.base_url: str = "https://blog.boot.dev"
+        self.page_data: dict[str, dict[str, str | list[str]]] = {
+            f"blog.boot.dev/{i}": {
+                "url": f"{self.base_url}/{i}",
+                "h1": f"Title {i}",
+                "first_paragraph": f"Paragraph {i}",
+                "outgoing_links": [f"{self.base_url}/{i + 1}"],
+                "image_urls": [],
+            }
+            for i in range(3)
+        }
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fname: str = os.path.join(self.tmp_dir.name, "report")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load_report(self):
+        write_report(self.page_data, JSONSink(self.fname))
+        write_report(self.page_data, NDJSONSink(self.fname, compress=True))
+
+        self.assertEqual(load_report(f"{self.fname}.json"), self.page_data)
+        self.assertEqual(
+            load_report(f"{self.fname}.ndjson.gz"), self.page_data
+        )
+
+    def test_page_diff(self):
+        diff = PageDiff(self.page_data)
+        self.assertEqual(
+            diff.urls(), [f"{self.base_url}/{i}" for i in range(3)]
+        )
+
+        diff.record("blog.boot.dev/0", self.page_data["blog.boot.dev/0"])
+        changed = {**self.page_data["blog.boot.dev/1"], "h1": "New title"}
+        diff.record("blog.boot.dev/1", changed)
+        added = {**self.page_data["blog.boot.dev/0"], "url": "/3"}
+        diff.record("blog.boot.dev/3", added)
+
+        self.assertEqual(diff.unchanged, 1)
+        self.assertEqual(diff.changed["blog.boot.dev/1"]["fields"], ["h1"])
+        self.assertEqual(diff.added, {"blog.boot.dev/3": added})
+        self.assertEqual(list(diff.removed()), ["blog.boot.dev/2"])
+        self.assertEqual(
+            diff.describe(), "1 added, 1 removed, 1 changed, 1 unchanged"
+        )
+
+        diff.write(f"{self.fname}-diff.json")
+        with open(f"{self.fname}-diff.json", encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertEqual(
+            report["summary"],
+            {
+                "added": 1,
+                "removed": 1,
+                "changed": 1,
+                "unchanged": 1,
+                "not_recrawled": 0,
+            },
+        )
+        self.assertEqual(
+            report["changed"]["blog.boot.dev/1"]["after"], changed
+        )
+
+    def test_old_report_keys(self):
+        # reports written before URL canonicalization lowercased
+        # whole URLs and kept the default port
+        page = {
+            **self.page_data["blog.boot.dev/0"],
+            "url": "https://blog.boot.dev:443/Posts/Go-Intro",
+        }
+        diff = PageDiff({"blog.boot.dev:443/posts/go-intro": page})
+
+        self.assertEqual(len(diff), 1)
+        self.assertIs(diff.get("blog.boot.dev/Posts/Go-Intro"), page)
+        self.assertIsNone(diff.get("blog.boot.dev/posts/go-intro"))
+
+        diff.record("blog.boot.dev/Posts/Go-Intro", page)
+        self.assertEqual(diff.unchanged, 1)
+        self.assertEqual(diff.removed(), {})
+
+    def test_unchanged_page(self):
+        page = {**self.page_data["blog.boot.dev/0"], "digest": "00ff"}
+        self.assertIs(unchanged_page(page, "00ff"), page)
+        self.assertIsNone(unchanged_page(page, "ff00"))
+        self.assertIsNone(unchanged_page(page, None))
+        self.assertIsNone(unchanged_page(None, "00ff"))
+        # reports written before digests were kept
+        self.assertIsNone(
+            unchanged_page(self.page_data["blog.boot.dev/0"], "00ff")
+        )
+        # copies of other pages may point to another page by now
+        alias = {**page, "alias_of": f"{self.base_url}/1"}
+        self.assertIsNone(unchanged_page(alias, "00ff"))
+
+
+class TestRecrawlEngines(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fname: str = os.path.join(self.tmp_dir.name, "report")
+        self.server = SiteServer(SiteConfig(pages=20, fan_out=3, latency=0))
+        self.server.__enter__()
+        # keep the crawl progress out of the test output
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.server.__exit__(None, None, None)
+        self.tmp_dir.cleanup()
+
+    def crawl(
+        self, engine: str, since: PageDiff | None = None, max_pages: int = 100
+    ) -> AsyncCrawler | SyncCrawler:
+        if engine == "sync":
+            with SyncCrawler(
+                self.server.url, 4, max_pages, since=since
+            ) as crawler:
+                crawler.crawl()
+            return crawler
+
+        async def crawl() -> AsyncCrawler:
+            async with AsyncCrawler(
+                self.server.url, 4, max_pages, since=since
+            ) as crawler:
+                await crawler.crawl()
+            return crawler
+
+        return asyncio.run(crawl())
+
+    def test_unchanged_pages_are_not_extracted(self):
+        for engine in ("async", "sync"):
+            with self.subTest(engine=engine):
+                first = self.crawl(engine)
+                page_data = dict(first.page_data.items())
+                self.assertIn("parse", first.metrics.phases)
+
+                # the report of the first crawl keeps the digests
+                write_report(page_data, JSONSink(self.fname, digests=True))
+                diff = PageDiff(load_report(f"{self.fname}.json"))
+                second = self.crawl(engine, diff)
+                self.assertNotIn("parse", second.metrics.phases)
+                self.assertEqual(dict(second.page_data.items()), page_data)
+                self.assertEqual(diff.unchanged, len(page_data))
+                self.assertEqual(diff.removed(), {})
+
+    def test_limit_below_earlier_pages(self):
+        for engine in ("async", "sync"):
+            with self.subTest(engine=engine):
+                page_data = dict(self.crawl(engine).page_data.items())
+
+                # the known pages count against the page limit, the
+                # pages left out are still online
+                diff = PageDiff(page_data)
+                limited = self.crawl(engine, diff, 5)
+                self.assertEqual(limited.page_count, 5)
+                self.assertEqual(diff.unchanged, 5)
+                self.assertEqual(diff.removed(), {})
+                self.assertEqual(len(diff.not_recrawled()), len(page_data) - 5)
+                self.assertEqual(
+                    diff.describe(),
+                    "0 added, 0 removed, 0 changed, 5 unchanged, "
+                    f"{len(page_data) - 5} not recrawled",
+                )
+
+    def test_gone_pages(self):
+        for engine in ("async", "sync"):
+            with self.subTest(engine=engine):
+                page_data = dict(self.crawl(engine).page_data.items())
+                root: str = next(iter(page_data))
+                gone = {**page_data[root], "url": f"{self.server.url}p/999"}
+                diff = PageDiff({f"{root}/p/999": gone, **page_data})
+
+                # a page that fails now is removed, even if the crawl
+                # budget stops the crawl
+                self.crawl(engine, diff, len(page_data))
+                self.assertEqual(diff.removed(), {f"{root}/p/999": gone})
+                self.assertTrue(diff.stopped)
+                self.assertEqual(diff.not_recrawled(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from crawler.report import CSVSink, JSONSink, NDJSONSink, write_pages
+
+
+class TestReport(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.page_data: dict[str, dict[str, str | list[str]]] = {
+            f"blog.boot.dev/{i}": {
+                "url": f"https://blog.boot.dev/{i}",
+                "h1": f"Title {i}",
+                "first_paragraph": f"Paragraph {i}",
+                "outgoing_links": [f"https://blog.boot.dev/{i + 1}"],
+                "image_urls": [],
+            }
+            for i in range(3)
+        }
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fname: str = os.path.join(self.tmp_dir.name, "report")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_json_sink_matches_json_dump(self):
+        with JSONSink(self.fname) as sink:
+            for normalized_url, page in self.page_data.items():
+                sink.write(normalized_url, page)
+
+        with open(f"{self.fname}.json", encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps(self.page_data, indent=4))
+
+    def test_digests(self):
+        pages = {
+            normalized_url: {**page, "digest": "00ff" * 8}
+            for normalized_url, page in self.page_data.items()
+        }
+        # the output format doesn't change unless digests are asked for
+        write_pages(pages.items(), JSONSink(self.fname))
+        write_pages(pages.items(), NDJSONSink(self.fname, digests=True))
+
+        with open(f"{self.fname}.json", encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps(self.page_data, indent=4))
+        with open(f"{self.fname}.ndjson", encoding="utf-8") as f:
+            self.assertEqual(
+                [json.loads(line)["digest"] for line in f],
+                ["00ff" * 8] * len(pages),
+            )
+
+    def test_ndjson_sink_is_readable_while_writing(self):
+        sink: NDJSONSink = NDJSONSink(self.fname)
+        normalized_url, page = next(iter(self.page_data.items()))
+        sink.write(normalized_url, page)
+
+        with open(f"{self.fname}.ndjson", encoding="utf-8") as f:
+            lines: list[str] = f.readlines()
+        sink.close()
+
+        self.assertEqual(len(lines), 1)
+        self.assertDictEqual(
+            json.loads(lines[0]), {"normalized_url": normalized_url, **page}
+        )
+
+    def test_gzip_ndjson_sink(self):
+        with NDJSONSink(self.fname, compress=True) as sink:
+            for normalized_url, page in self.page_data.items():
+                sink.write(normalized_url, page)
+
+        with gzip.open(f"{self.fname}.ndjson.gz", "rt") as f:
+            actual: list[str] = [
+                json.loads(line)["normalized_url"] for line in f
+            ]
+        self.assertListEqual(actual, list(self.page_data))
+
+    def test_csv_sink_extra_columns(self):
+        write_pages(
+            (
+                (normalized_url, {**page, "depth": depth})
+                for depth, (normalized_url, page) in enumerate(
+                    self.page_data.items()
+                )
+            ),
+            CSVSink(self.fname, extra_columns=("depth", "orphan")),
+        )
+
+        with open(f"{self.fname}.csv", encoding="utf-8") as f:
+            rows: list[dict[str, str]] = list(csv.DictReader(f))
+        self.assertEqual([row["depth"] for row in rows], ["0", "1", "2"])
+        # pages without a column leave it empty
+        self.assertEqual([row["orphan"] for row in rows], ["", "", ""])
+
+    def test_empty_sink_removes_file(self):
+        CSVSink(self.fname).close()
+        self.assertFalse(os.path.exists(f"{self.fname}.csv"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,267 @@
+import asyncio
+import contextlib
+import io
+import time
+import unittest
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer, SyntheticSite
+from crawler.async_crawl import AsyncCrawler
+from crawler.budget import BudgetSpentError, CrawlBudget
+from crawler.crawl import ResponseStatusError
+from crawler.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Hedger,
+    RetryPolicy,
+    Timeouts,
+    is_transient,
+)
+from crawler.sync_crawl import SyncCrawler
+
+
+class FlakySite(SyntheticSite):
+    """Synthetic site whose pages fail or stall on their first requests"""
+
+    def __init__(
+        self,
+        config: SiteConfig,
+        failures: int = 0,
+        stalls: int = 0,
+        stall: float = 0.0,
+    ):
+        super().__init__(config)
+        self.failures: int = failures
+        self.stalls: int = stalls
+        self.stall: float = stall
+        self.requests: Counter = Counter()
+
+    async def handle_page(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        if self.requests[request.path] <= self.failures:
+            raise web.HTTPServiceUnavailable()
+        if self.requests[request.path] <= self.stalls:
+            await asyncio.sleep(self.stall)
+        return await super().handle_page(request)
+
+
+class TestRetry(unittest.TestCase):
+    def test_backoff(self):
+        policy = RetryPolicy(3, 0.5, 1.5)
+        for _ in range(100):
+            self.assertLessEqual(policy.delay(0), 0.5)
+            self.assertLessEqual(policy.delay(4), 1.5)
+
+    def test_transient(self):
+        errors = (ConnectionError,)
+        self.assertTrue(is_transient(ResponseStatusError(503), errors))
+        self.assertFalse(is_transient(ResponseStatusError(404), errors))
+        self.assertFalse(is_transient(ValueError(), errors))
+
+        # the client error wrapped by the crawler
+        try:
+            try:
+                raise ConnectionResetError()
+            except OSError as e:
+                raise Exception(f"network error: {e}") from e
+        except Exception as e:
+            self.assertTrue(is_transient(e, errors))
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(2, 0.05)
+        breaker.record("blog.boot.dev", True)
+        breaker.check("blog.boot.dev")
+        breaker.record("blog.boot.dev", True)
+        with self.assertRaises(CircuitOpenError):
+            breaker.check("blog.boot.dev")
+        # other hosts aren't affected
+        breaker.check("boot.dev")
+
+        # a single probe is let through after the cooldown
+        time.sleep(0.06)
+        breaker.check("blog.boot.dev")
+        with self.assertRaises(CircuitOpenError):
+            breaker.check("blog.boot.dev")
+        breaker.record("blog.boot.dev", True)
+        with self.assertRaises(CircuitOpenError):
+            breaker.check("blog.boot.dev")
+
+        time.sleep(0.06)
+        breaker.check("blog.boot.dev")
+        breaker.record("blog.boot.dev", False)
+        breaker.check("blog.boot.dev")
+        breaker.check("blog.boot.dev")
+        self.assertEqual(breaker.opened, 2)
+        self.assertEqual(breaker.rejected, 3)
+
+    def test_circuit_breaker_release(self):
+        breaker = CircuitBreaker(1, 0.0)
+        self.assertFalse(breaker.check("blog.boot.dev"))
+        breaker.record("blog.boot.dev", True)
+        self.assertTrue(breaker.check("blog.boot.dev"))
+        with self.assertRaises(CircuitOpenError):
+            breaker.check("blog.boot.dev")
+
+        # a probe without an outcome lets another request probe
+        breaker.release("blog.boot.dev")
+        self.assertTrue(breaker.check("blog.boot.dev"))
+        self.assertEqual(breaker.opened, 1)
+
+    def test_hedge_delay(self):
+        hedger = Hedger(0.9, min_samples=10)
+        for ttfb in range(9):
+            hedger.observe("blog.boot.dev", ttfb / 100)
+        self.assertIsNone(hedger.delay("blog.boot.dev"))
+        hedger.observe("blog.boot.dev", 0.09)
+        self.assertEqual(hedger.delay("blog.boot.dev"), 0.09)
+        self.assertIsNone(hedger.delay("boot.dev"))
+
+
+class TestCrawlRetries(unittest.TestCase):
+    def setUp(self):
+        self.config = SiteConfig(pages=10, fan_out=2, latency=0)
+        # keep the crawl progress out of the test output
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+
+    def serve(self, site: FlakySite) -> SiteServer:
+        server = SiteServer(self.config)
+        server.site = site
+        return server
+
+    def test_async_retries(self):
+        with self.serve(FlakySite(self.config, failures=1)) as server:
+            crawler = AsyncCrawler(
+                server.url, 4, 100, retry=RetryPolicy(2, 0.001)
+            )
+
+            async def crawl():
+                async with crawler:
+                    await crawler.crawl()
+
+            asyncio.run(crawl())
+
+        # the root and its 10 pages
+        self.assertEqual(crawler.page_count, 11)
+        self.assertEqual(crawler.metrics.retries, 11)
+        self.assertFalse(crawler.failed)
+
+    def test_sync_retries(self):
+        with self.serve(FlakySite(self.config, failures=1)) as server:
+            with SyncCrawler(
+                server.url, 2, 100, retry=RetryPolicy(2, 0.001)
+            ) as crawler:
+                crawler.crawl()
+
+        self.assertEqual(crawler.page_count, 11)
+        self.assertEqual(crawler.metrics.retries, 11)
+
+    def test_sync_timeout(self):
+        site = FlakySite(self.config, stalls=1, stall=1.0)
+        with self.serve(site) as server:
+            with SyncCrawler(
+                server.url,
+                4,
+                100,
+                timeouts=Timeouts(read=0.1),
+                retry=RetryPolicy(1, 0.001),
+            ) as crawler:
+                crawler.crawl()
+
+        self.assertEqual(crawler.page_count, 11)
+
+    def test_hedged_requests(self):
+        site = FlakySite(self.config, stalls=1, stall=1.0)
+        with self.serve(site) as server:
+            crawler = AsyncCrawler(
+                server.url,
+                4,
+                100,
+                hedger=Hedger(0.5, min_samples=1),
+            )
+            # the hedging delay of the site is known
+            crawler.hedger.observe(f"127.0.0.1:{server.port}", 0.01)
+
+            async def crawl():
+                async with crawler:
+                    await crawler.crawl()
+
+            started = time.perf_counter()
+            asyncio.run(crawl())
+            duration = time.perf_counter() - started
+
+        # every stalled request is outrun by its hedge
+        self.assertLess(duration, 1.0)
+        self.assertEqual(crawler.page_count, 11)
+        self.assertEqual(crawler.metrics.hedges, 11)
+
+    def test_circuit_breaker(self):
+        with self.serve(FlakySite(self.config, failures=100)) as server:
+            crawler = AsyncCrawler(
+                server.url,
+                1,
+                100,
+                retry=RetryPolicy(10, 0.001),
+                breaker=CircuitBreaker(3, 60.0),
+            )
+
+            async def crawl():
+                async with crawler:
+                    await crawler.crawl()
+
+            asyncio.run(crawl())
+
+        # the dead site is only requested until its circuit opens
+        self.assertEqual(sum(server.site.requests.values()), 3)
+        self.assertEqual(crawler.breaker.opened, 1)
+        self.assertEqual(crawler.failed, {f"127.0.0.1:{server.port}"})
+
+    def test_cancelled_probe(self):
+        self.config.latency = 0.2
+        with self.serve(FlakySite(self.config)) as server:
+            crawler = AsyncCrawler(
+                server.url, 1, 100, breaker=CircuitBreaker(1, 0.0)
+            )
+            host: str = crawler.canonicalizer.host(server.url)
+            crawler.breaker.record(host, True)
+
+            async def probe():
+                async with crawler:
+                    with self.assertRaises(asyncio.TimeoutError):
+                        await asyncio.wait_for(
+                            crawler.get_page(server.url), 0.05
+                        )
+
+            asyncio.run(probe())
+
+        # the next request may probe the host
+        self.assertFalse(crawler.breaker.hosts[host].probing)
+        self.assertTrue(crawler.breaker.check(host))
+
+    def test_probe_stopped_by_budget(self):
+        budget = CrawlBudget(10, max_bytes=1)
+        budget.add_bytes(1)
+        with self.serve(FlakySite(self.config)) as server:
+            with SyncCrawler(
+                server.url,
+                1,
+                10,
+                breaker=CircuitBreaker(1, 0.0),
+                budget=budget,
+            ) as crawler:
+                host: str = crawler.canonicalizer.host(server.url)
+                crawler.breaker.record(host, True)
+                with self.assertRaises(BudgetSpentError):
+                    crawler.request_page(server.url, None)
+
+        self.assertFalse(crawler.breaker.hosts[host].probing)
+        self.assertTrue(crawler.breaker.check(host))
+
+
+if __name__ == "__main__":
+    unittest.main()
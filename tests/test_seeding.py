@@ -0,0 +1,125 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from crawler.seeding import SeedCache, SitemapParser, SiteSeeder
+
+
+class TestSeeding(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.sitemap: bytes = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url><loc>https://blog.boot.dev/a</loc></url>
+    <url><loc> https://blog.boot.dev/b </loc><lastmod>2024-01-01</lastmod></url>
+    <url><loc>https://blog.boot.dev/private/c</loc></url>
+</urlset>"""
+        self.sitemap_index: bytes = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <sitemap><loc>https://blog.boot.dev/posts.xml</loc></sitemap>
+</sitemapindex>"""
+        self.robots_txt: str = (
+            "User-agent: *\n"
+            "Disallow: /private/\n"
+            "Sitemap: https://blog.boot.dev/sitemap_index.xml\n"
+        )
+
+    def parse_in_chunks(
+        self, document: bytes, size: int
+    ) -> list[tuple[str, str]]:
+        parser = SitemapParser()
+        found: list[tuple[str, str]] = []
+        for i in range(0, len(document), size):
+            found.extend(parser.feed(document[i : i + size]))
+        found.extend(parser.close())
+        return found
+
+    def test_sitemap_parser(self):
+        expected = [
+            ("page", "https://blog.boot.dev/a"),
+            ("page", "https://blog.boot.dev/b"),
+            ("page", "https://blog.boot.dev/private/c"),
+        ]
+        self.assertEqual(self.parse_in_chunks(self.sitemap, 7), expected)
+        self.assertEqual(
+            self.parse_in_chunks(gzip.compress(self.sitemap), 7), expected
+        )
+
+    def test_sitemap_index(self):
+        self.assertEqual(
+            self.parse_in_chunks(self.sitemap_index, 16),
+            [("sitemap", "https://blog.boot.dev/posts.xml")],
+        )
+
+    def test_seeder(self):
+        seeder = SiteSeeder("https://blog.boot.dev", "BootCrawler/1.0", 2, 10)
+        seeder.set_robots(self.robots_txt)
+        self.assertFalse(seeder.allowed("https://blog.boot.dev/private/c"))
+        self.assertTrue(seeder.allowed("https://blog.boot.dev/a"))
+
+        self.assertEqual(
+            seeder.next_sitemap(), "https://blog.boot.dev/sitemap_index.xml"
+        )
+        self.assertEqual(
+            seeder.add_urls(self.parse_in_chunks(self.sitemap_index, 64)), []
+        )
+        self.assertEqual(
+            seeder.next_sitemap(), "https://blog.boot.dev/posts.xml"
+        )
+        # page URLs are limited to `max_urls`
+        self.assertEqual(
+            seeder.add_urls(self.parse_in_chunks(self.sitemap, 64)),
+            ["https://blog.boot.dev/a", "https://blog.boot.dev/b"],
+        )
+        self.assertTrue(seeder.is_full())
+        self.assertIsNone(seeder.next_sitemap())
+
+    def test_default_sitemap(self):
+        seeder = SiteSeeder("https://blog.boot.dev", "BootCrawler/1.0", 2, 10)
+        seeder.set_robots("")
+        self.assertTrue(seeder.allowed("https://blog.boot.dev/private/c"))
+        self.assertEqual(
+            seeder.next_sitemap(), "https://blog.boot.dev/sitemap.xml"
+        )
+
+    def test_seed_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path: str = os.path.join(tmp_dir, "seeds.json")
+            seeder = SiteSeeder(
+                "https://blog.boot.dev",
+                "BootCrawler/1.0",
+                10,
+                10,
+                SeedCache(path, 60),
+            )
+            self.assertFalse(seeder.load_cached())
+            seeder.set_robots(self.robots_txt)
+            seeder.add_urls([("page", "https://blog.boot.dev/a")])
+            seeder.save()
+
+            cached = SiteSeeder(
+                "https://blog.boot.dev",
+                "BootCrawler/1.0",
+                10,
+                10,
+                SeedCache(path, 60),
+            )
+            self.assertTrue(cached.load_cached())
+            self.assertEqual(cached.urls, ["https://blog.boot.dev/a"])
+            self.assertFalse(cached.allowed("https://blog.boot.dev/private/"))
+
+            # expired entries are fetched again
+            expired = SiteSeeder(
+                "https://blog.boot.dev",
+                "BootCrawler/1.0",
+                10,
+                10,
+                SeedCache(path, -1),
+            )
+            self.assertFalse(expired.load_cached())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import io
+import threading
+import unittest
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer
+from crawler.async_crawl import AsyncCrawler
+from crawler.budget import CrawlBudget
+from crawler.config import (
+    BLOOM_CAPACITY,
+    BLOOM_ERROR_RATE,
+    FRONTIER_SIZE,
+    INLINE_EXECUTOR,
+    VISITED_SET,
+)
+from crawler.shards import ShardOptions, crawl_sharded, shard_of
+from tests.test_budget import CountingSite
+
+# a crawl that doesn't shut down fails the test instead of hanging it
+CRAWL_TIMEOUT: float = 60.0
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.config = SiteConfig(pages=60, fan_out=4, latency=0.002)
+        self.server = SiteServer(self.config)
+        self.server.site = CountingSite(self.config)
+        self.server.__enter__()
+        # keep the crawl progress out of the test output
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.server.__exit__(None, None, None)
+
+    def options(self, max_pages: int) -> ShardOptions:
+        return ShardOptions(
+            self.server.url,
+            max_pages,
+            4,
+            1,
+            4,
+            INLINE_EXECUTOR,
+            FRONTIER_SIZE,
+            VISITED_SET,
+            BLOOM_CAPACITY,
+            BLOOM_ERROR_RATE,
+            "off",
+        )
+
+    def crawl_sharded(
+        self, max_pages: int, workers: int = 2
+    ) -> tuple[int, dict[str, dict[str, str | list[str]]], CrawlBudget]:
+        page_data: dict[str, dict[str, str | list[str]]] = {}
+        budget: CrawlBudget = CrawlBudget(max_pages)
+        page_counts: list[int] = []
+        crawl = threading.Thread(
+            target=lambda: page_counts.append(
+                crawl_sharded(
+                    self.options(max_pages), workers, page_data, budget=budget
+                )
+            ),
+            daemon=True,
+        )
+        crawl.start()
+        crawl.join(CRAWL_TIMEOUT)
+        # the shards stop once no URL is outstanding in any of them
+        self.assertFalse(crawl.is_alive(), "sharded crawl didn't finish")
+        return page_counts[0], page_data, budget
+
+    def test_shard_of(self):
+        shards = [shard_of(f"127.0.0.1/page/{i}", 3) for i in range(30)]
+        self.assertEqual(set(shards), {0, 1, 2})
+        self.assertEqual(shard_of("127.0.0.1/page/1", 3), shards[1])
+
+    def test_same_pages_as_single_worker(self):
+        crawler = AsyncCrawler(self.server.url, 4, 100)
+
+        async def crawl():
+            async with crawler:
+                await crawler.crawl()
+
+        asyncio.run(crawl())
+        self.server.site.requests.clear()
+
+        page_count, page_data, _ = self.crawl_sharded(100)
+        # the root and its 60 pages
+        self.assertEqual(crawler.page_count, 61)
+        self.assertEqual(page_count, 61)
+        self.assertEqual(set(page_data), set(crawler.page_data))
+        # every URL is crawled by a single shard
+        self.assertEqual(set(self.server.site.requests.values()), {1})
+
+    def test_shared_page_limit(self):
+        page_count, page_data, budget = self.crawl_sharded(15)
+
+        # no shard downloads a page past the limit shared by all shards
+        self.assertEqual(page_count, 15)
+        self.assertEqual(len(page_data), 15)
+        self.assertEqual(sum(self.server.site.requests.values()), 15)
+        self.assertEqual(budget.spent(), "page")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import unittest
+
+# libraries the CLI only loads once a mode needing them is selected
+HEAVY_MODULES: tuple[str, ...] = (
+    "aiohttp",
+    "requests",
+    "bs4",
+    "lxml",
+    "numpy",
+    "sqlite3",
+)
+
+
+def loaded_modules(code: str) -> set[str]:
+    """Run the code in a fresh interpreter and return the heavy
+    modules it imported
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"{code}\n"
+            "import sys\n"
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} "
+            "if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.splitlines()[-1].split())
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_main(self):
+        self.assertEqual(loaded_modules("import crawler.main"), set())
+
+    def test_help(self):
+        code = (
+            "import sys\n"
+            "from crawler.main import main\n"
+            "sys.argv = ['crawler', '--help']\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass"
+        )
+        self.assertEqual(loaded_modules(code), set())
+
+    def test_engines_load_their_client(self):
+        self.assertNotIn(
+            "aiohttp", loaded_modules("import crawler.sync_crawl")
+        )
+        self.assertNotIn(
+            "requests", loaded_modules("import crawler.async_crawl")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import unittest
+
+from crawler.report import write_json_report
+from crawler.store import CrawlStore
+
+
+class TestStore(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.base_url: str = "https://blog.boot.dev"
+        self.page_data: dict[str, dict[str, str | list[str]]] = {
+            f"blog.boot.dev/{i}": {
+                "url": f"{self.base_url}/{i}",
+                "h1": f"Title {i}",
+                "first_paragraph": f"Paragraph {i}",
+                "outgoing_links": [f"{self.base_url}/{i + 1}"],
+                "image_urls": [f"{self.base_url}/{i}.png"],
+            }
+            for i in range(5)
+        }
+        # pages crawled by the engines keep their content digest
+        self.page_data["blog.boot.dev/0"]["digest"] = "00ff" * 8
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path: str = os.path.join(self.tmp_dir.name, "state.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_store_pages_round_trip(self):
+        with CrawlStore(self.db_path, batch_size=2) as store:
+            page_data = store.pages()
+            for normalized_url, page in self.page_data.items():
+                page_data[normalized_url] = page
+
+            self.assertEqual(len(page_data), len(self.page_data))
+            self.assertDictEqual(dict(page_data.items()), self.page_data)
+            self.assertListEqual(
+                list(page_data.values()), list(self.page_data.values())
+            )
+
+    def test_store_aliases(self):
+        alias = {
+            **self.page_data["blog.boot.dev/0"],
+            "url": f"{self.base_url}/0?print",
+            "alias_of": f"{self.base_url}/0",
+        }
+        with CrawlStore(self.db_path, batch_size=2) as store:
+            store.add_page("blog.boot.dev/0?print", alias)
+            store.add_page(
+                "blog.boot.dev/0", self.page_data["blog.boot.dev/0"]
+            )
+
+            self.assertEqual(store.get_page("blog.boot.dev/0?print"), alias)
+            self.assertNotIn("alias_of", store.get_page("blog.boot.dev/0"))
+
+    def test_store_resume_pending_urls(self):
+        with CrawlStore(self.db_path, batch_size=10) as store:
+            store.add_url(f"{self.base_url}/0", "blog.boot.dev/0")
+            store.add_url(f"{self.base_url}/1", "blog.boot.dev/1", 1)
+            store.add_page(
+                "blog.boot.dev/0", self.page_data["blog.boot.dev/0"]
+            )
+            store.mark_done("blog.boot.dev/0")
+
+        with CrawlStore(self.db_path, batch_size=10, resume=True) as store:
+            self.assertEqual(len(store.pages()), 1)
+            self.assertListEqual(
+                sorted(store.visited_urls()),
+                ["blog.boot.dev/0", "blog.boot.dev/1"],
+            )
+            self.assertListEqual(
+                store.pending_urls(),
+                [(f"{self.base_url}/1", "blog.boot.dev/1", 1)],
+            )
+
+        with CrawlStore(self.db_path, batch_size=10) as store:
+            self.assertEqual(len(store.pages()), 0)
+            self.assertListEqual(store.pending_urls(), [])
+
+    def test_write_json_report_from_store(self):
+        with CrawlStore(self.db_path, batch_size=3) as store:
+            page_data = store.pages()
+            for normalized_url, page in self.page_data.items():
+                page_data[normalized_url] = page
+
+            filename: str = os.path.join(self.tmp_dir.name, "report.json")
+            write_json_report(page_data, filename)
+
+        # the digests stay in the database, the report format is unchanged
+        del self.page_data["blog.boot.dev/0"]["digest"]
+        with open(filename, encoding="utf-8") as f:
+            actual: str = f.read()
+        self.assertEqual(actual, json.dumps(self.page_data, indent=4))
+
+
+if __name__ == "__main__":
+    unittest.main()
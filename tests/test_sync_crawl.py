@@ -0,0 +1,93 @@
+import asyncio
+import contextlib
+import io
+import time
+import unittest
+
+from benchmarks.synthetic_site import SiteConfig, SiteServer, SyntheticSite
+from crawler.async_crawl import AsyncCrawler
+from crawler.dedup import ContentFingerprint, DuplicateIndex
+from crawler.sync_crawl import SyncCrawler
+
+
+class CopySite(SyntheticSite):
+    """Synthetic site whose root links to copies of the same page"""
+
+    def links(self, number: int) -> list[int]:
+        return list(range(1, self.config.pages)) if number == 0 else []
+
+    def render(self, number: int) -> str:
+        return super().render(min(number, 1))
+
+
+class SlowIndex(DuplicateIndex):
+    """Duplicate index taking a while to look documents up, so the fetch
+    threads look them up at the same time
+    """
+
+    def find(self, fingerprint: ContentFingerprint) -> str | None:
+        url: str | None = super().find(fingerprint)
+        time.sleep(0.01)
+        return url
+
+
+class TestSyncCrawl(unittest.TestCase):
+    def setUp(self):
+        # keep the crawl progress out of the test output
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+
+    def test_same_pages_as_async(self):
+        config = SiteConfig(pages=40, fan_out=3, latency=0.002)
+        with SiteServer(config) as server:
+            with SyncCrawler(server.url, 4, 100) as sync_crawler:
+                sync_crawler.crawl()
+
+            async def crawl() -> AsyncCrawler:
+                async with AsyncCrawler(server.url, 4, 100) as crawler:
+                    await crawler.crawl()
+                return crawler
+
+            async_crawler = asyncio.run(crawl())
+
+        # the root and its 40 pages
+        self.assertEqual(sync_crawler.page_count, 41)
+        self.assertEqual(
+            dict(sync_crawler.page_data.items()),
+            dict(async_crawler.page_data.items()),
+        )
+
+    def test_copies_in_fetch_threads(self):
+        # the copies are fetched by all threads at the same time
+        config = SiteConfig(pages=9, latency=0.02)
+        server = SiteServer(config)
+        server.site = CopySite(config)
+        with server:
+            with SyncCrawler(server.url, 8, 100, dedup=SlowIndex()) as crawler:
+                crawler.crawl()
+
+        copies = [
+            page
+            for normalized_url, page in crawler.page_data.items()
+            if "/p/" in normalized_url
+        ]
+        self.assertEqual(len(copies), 8)
+        # a single copy is extracted, the others are its aliases
+        extracted = [page for page in copies if "alias_of" not in page]
+        self.assertEqual(len(extracted), 1)
+        self.assertEqual(
+            {page["alias_of"] for page in copies if "alias_of" in page},
+            {extracted[0]["url"]},
+        )
+        self.assertEqual(crawler.dedup.duplicates, 7)
+        # aliases keep the digest of their content like the async engine
+        self.assertEqual(
+            {page["digest"] for page in copies}, {extracted[0]["digest"]}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from benchmarks.synthetic_site import SiteConfig, SyntheticSite
+from crawler.crawl import extract_page_data
+
+
+class TestSyntheticSite(unittest.TestCase):
+    def test_pages_are_reproducible(self):
+        config = SiteConfig(pages=50, fan_out=5, page_bytes=2000, seed=3)
+        site = SyntheticSite(config)
+
+        self.assertEqual(site.render(7), SyntheticSite(config).render(7))
+        self.assertNotEqual(
+            site.render(7), SyntheticSite(SiteConfig(pages=50)).render(7)
+        )
+        self.assertGreaterEqual(len(site.render(7)), config.page_bytes)
+
+    def test_links(self):
+        site = SyntheticSite(SiteConfig(pages=50, fan_out=5))
+        page = extract_page_data(site.render(7), "http://localhost/p/7")
+
+        self.assertEqual(page["h1"], "Page 7")
+        self.assertEqual(len(page["outgoing_links"]), 6)
+        # every page is reachable through the next page link
+        self.assertEqual(page["outgoing_links"][0], "http://localhost/p/8")
+        last = extract_page_data(site.render(49), "http://localhost/p/49")
+        self.assertEqual(len(last["outgoing_links"]), 5)
+
+    def test_error_rate(self):
+        site = SyntheticSite(SiteConfig(pages=1000, error_rate=0.2))
+        errors: int = sum(map(site.is_error, range(1000)))
+
+        self.assertTrue(150 < errors < 250)
+        self.assertFalse(
+            any(map(SyntheticSite(SiteConfig()).is_error, range(100)))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
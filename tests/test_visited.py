@@ -0,0 +1,57 @@
+import unittest
+
+from crawler.visited import (
+    BloomFilter,
+    FingerprintSet,
+    VisitedSet,
+    create_visited_set,
+)
+
+
+class TestVisited(unittest.TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+
+        self.urls: list[str] = [
+            f"blog.boot.dev/some/path/{i}" for i in range(1000)
+        ]
+
+    def assert_reserves_once(self, visited: VisitedSet):
+        for url in self.urls:
+            self.assertTrue(visited.reserve(url))
+        for url in self.urls:
+            self.assertFalse(visited.reserve(url))
+            self.assertIn(url, visited)
+        self.assertEqual(len(visited), len(self.urls))
+
+    def test_visited_set_reserves_once(self):
+        self.assert_reserves_once(VisitedSet())
+
+    def test_fingerprint_set_reserves_once(self):
+        self.assert_reserves_once(FingerprintSet())
+
+    def test_bloom_filter_reserves_once(self):
+        self.assert_reserves_once(BloomFilter(10_000, 0.0001))
+
+    def test_bloom_filter_memory_is_fixed(self):
+        visited: BloomFilter = BloomFilter(10_000, 0.01)
+        memory: int = visited.memory_bytes()
+        for url in self.urls:
+            visited.reserve(url)
+        self.assertEqual(visited.memory_bytes(), memory)
+
+    def test_fingerprint_set_uses_less_memory(self):
+        exact: VisitedSet = VisitedSet()
+        fingerprints: FingerprintSet = FingerprintSet()
+        for url in self.urls:
+            exact.reserve(url)
+            fingerprints.reserve(url)
+        self.assertLess(fingerprints.memory_bytes(), exact.memory_bytes())
+
+    def test_create_visited_set_unknown(self):
+        with self.assertRaises(ValueError):
+            create_visited_set("unknown", 10, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()